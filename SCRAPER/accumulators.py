@@ -0,0 +1,226 @@
+# coding: utf-8
+"""
+Multiple (schedine) migliori per giornata dalle probabilità precalcolate
+- Input:
+    public/data/fixture_probabilities.csv   (poisson_grid.py: mercati per partita, 0..100)
+- Giornata = finestra martedì→lunedì (coppe infrasettimanali + weekend di campionato)
+- Per ogni giornata e numero di eventi in LEGS: le TOP_N combinazioni con probabilità
+  congiunta massima (eventi indipendenti → somma dei log-prob), vincoli:
+    un solo mercato per partita, probabilità del singolo evento tra MIN_LEG_PROB e MAX_LEG_PROB
+    (sopra MAX_LEG_PROB la quota non vale la giocata), solo i mercati in MARKETS (se impostato)
+- Branch-and-bound in profondità: partite ordinate per miglior log-prob, limite superiore =
+  prob. attuale + migliori completamenti possibili (monotono → si interrompe l'intero ciclo),
+  ultimo evento valutato in blocco con NumPy su tutti i candidati rimasti
+- Quote "eque" = 1 / probabilità (stesso campo odd della schedina del sito)
+
+Uso:
+  python SCRAPER/accumulators.py
+  python SCRAPER/accumulators.py --legs 3 4 --top 10 --min-prob 60
+
+Output:
+ - public/data/accumulators.json
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from poisson_grid import OUTPUT_CSV as PROBABILITIES_CSV, _read_csv
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+OUTPUT_JSON = "public/data/accumulators.json"
+
+LEGS = [2, 3, 4, 5]
+TOP_N = 20
+MIN_LEG_PROB = 55.0       # % minima del singolo evento
+MAX_LEG_PROB = 92.0       # % massima (quota ≥ ~1.09)
+MARKETS: Optional[List[str]] = None   # None = tutti i mercati del file
+
+# colonne di fixture_probabilities.csv che non sono mercati
+INFO_COLS = ["Squadra Casa", "Squadra Trasferta", "Orario", "Giorno", "Campionato",
+             "xG Casa", "xG Trasferta", "Risultato", "Prob. Risultato"]
+
+# ───────────────────────────────────────────────────
+# Candidati
+# ───────────────────────────────────────────────────
+def matchday_key(day: pd.Series) -> pd.Series:
+    """Inizio (martedì) della giornata che contiene la data."""
+    return (day - pd.to_timedelta((day.dt.weekday - 1) % 7, unit="D")).dt.strftime("%Y-%m-%d")
+
+def load_candidates(path: str = PROBABILITIES_CSV) -> pd.DataFrame:
+    """Formato lungo (partita, mercato, prob) filtrato sui vincoli del singolo evento."""
+    df = _read_csv(path)
+    if df.empty:
+        return pd.DataFrame()
+    markets = [c for c in df.columns if c not in INFO_COLS and (MARKETS is None or c in MARKETS)]
+    df["fixture"] = np.arange(len(df))
+    df["matchday"] = matchday_key(pd.to_datetime(df["Giorno"], errors="coerce"))
+    long = df.melt(id_vars=["fixture", "matchday", "Squadra Casa", "Squadra Trasferta", "Giorno",
+                            "Orario", "Campionato"], value_vars=markets, var_name="market", value_name="prob")
+    long["prob"] = pd.to_numeric(long["prob"], errors="coerce")
+    long = long[long["prob"].between(MIN_LEG_PROB, MAX_LEG_PROB) & long["matchday"].notna()]
+    return long.reset_index(drop=True)
+
+# ───────────────────────────────────────────────────
+# Branch-and-bound
+# ───────────────────────────────────────────────────
+class TopN:
+    """Min-heap delle migliori n soluzioni (log-prob, legs)."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.heap: List[Tuple[float, Tuple[int, ...]]] = []
+
+    @property
+    def worst(self) -> float:
+        return self.heap[0][0] if len(self.heap) >= self.n else -np.inf
+
+    def push(self, score: float, legs: Tuple[int, ...]):
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (score, legs))
+        elif score > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (score, legs))
+
+    def sorted(self) -> List[Tuple[float, Tuple[int, ...]]]:
+        return sorted(self.heap, key=lambda x: (-x[0], x[1]))
+
+def search(groups: List[np.ndarray], k: int, top: int) -> List[Tuple[float, Tuple[int, ...]]]:
+    """
+    groups[f] = log-prob (decrescenti) dei mercati ammessi della partita f, partite ordinate
+    per miglior log-prob decrescente. Ritorna le top combinazioni di k partite distinte
+    come (log-prob totale, indici (partita, mercato) codificati f * M + m).
+    """
+    n = len(groups)
+    if n < k:
+        return []
+    M = max(len(g) for g in groups)
+    best = np.array([g[0] for g in groups])
+    # best_sum[f, r] = somma dei migliori r valori da f in poi (best è decrescente → i primi r)
+    cs = np.concatenate([[0.0], np.cumsum(best)])
+    def bound(f: int, r: int) -> float:
+        return cs[min(f + r, n)] - cs[f] if f + r <= n else -np.inf
+
+    # ultimo evento in blocco: tutti i candidati (partita, mercato) con partita ≥ f
+    flat_lp = np.concatenate(groups)
+    flat_code = np.concatenate([f * M + np.arange(len(g)) for f, g in enumerate(groups)])
+    offset = np.concatenate([[0], np.cumsum([len(g) for g in groups])])
+
+    res = TopN(top)
+
+    def dfs(start: int, r: int, cur: float, legs: Tuple[int, ...]):
+        if r == 1:
+            lp = flat_lp[offset[start]:]
+            score = cur + lp
+            ok = np.flatnonzero(score > res.worst)
+            if len(ok) > top:
+                ok = ok[np.argpartition(-score[ok], top)[:top]]
+            codes = flat_code[offset[start]:]
+            for i in ok:
+                res.push(float(score[i]), legs + (int(codes[i]),))
+            return
+        for f in range(start, n - r + 1):
+            if cur + bound(f, r) <= res.worst:
+                break   # le partite successive hanno limiti ancora più bassi
+            rest = bound(f + 1, r - 1)
+            for m, lp in enumerate(groups[f]):
+                if cur + lp + rest <= res.worst:
+                    break
+                dfs(f + 1, r - 1, cur + lp, legs + (f * M + m,))
+
+    dfs(0, k, 0.0, ())
+    return res.sorted()
+
+def best_slips(cands: pd.DataFrame, legs: List[int], top: int) -> Dict[str, List[Dict]]:
+    """Top combinazioni per numero di eventi su una giornata."""
+    groups, rows = [], []
+    for _, g in cands.groupby("fixture"):
+        g = g.sort_values("prob", ascending=False)
+        rows.append(g)
+        groups.append(np.log(g["prob"].to_numpy(dtype=float) / 100))
+    order = np.argsort([-g[0] for g in groups], kind="stable")
+    groups = [groups[i] for i in order]
+    rows = [rows[i] for i in order]
+    M = max((len(g) for g in groups), default=1)
+
+    out: Dict[str, List[Dict]] = {}
+    for k in legs:
+        slips = []
+        for score, codes in search(groups, k, top):
+            sel = [rows[c // M].iloc[c % M] for c in codes]
+            prob = float(np.exp(score))
+            slips.append({
+                "prob": round(prob * 100, 2),
+                "odds": round(1 / prob, 2),
+                "legs": [{
+                    "match": f"{r['Squadra Casa']} - {r['Squadra Trasferta']}",
+                    "league": r["Campionato"],
+                    "date": r["Giorno"],
+                    "time": r["Orario"],
+                    "market": r["market"],
+                    "prob": float(r["prob"]),
+                    "odd": round(100 / float(r["prob"]), 2),
+                } for r in sorted(sel, key=lambda r: (r["Giorno"], r["Orario"]))],
+            })
+        out[str(k)] = slips
+    return out
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build(legs: List[int] = LEGS, top: int = TOP_N):
+    """
+    Calcola e salva OUTPUT_JSON; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non c'è nulla da salvare.
+    """
+    cands = load_candidates()
+    if cands.empty:
+        print("Nessuna partita con mercati nei limiti di probabilità.")
+        return False
+    t0 = time.perf_counter()
+    matchdays = {}
+    for day, g in cands.groupby("matchday", sort=True):
+        matchdays[day] = {"fixtures": int(g["fixture"].nunique()), "slips": best_slips(g, legs, top)}
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    art = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "constraints": {"legs": legs, "top": top, "minLegProb": MIN_LEG_PROB, "maxLegProb": MAX_LEG_PROB},
+        "matchdays": matchdays,
+    }
+    tmp = OUTPUT_JSON + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(art, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, OUTPUT_JSON)
+    print(f"💾 Salvato: {OUTPUT_JSON} ({len(matchdays)} giornate, {elapsed:.2f}s di ricerca)")
+    return True
+
+def main():
+    global MIN_LEG_PROB, MAX_LEG_PROB
+    ap = argparse.ArgumentParser(description="Multiple migliori per giornata (branch-and-bound)")
+    ap.add_argument("--legs", type=int, nargs="*", default=LEGS, help="numero di eventi per schedina")
+    ap.add_argument("--top", type=int, default=TOP_N)
+    ap.add_argument("--min-prob", type=float, default=MIN_LEG_PROB, help="%% minima per evento")
+    ap.add_argument("--max-prob", type=float, default=MAX_LEG_PROB, help="%% massima per evento")
+    args = ap.parse_args()
+    MIN_LEG_PROB, MAX_LEG_PROB = args.min_prob, args.max_prob
+    try:
+        build(legs=args.legs, top=args.top)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
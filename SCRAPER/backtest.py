@@ -0,0 +1,249 @@
+# coding: utf-8
+"""
+Backtest vettoriale dei mercati suggeriti (1X2, doppia chance, O/U, Goal/NoGoal, multigol)
+- Input:
+    feature point-in-time dal feature store (.cache/features, aggiornato da feature_store.py)
+    public/data/history/odds/*.csv (opzionale: Giorno, Squadra Casa, Squadra Trasferta, Mercato, Quota)
+- Per ogni partita: tassi gol alla vigilia dalle feature point-in-time (media gol/xG fatti
+  della squadra e subiti dall'avversaria sulla finestra scelta, fattore casa), griglia
+  Poisson e mercati di poisson_grid, esiti reali dalla stessa funzione applicata al risultato
+- Regola: si suggerisce un mercato quando la probabilità ≥ soglia; per mercato e soglia:
+  giocate, hit rate, probabilità media, scarto hit rate − probabilità (calibrazione della
+  soglia), ROI; calibrazione per fasce di probabilità, Brier
+- Tutto in array (partite × mercati × soglie): nessun loop per partita
+- ROI solo con le quote storiche (sulle partite quotate): senza quote il report resta di
+  calibrazione, una quota ricavata dalle probabilità del modello misurerebbe il modello
+  contro sé stesso
+- Sweep dei parametri del modello (finestra, peso xG, fattore casa) su un process pool
+
+Uso:
+  python SCRAPER/feature_store.py   # prima: aggiunge al feature store le partite nuove
+  python SCRAPER/backtest.py
+  python SCRAPER/backtest.py --leagues serie_a premier_league --seasons 2024-2025 --workers 4
+
+Output:
+ - .cache/backtest/report.csv        (config × mercato × soglia)
+ - .cache/backtest/calibration.csv   (config × mercato × fascia)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import glob
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from poisson_grid import MAX_GOALS, MIN_RATE, _read_csv, market_probabilities, score_grid
+import feature_store
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+ODDS_GLOB = "public/data/history/odds/*.csv"
+OUT_DIR = os.path.join(".cache", "backtest")
+REPORT_CSV = os.path.join(OUT_DIR, "report.csv")
+CALIBRATION_CSV = os.path.join(OUT_DIR, "calibration.csv")
+
+THRESHOLDS = np.arange(50, 96, 5) / 100      # probabilità minima per suggerire
+MIN_PLAYED = 3                               # partite minime (per squadra) prima di valutare
+MIN_BETS = 30                                # giocate minime per la classifica a video
+CAL_BINS = 10
+
+# griglia dello sweep
+SWEEP = {
+    "window": ["5", "10", "season"],
+    "xg_weight": [0.0, 0.5, 1.0],
+    "home_adv": [1.0, 1.1, 1.2],
+}
+
+# colonne lette dal feature store: chiavi, risultato e medie delle finestre dello sweep
+COLUMNS = (["league", "season", "date", "kickoff", "home", "away", "gh", "ga", "h_played", "a_played"]
+           + [f"{side}_{c}_{w}" for side in ("h", "a") for c in ("gf", "ga", "xgf", "xga")
+              for w in SWEEP["window"]])
+
+# ───────────────────────────────────────────────────
+# Dati
+# ───────────────────────────────────────────────────
+def load_dataset(leagues: Optional[List[str]] = None, seasons: Optional[List[str]] = None) -> pd.DataFrame:
+    df = feature_store.load(leagues, seasons, columns=COLUMNS)
+    if df.empty:
+        return df
+    df = df[(df["h_played"] >= MIN_PLAYED) & (df["a_played"] >= MIN_PLAYED)]
+    return df.reset_index(drop=True)
+
+def outcomes(gh: np.ndarray, ga: np.ndarray) -> Dict[str, np.ndarray]:
+    """Esiti 0/1 per mercato: le stesse maschere dei mercati applicate al risultato reale."""
+    n = len(gh)
+    grid = np.zeros((n, MAX_GOALS + 1, MAX_GOALS + 1))
+    grid[np.arange(n), np.minimum(gh, MAX_GOALS).astype(int), np.minimum(ga, MAX_GOALS).astype(int)] = 1.0
+    return {k: v > 0.5 for k, v in market_probabilities(grid).items()}
+
+def load_odds(df: pd.DataFrame, markets: List[str]) -> Optional[np.ndarray]:
+    """Quote storiche (partite × mercati), NaN dove mancano; None se non ci sono file."""
+    frames = [_read_csv(p) for p in sorted(glob.glob(ODDS_GLOB))]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return None
+    o = pd.concat(frames, ignore_index=True)
+    o["_k"] = (pd.to_datetime(o["Giorno"], errors="coerce").dt.strftime("%Y-%m-%d") + "|"
+               + o["Squadra Casa"].str.strip() + "|" + o["Squadra Trasferta"].str.strip())
+    o["Quota"] = pd.to_numeric(o["Quota"].str.replace(",", ".", regex=False), errors="coerce")
+    wide = o.pivot_table(index="_k", columns="Mercato", values="Quota", aggfunc="last")
+    keys = df["date"].dt.strftime("%Y-%m-%d") + "|" + df["home"] + "|" + df["away"]
+    return wide.reindex(index=keys, columns=markets).to_numpy(dtype=float)
+
+# ───────────────────────────────────────────────────
+# Modello + valutazione (vettoriali)
+# ───────────────────────────────────────────────────
+def expected_goals(df: pd.DataFrame, window: str, xg_weight: float, home_adv: float) -> Tuple[np.ndarray, np.ndarray]:
+    """λ = media(attacco squadra, difesa avversaria) sulla finestra, × / ÷ fattore casa."""
+    def rate(side, kind):
+        g = df[f"{side}_{'gf' if kind == 'for' else 'ga'}_{window}"].to_numpy(dtype=float)
+        x = df[f"{side}_{'xgf' if kind == 'for' else 'xga'}_{window}"].to_numpy(dtype=float)
+        return np.where(np.isfinite(x), (1 - xg_weight) * g + xg_weight * x, g)
+
+    lam_h = 0.5 * (rate("h", "for") + rate("a", "against")) * home_adv
+    lam_a = 0.5 * (rate("a", "for") + rate("h", "against")) / home_adv
+    return np.maximum(np.nan_to_num(lam_h), MIN_RATE), np.maximum(np.nan_to_num(lam_a), MIN_RATE)
+
+def evaluate(P: np.ndarray, O: np.ndarray, odds: Optional[np.ndarray], markets: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    P, O, odds: (partite, mercati); odds None senza quote storiche (ROI NaN).
+    Ritorna (report per soglia, calibrazione per fascia).
+    """
+    if odds is None:
+        odds = np.full(P.shape, np.nan)
+    sel = P[:, :, None] >= THRESHOLDS[None, None, :]                 # (n, m, k)
+    priced = np.isfinite(odds)[:, :, None]
+    bets = sel.sum(axis=0)
+    hits = (sel & O[:, :, None]).sum(axis=0)
+    psum = (sel * P[:, :, None]).sum(axis=0)
+    stake = (sel & priced).sum(axis=0)
+    ret = (sel * priced * (O * np.nan_to_num(odds))[:, :, None]).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        report = pd.DataFrame({
+            "market": np.repeat(markets, len(THRESHOLDS)),
+            "threshold": np.tile(np.round(THRESHOLDS * 100).astype(int), len(markets)),
+            "bets": bets.ravel(),
+            "hits": hits.ravel(),
+            "hit_rate": np.round((hits / bets).ravel() * 100, 2),
+            "avg_prob": np.round((psum / bets).ravel() * 100, 2),
+            "gap": np.round(((hits - psum) / bets).ravel() * 100, 2),
+            "priced": stake.ravel(),
+            "roi": np.round((ret / stake - 1).ravel() * 100, 2),
+        })
+
+    # calibrazione: fasce di probabilità per mercato (bincount su indice mercato×fascia)
+    m = P.shape[1]
+    b = np.minimum((P * CAL_BINS).astype(int), CAL_BINS - 1)
+    flat = (np.arange(m)[None, :] * CAL_BINS + b).ravel()
+    cnt = np.bincount(flat, minlength=m * CAL_BINS)
+    sp = np.bincount(flat, weights=P.ravel(), minlength=m * CAL_BINS)
+    so = np.bincount(flat, weights=O.ravel().astype(float), minlength=m * CAL_BINS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cal = pd.DataFrame({
+            "market": np.repeat(markets, CAL_BINS),
+            "bin": np.tile([f"{i * 100 // CAL_BINS}-{(i + 1) * 100 // CAL_BINS}" for i in range(CAL_BINS)], m),
+            "n": cnt,
+            "avg_prob": np.round(sp / cnt * 100, 2),
+            "freq": np.round(so / cnt * 100, 2),
+        })
+    cal = cal[cal["n"] > 0]
+    return report, cal
+
+# ───────────────────────────────────────────────────
+# Sweep (process pool)
+# ───────────────────────────────────────────────────
+_DATA: Dict = {}
+
+def _init(df: pd.DataFrame, odds: Optional[np.ndarray]):
+    """Dataset caricato una volta per processo (non a ogni task)."""
+    _DATA["df"] = df
+    o = outcomes(df["gh"].to_numpy(), df["ga"].to_numpy())
+    _DATA["markets"] = list(o)
+    _DATA["O"] = np.column_stack([o[k] for k in _DATA["markets"]])
+    _DATA["odds"] = odds
+
+def run_config(cfg: Dict) -> Tuple[Dict, pd.DataFrame, pd.DataFrame, float]:
+    df, markets, O = _DATA["df"], _DATA["markets"], _DATA["O"]
+    lam_h, lam_a = expected_goals(df, **cfg)
+    probs = market_probabilities(score_grid(lam_h, lam_a))
+    P = np.clip(np.column_stack([probs[k] for k in markets]), 0.0, 1.0)
+    report, cal = evaluate(P, O, _DATA["odds"], markets)
+    brier = float(np.mean((P - O) ** 2))
+    for frame in (report, cal):
+        for i, (k, v) in enumerate(cfg.items()):
+            frame.insert(i, k, v)
+    return cfg, report, cal, brier
+
+def sweep(df: pd.DataFrame, workers: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame, List]:
+    configs = [dict(zip(SWEEP, vals)) for vals in itertools.product(*SWEEP.values())]
+    _init(df, None)
+    odds = load_odds(df, _DATA["markets"])
+    if workers == 1:
+        _init(df, odds)
+        results = [run_config(c) for c in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(df, odds)) as ex:
+            results = list(ex.map(run_config, configs))
+    report = pd.concat([r[1] for r in results], ignore_index=True)
+    cal = pd.concat([r[2] for r in results], ignore_index=True)
+    briers = sorted(((r[3], r[0]) for r in results), key=lambda x: x[0])
+    return report, cal, briers
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build(leagues: Optional[List[str]] = None, seasons: Optional[List[str]] = None,
+          workers: Optional[int] = None):
+    t0 = time.perf_counter()
+    df = load_dataset(leagues, seasons)
+    if df.empty:
+        print("Nessuna partita nel feature store: esegui prima SCRAPER/feature_store.py.")
+        return
+    report, cal, briers = sweep(df, workers=workers)
+    has_odds = bool((report["priced"] > 0).any())
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    report.to_csv(REPORT_CSV, index=False, encoding="utf-8-sig")
+    cal.to_csv(CALIBRATION_CSV, index=False, encoding="utf-8-sig")
+
+    print(f"[BACKTEST] {len(df)} partite × {report['market'].nunique()} mercati × "
+          f"{len(THRESHOLDS)} soglie × {len(briers)} configurazioni ({elapsed:.1f}s)")
+    for score, cfg in briers[:3]:
+        print(f"  Brier {score:.4f}  {cfg}")
+    best = dict(briers[0][1])
+    top = report[(report["bets"] >= MIN_BETS) & (report[list(best)] == pd.Series(best)).all(axis=1)]
+    if has_odds:
+        top = top[top["priced"] >= MIN_BETS].nlargest(10, "roi")
+        cols = ["market", "threshold", "bets", "priced", "hit_rate", "avg_prob", "roi"]
+    else:
+        print("[INFO] nessuna quota storica: niente ROI, solo calibrazione (gap = hit rate − probabilità media)")
+        top = top.loc[top["gap"].abs().nlargest(10).index]   # soglie meno calibrate
+        cols = ["market", "threshold", "bets", "hit_rate", "avg_prob", "gap"]
+    if not top.empty:
+        print(top[cols].to_string(index=False))
+    print(f"💾 Salvato: {REPORT_CSV}, {CALIBRATION_CSV}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest vettoriale dei mercati suggeriti")
+    ap.add_argument("--leagues", nargs="*", help="es. serie_a premier_league")
+    ap.add_argument("--seasons", nargs="*", help="es. 2024-2025")
+    ap.add_argument("--workers", type=int, default=None, help="processi (default: tutti i core)")
+    args = ap.parse_args()
+    try:
+        build(args.leagues, args.seasons, args.workers)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# coding: utf-8
+"""
+Benchmark di scalabilità del refresh al crescere delle competizioni del registro
+- Stand-in del replay: archivio pagine temporaneo (page_archive) con una pagina sintetica
+  per ogni URL che gli script chiederebbero con le prime N competizioni di competitions.py
+  (tabelle con gli id e i data-stat attesi, ROWS righe ciascuna)
+- Ogni script gira in un interprete nuovo come nel rebuild offline: FBREF_REPLAY_AT,
+  VirtualClock, FBREF_COMPETITIONS = prime N, FBREF_RATE_PER_MIN = limite; ogni pagina
+  servita costa LATENCY secondi virtuali (download simulato)
+- Per N × limite: pagine, tempo virtuale del refresh, secondi per pagina, attese del rate
+  limit e altre attese (pause fisse): il tempo deve seguire pagine × 60 / limite, senza
+  pause per lega in più
+
+Uso:
+  python SCRAPER/bench_scaling.py
+  python SCRAPER/bench_scaling.py --sizes 6 12 23 --rates 10 20 --latency 1.5
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Set
+
+from competitions import COMPETITIONS, PLAYERS, SCHEDULE, SQUADS, STANDINGS, Competition
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# script guidati dal registro (le pagine Champions non dipendono da N)
+SCRIPTS = [
+    "classifiche.py",
+    "current_matches.py",
+    "download_old.py",
+    "team_performance.py",
+    "opponent_performance.py",
+    "league_players.py",
+]
+
+SNAPSHOT_AT = "2025-09-01T12:00:00Z"
+REPLAY_AT = "2025-09-01T23:59:59Z"
+ROWS = 20
+
+# ───────────────────────────────────────────────────
+# Pagine sintetiche
+# ───────────────────────────────────────────────────
+# (intestazione, data-stat, valore): le colonne con intestazione fino a PrgP servono alle
+# tabelle lette per intestazione, le altre solo per data-stat (classifiche, calendari, misc)
+def _cells(i: int):
+    return [
+        ("Giocatore", "player", f'<a href="/it/giocatori/{i:08x}/G{i}">Giocatore {i}</a>'),
+        ("Nazione", "nationality", "it ITA"),
+        ("Ruolo", "position", "FW"),
+        ("Squadra", "team", f"Squadra {i}"),
+        ("Competizione", "comp_level", "Lega"),
+        ("# Pl", "players_used", "20"),
+        ("Età", "age", "27"),
+        ("Nato", "birth_year", "1998"),
+        ("Poss.", "possession", "50"),
+        ("PG", "games", "5"),
+        ("Tit", "games_starts", "55"),
+        ("Min", "minutes", "450"),
+        ("90 min", "minutes_90s", "5.0"),
+        ("Reti", "goals", "3"),
+        ("Assist", "assists", "2"),
+        ("G+A", "goals_assists", "5"),
+        ("R - Rig", "goals_pens", "3"),
+        ("Rigori", "pens_made", "0"),
+        ("Rig T", "pens_att", "0"),
+        ("Amm.", "cards_yellow", "1"),
+        ("Esp.", "cards_red", "0"),
+        ("xG", "xg", "2.5"),
+        ("npxG", "npxg", "2.5"),
+        ("xAG", "xg_assist", "1.5"),
+        ("npxG+xAG", "npxg_xg_assist", "4.0"),
+        ("PrgC", "progressive_carries", "10"),
+        ("PrgP", "progressive_passes", "20"),
+        ("", "fouls", "5"), ("", "fouled", "6"), ("", "offsides", "1"),
+        ("", "shots", "10"), ("", "shots_on_target", "4"),
+        ("", "wins", "3"), ("", "ties", "1"), ("", "losses", "1"),
+        ("", "goals_for", "8"), ("", "goals_against", "4"), ("", "goal_diff", "+4"),
+        ("", "points", "10"), ("", "xg_for", "7.1"), ("", "xg_against", "4.2"),
+        ("", "gameweek", "1"), ("", "date", "2025-08-24"), ("", "start_time", "20:45"),
+        ("", "home_team", f"Squadra {i}"), ("", "home_xg", "1.2"), ("", "score", "2–1"),
+        ("", "away_xg", "0.8"), ("", "away_team", f"Squadra {i + 1}"),
+    ]
+
+def _table(table_id: str) -> str:
+    head = "".join(f"<th>{label}</th>" for label, _, _ in _cells(0))
+    rows = "".join(
+        f'<tr><th scope="row" data-stat="rank">{i}</th>'
+        + "".join(f'<td data-stat="{ds}">{val}</td>' for _, ds, val in _cells(i)) + "</tr>"
+        for i in range(1, ROWS + 1))
+    return (f'<table id="{table_id}"><thead><tr><th></th></tr><tr><th>Rk</th>{head}</tr></thead>'
+            f"<tbody>{rows}</tbody></table>")
+
+def _page(table_ids: Set[str]) -> str:
+    return "<html><body>" + "".join(_table(t) for t in sorted(table_ids)) + "</body></html>"
+
+def pages_for_comps(comps: List[Competition]) -> Dict[str, Set[str]]:
+    """URL → id tabella che gli script cercano su quella pagina."""
+    import team_performance
+    import opponent_performance
+    import league_players
+
+    pages: Dict[str, Set[str]] = {}
+    add = lambda url, tid: pages.setdefault(url, set()).add(tid)
+    for c in comps:
+        if STANDINGS in c.pages:
+            add(c.standings_urls()[0], c.standings_table())
+        if SCHEDULE in c.pages:
+            for back in (0, 1):
+                add(c.schedule_url(back), "sched_all" if c.cup else f"sched_{c.season_label(back)}_{c.comp_id}_1")
+    for page, modules in ((SQUADS, (team_performance, opponent_performance)), (PLAYERS, (league_players,))):
+        with_page = [c for c in comps if page in c.pages]
+        for m in modules:
+            if any(c.big5 for c in with_page):
+                for t in m.SPEC.tables:
+                    add(t.url, t.table_id)
+            for c in with_page:
+                if not c.big5:
+                    for t in m.COMP_SPEC.tables:
+                        add(t.url.format(**c.params()), t.table_id.format(**c.params()))
+    return pages
+
+@contextmanager
+def replay_at(instant: str) -> Iterator[None]:
+    """FBREF_REPLAY_AT impostata solo dentro il blocco; all'uscita torna il valore precedente."""
+    from page_archive import REPLAY_ENV
+
+    prev = os.environ.get(REPLAY_ENV)
+    os.environ[REPLAY_ENV] = instant
+    try:
+        yield
+    finally:
+        if prev is None:
+            os.environ.pop(REPLAY_ENV, None)
+        else:
+            os.environ[REPLAY_ENV] = prev
+
+def make_archive(root: str, comps: List[Competition]) -> int:
+    from page_archive import PageArchive
+
+    arch = PageArchive(root)
+    ts = datetime.strptime(SNAPSHOT_AT, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    # id di tabelle e URL per stagione come li vedono gli script in replay a REPLAY_AT
+    with replay_at(REPLAY_AT):
+        pages = pages_for_comps(comps)
+    for url, tids in pages.items():
+        arch.store(url, _page(tids), fetched_at=ts)
+    return len(pages)
+
+# ───────────────────────────────────────────────────
+# Esecuzione di uno script in replay
+# ───────────────────────────────────────────────────
+_PROBE = r"""
+import sys, json, runpy
+sys.path.insert(0, {dir!r})
+import clock, page_archive
+vc = clock.get_clock()
+_replay = page_archive.replay
+served = []
+def replay(url):
+    vc.advance({latency!r})   # download simulato
+    served.append(url)
+    return _replay(url)
+page_archive.replay = replay
+sys.argv = [{script!r}]
+try:
+    runpy.run_path({path!r}, run_name="__main__")
+except SystemExit:
+    pass
+limit = sum(s.seconds for s in vc.sleeps if s.caller.startswith("fbref_http"))
+print(json.dumps({{"elapsed": vc.monotonic(), "pages": len(served), "limit": limit,
+                  "other": vc.total_slept - limit}}))
+vc.reset()
+"""
+
+def run_script(script: str, workdir: str, archive: str, keys: List[str], rate: float, latency: float) -> Dict:
+    env = dict(os.environ)
+    env.update({
+        "FBREF_REPLAY_AT": REPLAY_AT,
+        "FBREF_ARCHIVE_DIR": archive,
+        "FBREF_VIRTUAL_CLOCK": "1",
+        "FBREF_COMPETITIONS": ",".join(keys),
+        "FBREF_RATE_PER_MIN": str(rate),
+    })
+    code = _PROBE.format(dir=SCRAPER_DIR, latency=latency, script=script,
+                         path=os.path.join(SCRAPER_DIR, script))
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if out.returncode != 0 or not lines:
+        raise RuntimeError((out.stderr.strip().splitlines() or ["errore"])[-1])
+    res = json.loads(lines[-1])
+    res["wall"] = wall
+    return res
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def bench(sizes: List[int], rates: List[float], latency: float, keep: bool = False):
+    root = tempfile.mkdtemp(prefix="bench_scaling_")
+    try:
+        print(f"{'comp.':>5}{'limite/min':>11}{'pagine':>8}{'refresh s':>11}{'s/pagina':>10}"
+              f"{'60/limite':>10}{'attese limite':>15}{'altre attese':>14}{'reale s':>9}")
+        for n in sizes:
+            comps = COMPETITIONS[:n]
+            keys = [c.key for c in comps]
+            archive = os.path.join(root, f"archive_{n}")
+            make_archive(archive, comps)
+            for rate in rates:
+                workdir = os.path.join(root, f"run_{n}_{rate:g}")
+                os.makedirs(workdir, exist_ok=True)
+                tot = {"elapsed": 0.0, "pages": 0, "limit": 0.0, "other": 0.0, "wall": 0.0}
+                for script in SCRIPTS:
+                    res = run_script(script, workdir, archive, keys, rate, latency)
+                    for k in tot:
+                        tot[k] += res[k]
+                per_page = tot["elapsed"] / tot["pages"] if tot["pages"] else 0.0
+                print(f"{n:>5}{rate:>11g}{tot['pages']:>8}{tot['elapsed']:>11.0f}{per_page:>10.2f}"
+                      f"{60 / rate:>10.2f}{tot['limit']:>15.0f}{tot['other']:>14.0f}{tot['wall']:>9.1f}")
+    finally:
+        if keep:
+            print(f"[INFO] file del benchmark in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    ap = argparse.ArgumentParser(description="Scalabilità del refresh con il registro competizioni")
+    ap.add_argument("--sizes", type=int, nargs="*", default=[6, 12, len(COMPETITIONS)],
+                    help="numero di competizioni (prime N del registro)")
+    ap.add_argument("--rates", type=float, nargs="*", default=[10, 20], help="richieste al minuto")
+    ap.add_argument("--latency", type=float, default=1.5, help="secondi simulati per pagina")
+    ap.add_argument("--keep", action="store_true", help="non cancellare archivio e output")
+    args = ap.parse_args()
+    try:
+        bench(args.sizes, args.rates, args.latency, args.keep)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+Benchmark tempi di avvio degli script SCRAPER
+Per ogni modulo, in un interprete nuovo (cold start):
+ - import      : `import <modulo>`
+ - no-op       : import + chiamata di un helper/entry point che non scarica nulla
+ - eager       : costo che l'import pagava prima (pandas + bs4 + cloudscraper + sessione)
+e quali moduli pesanti risultano effettivamente caricati dopo l'import.
+
+Uso:
+  python SCRAPER/bench_startup.py [--repeat 5]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# no-op per modulo: niente rete, niente scritture
+NOOP = {
+    "current_matches": "m.remove_country_codes('itInter')",
+    "download_old": "m.remove_country_code('engArsenal')",
+    "classifiche": "m.main(only=['__nessuna__'])",
+    "team_performance": "__import__('table_spec').compile_table(m.SPEC.tables[0])",
+    "opponent_performance": "__import__('table_spec').compile_table(m.SPEC.tables[0])",
+    "league_players": "m.normalize_numeric_str('1,5'); m.map_role('DF,MF')",
+    "champions_league_players": "__import__('table_spec').compile_table(m.SPEC.tables[0])",
+    "champions_casa": "__import__('table_spec').compile_table(m.SPEC.tables[0])",
+    "champions_avversari": "__import__('table_spec').compile_table(m.SPEC.tables[0])",
+}
+
+HEAVY = ("pandas", "bs4", "lxml.html", "requests", "cloudscraper")
+
+_PROBE = r"""
+import sys, time, json
+sys.path.insert(0, {dir!r})
+t0 = time.perf_counter()
+{pre}
+m = __import__({mod!r})
+t1 = time.perf_counter()
+{noop}
+t2 = time.perf_counter()
+loaded = [n for n in {heavy!r}
+          if n in sys.modules and type(sys.modules[n]).__name__ != "_LazyModule"]
+print(json.dumps({{"import": t1 - t0, "noop": t2 - t0, "loaded": loaded}}))
+"""
+
+_EAGER = "import pandas, bs4, cloudscraper; cloudscraper.create_scraper(interpreter='nodejs')"
+
+def _probe(mod: str, noop: str, pre: str = "") -> dict:
+    code = _PROBE.format(dir=SCRAPER_DIR, mod=mod, noop=noop, heavy=HEAVY, pre=pre)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=SCRAPER_DIR)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "errore")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def bench(repeat: int = 5):
+    print(f"{'modulo':<28}{'import ms':>10}{'no-op ms':>10}{'eager ms':>10}  caricati dopo import")
+    for mod, noop in NOOP.items():
+        try:
+            runs = [_probe(mod, noop) for _ in range(repeat)]
+            eager = [_probe(mod, noop, pre=_EAGER) for _ in range(max(1, repeat // 2))]
+        except Exception as e:
+            print(f"{mod:<28}  errore: {e}")
+            continue
+        imp = statistics.median(r["import"] for r in runs) * 1000
+        nop = statistics.median(r["noop"] for r in runs) * 1000
+        eag = statistics.median(r["import"] for r in eager) * 1000
+        loaded = ",".join(runs[-1]["loaded"]) or "-"
+        print(f"{mod:<28}{imp:>10.1f}{nop:>10.1f}{eag:>10.1f}  {loaded}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark avvio moduli SCRAPER")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    bench(args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# coding: utf-8
+"""
+Change feed per riga tra un refresh e il precedente
+- Confronta ogni dataset appena scritto dagli scraper con la versione del run precedente
+  usando chiavi naturali: (giocatore, squadra), (lega, squadra), (lega, data, casa, trasferta)
+- Diff vettoriale: merge esterno sulle chiavi + confronto colonna per colonna su array,
+  nessun loop per riga; change set colonnare (array delle chiavi, maschera e valori
+  per colonna) invece di un oggetto per riga
+- Pubblica un change set compatto per run e un changelog a finestra mobile;
+  i client (lib/utils/change-feed.ts) e i job a valle (apply_changes) applicano i delta
+  invece di ricaricare gli snapshot completi
+- Ogni delta viene verificato riapplicandolo alla base: se non riproduce il dataset
+  il file passa a snapshot completo
+
+Formato di un file nel change set:
+  added:   {colonna: [valori]}
+  removed: {chiave: [valori]}
+  changed: {"keys": {chiave: [valori]}, "mask": {colonna: [0|1 per riga]},
+            "values": {colonna: [valori delle sole righe con 1]}}
+
+Uso (lanciato da scheduler.py dopo ogni job, prima di publish.py):
+  python SCRAPER/change_feed.py
+
+Output:
+ - public/data/changes/<run_id>.json
+ - public/data/changes/changelog.json
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import glob
+import shutil
+import hashlib
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fbref_http import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+DATA_DIR = os.path.join("public", "data")
+CHANGES_DIR = os.path.join(DATA_DIR, "changes")
+CHANGELOG = os.path.join(CHANGES_DIR, "changelog.json")
+# copia dei dataset all'ultimo diff (base dei delta); fuori da public/ → non pubblicata
+BASE_DIR = os.path.join(".cache", "change_feed", "base")
+KEEP_RUNS = 60
+
+PLAYER_KEYS = [["ID Giocatore", "Squadra"], ["Giocatore", "Squadra"]]
+MATCH_KEYS = [["Campionato", "Giorno", "Squadra Casa", "Squadra Trasferta"]]
+
+# nome logico (glob relativo a DATA_DIR) → chiavi candidate, la prima presente vince
+DATASETS: Dict[str, List[List[str]]] = {
+    "players/league_players.csv": PLAYER_KEYS,
+    "players/champions_league_players.csv": PLAYER_KEYS,
+    "standings/*.csv": [["Lega", "Squadra"]],
+    "team_performance.csv": [["Competizione", "Squadra"]],
+    "opponent_performance.csv": [["Competizione", "Squadra"]],
+    "champions_casa.csv": [["Squadra"]],
+    "champions_avversari.csv": [["Squadra"]],
+    "players/matches_season.csv": MATCH_KEYS,
+    "all_leagues_matches.csv": MATCH_KEYS,
+}
+
+# ───────────────────────────────────────────────────
+# Lettura
+# ───────────────────────────────────────────────────
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def read_table(path: str) -> pd.DataFrame:
+    """Tutto come stringa: il diff confronta esattamente ciò che viene pubblicato."""
+    return pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+
+def _git_head_copy(logical: str, dest: str) -> bool:
+    """Prima esecuzione senza base locale: usa la versione committata (run precedente)."""
+    git_path = f"{DATA_DIR}/{logical}".replace(os.sep, "/")
+    try:
+        out = subprocess.run(["git", "show", f"HEAD:{git_path}"], capture_output=True, check=False)
+    except Exception:
+        return False
+    if out.returncode != 0:
+        return False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as f:
+        f.write(out.stdout)
+    return True
+
+def pick_keys(df: pd.DataFrame, candidates: List[List[str]]) -> Optional[List[str]]:
+    for keys in candidates:
+        if all(k in df.columns for k in keys):
+            return keys
+    return None
+
+# ───────────────────────────────────────────────────
+# Diff vettoriale
+# ───────────────────────────────────────────────────
+def _columns(df: pd.DataFrame) -> Dict[str, List]:
+    return {c: df[c].tolist() for c in df.columns}
+
+def diff_frames(old: pd.DataFrame, new: pd.DataFrame, keys: List[str]) -> Dict:
+    """
+    Ritorna {"added", "removed", "changed"} in forma colonnare (vedi docstring del modulo).
+    Le chiavi duplicate tengono l'ultima occorrenza (come un upsert).
+    """
+    old = old.drop_duplicates(subset=keys, keep="last")
+    new = new.drop_duplicates(subset=keys, keep="last")
+    values = [c for c in new.columns if c not in keys]
+    shared = [c for c in values if c in old.columns]
+
+    m = old.merge(new, on=keys, how="outer", suffixes=("__old", ""), indicator=True)
+    state = m["_merge"]
+
+    added = m.loc[state == "right_only", keys + values]
+    removed = m.loc[state == "left_only", keys]
+
+    both = m[state == "both"]
+    changed: Dict = {"keys": {k: [] for k in keys}, "mask": {}, "values": {}}
+    if not both.empty and shared:
+        a = both[[f"{c}__old" for c in shared]].to_numpy(dtype=object)
+        b = both[shared].to_numpy(dtype=object)
+        diff = a != b
+        rows = np.flatnonzero(diff.any(axis=1))
+        if rows.size:
+            changed["keys"] = _columns(both[keys].iloc[rows])
+            cols = np.flatnonzero(diff[rows].any(axis=0))
+            d, v = diff[rows][:, cols], b[rows][:, cols]
+            changed["mask"] = {shared[j]: d[:, i].astype(int).tolist() for i, j in enumerate(cols)}
+            changed["values"] = {shared[j]: v[d[:, i], i].tolist() for i, j in enumerate(cols)}
+
+    return {"added": _columns(added), "removed": _columns(removed), "changed": changed}
+
+def _count(part: Dict) -> int:
+    return len(next(iter(part.values()), []))
+
+def apply_changes(df: pd.DataFrame, change: Dict) -> pd.DataFrame:
+    """
+    Applica a `df` (la base, tutto stringa) il delta di un file del change set: via le righe
+    rimosse, nuovi valori sulle righe cambiate, righe aggiunte in coda.
+    """
+    keys = change["keys"]
+    out = df.drop_duplicates(subset=keys, keep="last").set_index(keys)
+
+    removed = change["removed"]
+    if _count(removed):
+        out = out.drop(pd.MultiIndex.from_arrays([removed[k] for k in keys], names=keys)
+                       if len(keys) > 1 else pd.Index(removed[keys[0]], name=keys[0]))
+
+    changed = change["changed"]
+    if _count(changed["keys"]):
+        idx = (pd.MultiIndex.from_arrays([changed["keys"][k] for k in keys], names=keys)
+               if len(keys) > 1 else pd.Index(changed["keys"][keys[0]], name=keys[0]))
+        for col, mask in changed["mask"].items():
+            sel = np.asarray(mask, dtype=bool)
+            out.loc[idx[sel], col] = changed["values"][col]
+
+    out = out.reset_index()[list(df.columns)]
+    if _count(change["added"]):
+        out = pd.concat([out, pd.DataFrame(change["added"])[list(df.columns)]], ignore_index=True)
+    return out
+
+def _same_rows(a: pd.DataFrame, b: pd.DataFrame, keys: List[str]) -> bool:
+    """Stesso contenuto a meno dell'ordine delle righe."""
+    a = a.drop_duplicates(subset=keys, keep="last").sort_values(keys, kind="stable").reset_index(drop=True)
+    b = b.drop_duplicates(subset=keys, keep="last").sort_values(keys, kind="stable").reset_index(drop=True)
+    return a.equals(b)
+
+# ───────────────────────────────────────────────────
+# Run
+# ───────────────────────────────────────────────────
+def _expand() -> List[Tuple[str, List[List[str]]]]:
+    out = []
+    for pattern, keys in DATASETS.items():
+        for path in sorted(glob.glob(os.path.join(DATA_DIR, pattern))):
+            out.append((os.path.relpath(path, DATA_DIR).replace(os.sep, "/"), keys))
+    return out
+
+def diff_dataset(logical: str, candidates: List[List[str]]) -> Optional[Dict]:
+    cur_path = os.path.join(DATA_DIR, logical)
+    base_path = os.path.join(BASE_DIR, logical)
+    cur_sha = _sha256(cur_path)
+
+    if not os.path.exists(base_path) and not _git_head_copy(logical, base_path):
+        return {"full": True, "reason": "nessuna base", "sha256": cur_sha}
+
+    base_sha = _sha256(base_path)
+    if base_sha == cur_sha:
+        return None
+
+    old, new = read_table(base_path), read_table(cur_path)
+    keys = pick_keys(new, candidates)
+    if keys is None or not all(k in old.columns for k in keys) or list(old.columns) != list(new.columns):
+        return {"full": True, "reason": "schema cambiato", "base_sha256": base_sha, "sha256": cur_sha}
+
+    d = diff_frames(old, new, keys)
+    d.update({"keys": keys, "base_sha256": base_sha, "sha256": cur_sha})
+    if not _same_rows(apply_changes(old, d), new, keys):
+        return {"full": True, "reason": "delta non riapplicabile", "base_sha256": base_sha, "sha256": cur_sha}
+    return d
+
+def _save_base(logical: str):
+    dest = os.path.join(BASE_DIR, logical)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    shutil.copyfile(os.path.join(DATA_DIR, logical), dest)
+
+def load_changelog() -> Dict:
+    if not os.path.exists(CHANGELOG):
+        return {"runs": []}
+    try:
+        with open(CHANGELOG, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {"runs": []}
+
+def _write_json(path: str, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def run() -> Optional[Dict]:
+    now = datetime.now(timezone.utc)
+    run_id = now.strftime("%Y%m%dT%H%M%SZ")
+    files: Dict[str, Dict] = {}
+
+    for logical, candidates in _expand():
+        try:
+            d = diff_dataset(logical, candidates)
+        except Exception as e:
+            print(f"[WARN] diff {logical}: {e}")
+            d = {"full": True, "reason": str(e)}
+        if d is not None:
+            files[logical] = d
+        _save_base(logical)
+
+    if not files:
+        print("Nessuna modifica rispetto al run precedente.")
+        return None
+
+    change_set = {"run": run_id, "generated": now.strftime("%Y-%m-%dT%H:%M:%SZ"), "files": files}
+    _write_json(os.path.join(CHANGES_DIR, f"{run_id}.json"), change_set)
+
+    summary = {}
+    for logical, d in files.items():
+        if d.get("full"):
+            summary[logical] = {"full": True}
+        else:
+            summary[logical] = {"added": _count(d["added"]), "removed": _count(d["removed"]),
+                                "changed": _count(d["changed"]["keys"])}
+            summary[logical]["base_sha256"] = d["base_sha256"]
+            summary[logical]["sha256"] = d["sha256"]
+
+    log = load_changelog()
+    log["runs"] = ([{"run": run_id, "generated": change_set["generated"],
+                     "file": f"changes/{run_id}.json", "files": summary}] + log.get("runs", []))
+    dropped, log["runs"] = log["runs"][KEEP_RUNS:], log["runs"][:KEEP_RUNS]
+    _write_json(CHANGELOG, log)
+    for r in dropped:
+        old = os.path.join(DATA_DIR, r["file"])
+        if os.path.exists(old):
+            os.remove(old)
+
+    for logical, s in summary.items():
+        desc = "snapshot completo" if s.get("full") else \
+            f"+{s['added']} -{s['removed']} ~{s['changed']}"
+        print(f"[DIFF] {logical}: {desc}")
+    print(f"💾 Change set: changes/{run_id}.json")
+    return change_set
+
+def main():
+    try:
+        run()
+    except Exception as e:
+        print(f"❌ Errore change feed: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# coding: utf-8
+"""
+Clearance Cloudflare persistente tra un run e l'altro
+- Dopo una risposta valida salva i cookie del dominio (cf_clearance, __cf_bm, ...)
+  insieme allo User-Agent per cui sono stati emessi e alla loro scadenza
+- Le nuove sessioni (fbref_http.new_scraper) partono da questi cookie + UA finché
+  sono validi → la prima richiesta del run non ripaga la challenge
+- Una pagina di blocco invalida subito la voce
+- Cifratura a riposo con Fernet (`cryptography`, in requirements.txt); chiave da
+  FBREF_CLEARANCE_KEY o, in mancanza, da un file locale 0600 generato al primo uso.
+  Se `cryptography` manca la persistenza è disattivata (nessun salvataggio in chiaro).
+
+Output:
+ - .cache/clearance/fbref.bin   (fuori da public/, ignorato da git)
+ - .cache/clearance/key         (solo se FBREF_CLEARANCE_KEY non è impostata)
+"""
+
+from __future__ import annotations
+
+import os
+import json
+from typing import Dict, List, Optional
+
+import clock
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+STORE_DIR = os.path.join(".cache", "clearance")
+STORE_FILE = os.path.join(STORE_DIR, "fbref.bin")
+KEY_FILE = os.path.join(STORE_DIR, "key")
+KEY_ENV = "FBREF_CLEARANCE_KEY"
+
+# cookie di sessione (senza expires) e tetto massimo in ogni caso: Cloudflare può
+# revocare prima della scadenza dichiarata, meglio non fidarsi per giorni
+MAX_AGE = 6 * 3600
+# margine prima della scadenza: non seminare cookie che scadono a metà run
+SAFETY_MARGIN = 120
+
+_WARNED = False
+
+# ───────────────────────────────────────────────────
+# Chiave / cifratura
+# ───────────────────────────────────────────────────
+def enabled() -> bool:
+    global _WARNED
+    if Fernet is None:
+        if not _WARNED:
+            print("[WARN] cryptography non installato (pip install -r requirements.txt): clearance Cloudflare non persistita")
+            _WARNED = True
+        return False
+    return True
+
+def _write_private(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _fernet():
+    key = os.environ.get(KEY_ENV, "").strip().encode()
+    if not key:
+        if os.path.exists(KEY_FILE):
+            with open(KEY_FILE, "rb") as f:
+                key = f.read().strip()
+        else:
+            key = Fernet.generate_key()
+            _write_private(KEY_FILE, key)
+    return Fernet(key)
+
+# ───────────────────────────────────────────────────
+# Store
+# ───────────────────────────────────────────────────
+def load() -> Optional[Dict]:
+    """Voce valida {"ua", "cookies", "expires", "saved"} oppure None."""
+    if not enabled() or not os.path.exists(STORE_FILE):
+        return None
+    try:
+        with open(STORE_FILE, "rb") as f:
+            entry = json.loads(_fernet().decrypt(f.read()))
+    except (InvalidToken, ValueError, OSError):
+        # chiave cambiata o file corrotto: come se non ci fosse
+        invalidate()
+        return None
+    if entry.get("expires", 0) - SAFETY_MARGIN <= clock.now():
+        invalidate()
+        return None
+    return entry
+
+def save(ua: str, cookies: List[Dict]) -> Optional[Dict]:
+    """Salva cookie + UA; scadenza = la più vicina tra i cookie e MAX_AGE."""
+    if not enabled() or not ua or not cookies:
+        return None
+    now = clock.now()
+    expiries = [c["expires"] for c in cookies if c.get("expires")]
+    expires = min(expiries + [now + MAX_AGE])
+    if expires - SAFETY_MARGIN <= now:
+        return None
+    entry = {"ua": ua, "cookies": cookies, "expires": int(expires), "saved": int(now)}
+    _write_private(STORE_FILE, _fernet().encrypt(json.dumps(entry).encode()))
+    return entry
+
+def invalidate():
+    try:
+        os.remove(STORE_FILE)
+    except FileNotFoundError:
+        pass
+
+# ───────────────────────────────────────────────────
+# Cookie jar ↔ voce
+# ───────────────────────────────────────────────────
+def cookies_from_jar(jar, domain: str = "fbref.com") -> List[Dict]:
+    """Cookie del dominio (e sottodomini) presenti nella sessione requests."""
+    out = []
+    for c in jar:
+        if not c.domain.lstrip(".").endswith(domain):
+            continue
+        out.append({"name": c.name, "value": c.value, "domain": c.domain,
+                    "path": c.path or "/", "expires": c.expires})
+    return out
+
+def has_clearance(cookies: List[Dict]) -> bool:
+    return any(c["name"] == "cf_clearance" for c in cookies)
+
+def seed_jar(jar, entry: Dict):
+    for c in entry["cookies"]:
+        jar.set(c["name"], c["value"], domain=c["domain"], path=c["path"], expires=c.get("expires"))
+
+def signature(cookies: List[Dict]) -> str:
+    """Per non riscrivere lo store se i cookie non sono cambiati."""
+    return "|".join(sorted(f"{c['name']}={c['value']}" for c in cookies))
@@ -0,0 +1,125 @@
+# coding: utf-8
+"""
+Orologio iniettabile per le attese degli scraper (fetch, polite_delay, loop dello scheduler)
+- i lock tra processi (run_lock) restano sul tempo reale: aspettano altri processi veri
+- SystemClock: tempo reale, time.sleep vero (default)
+- VirtualClock: sleep() avanza il tempo simulato all'istante e registra ogni attesa
+  (durata + chiamante) → test e replay su pagine registrate girano in pochi secondi
+  e lo schedule di backoff resta verificabile esattamente (con random.seed fisso)
+- FBREF_VIRTUAL_CLOCK=1 attiva il VirtualClock per un intero processo (replay degli script)
+
+Uso nei moduli:
+  import clock
+  clock.sleep(2.5); clock.now(); clock.monotonic()
+
+Uso nei test/replay:
+  with clock.use(clock.VirtualClock()) as vc:
+      fetch(url)
+  vc.slept   # [1.43, 2.61, ...]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import atexit
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional
+
+# ───────────────────────────────────────────────────
+# Implementazioni
+# ───────────────────────────────────────────────────
+class SystemClock:
+    def now(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+class Sleep(NamedTuple):
+    at: float       # istante simulato di inizio attesa
+    seconds: float
+    caller: str     # "modulo:funzione" che ha chiesto l'attesa
+
+class VirtualClock:
+    """Tempo simulato: parte da `start` (default: adesso) e avanza solo con sleep()/advance()."""
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = time.time() if start is None else float(start)
+        self._start = self._now
+        self.sleeps: List[Sleep] = []
+
+    def now(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now - self._start
+
+    def sleep(self, seconds: float):
+        seconds = max(0.0, float(seconds))
+        frame = sys._getframe(1)
+        # salta i wrapper di questo modulo per registrare il vero chiamante
+        while frame is not None and frame.f_globals.get("__name__") == __name__:
+            frame = frame.f_back
+        caller = f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}" if frame else "?"
+        self.sleeps.append(Sleep(self._now, seconds, caller))
+        self._now += seconds
+
+    def advance(self, seconds: float):
+        """Fa passare tempo senza registrarlo come attesa (es. durata simulata di una richiesta)."""
+        self._now += max(0.0, float(seconds))
+
+    @property
+    def slept(self) -> List[float]:
+        return [s.seconds for s in self.sleeps]
+
+    @property
+    def total_slept(self) -> float:
+        return sum(self.slept)
+
+    def reset(self):
+        self.sleeps.clear()
+
+# ───────────────────────────────────────────────────
+# Orologio corrente
+# ───────────────────────────────────────────────────
+_CLOCK = SystemClock()
+
+if os.environ.get("FBREF_VIRTUAL_CLOCK") == "1":
+    _CLOCK = VirtualClock()
+
+    @atexit.register
+    def _report():
+        if isinstance(_CLOCK, VirtualClock) and _CLOCK.sleeps:
+            print(f"[CLOCK] {len(_CLOCK.sleeps)} attese simulate, {_CLOCK.total_slept:.1f}s risparmiati")
+
+def get_clock():
+    return _CLOCK
+
+def set_clock(c):
+    """Imposta l'orologio globale e ritorna il precedente."""
+    global _CLOCK
+    prev, _CLOCK = _CLOCK, c
+    return prev
+
+@contextmanager
+def use(c) -> Iterator:
+    prev = set_clock(c)
+    try:
+        yield c
+    finally:
+        set_clock(prev)
+
+def now() -> float:
+    return _CLOCK.now()
+
+def monotonic() -> float:
+    return _CLOCK.monotonic()
+
+def sleep(seconds: float):
+    _CLOCK.sleep(seconds)
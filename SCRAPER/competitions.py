@@ -0,0 +1,268 @@
+# coding: utf-8
+"""
+Registro unico delle competizioni FBref usato da tutti gli scraper
+- Una voce per competizione: id FBref, slug degli URL, formato stagione, pagine disponibili
+  (calendario, classifica, statistiche squadre, statistiche giocatori), Big5 o coppa
+- Gli script non hanno più leghe cablate: calendari, classifiche e aggregati squadre/giocatori
+  iterano active(<pagina>); le leghe Big5 restano coperte dalle pagine aggregate Big5,
+  le altre usano le pagine della singola competizione (stessa OutputSpec, URL dal registro)
+- Aggiungere una lega = una riga qui (active=True), oppure FBREF_COMPETITIONS senza toccare il codice
+- pages_for(): pagine scaricate da uno script con le competizioni attive (costi per
+  scheduler.py e shard_plan.py)
+
+Uso:
+  python SCRAPER/competitions.py              # competizioni attive e pagine per script
+  python SCRAPER/competitions.py --all        # tutto il registro
+
+Variabili:
+  FBREF_COMPETITIONS=all                      tutte le competizioni del registro
+  FBREF_COMPETITIONS=serie_a,eredivisie       solo quelle indicate
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import clock
+from fbref_http import BASE_URL
+from page_archive import REPLAY_ENV
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+ENV = "FBREF_COMPETITIONS"
+
+# stagione in corso ricavata dall'istante di riferimento (FBREF_REPLAY_AT in replay,
+# altrimenti clock): da luglio "2025-2026", prima "2024-2025"; "year" = anno solare
+SEASON_START_MONTH = 7
+
+# calendari FBref (matches_season.csv): orari in ora locale, durata di una partita
+# (scheduler.py pianifica i refresh, season_sim.py scarta le partite già finite)
+KICKOFF_TZ = ZoneInfo("Europe/Rome")
+MATCH_LENGTH = timedelta(minutes=115)     # 90' + intervallo + recuperi
+
+SCHEDULE, STANDINGS, SQUADS, PLAYERS = "schedule", "standings", "squads", "players"
+LEAGUE_PAGES = (SCHEDULE, STANDINGS, SQUADS, PLAYERS)
+CUP_PAGES = (SCHEDULE, STANDINGS)   # statistiche Champions: champions_*.py
+
+@dataclass(frozen=True)
+class Competition:
+    key: str                         # serie_a: file delle classifiche, filtri CLI, shard
+    name: str                        # "Serie A": colonne Campionato / Competizione
+    comp_id: int                     # /en/comps/<id>/
+    slug: str                        # segmento degli URL FBref
+    season: str = "split"            # "split" → 2025-2026, "year" → 2025 (MLS, Brasile)
+    pages: Tuple[str, ...] = LEAGUE_PAGES
+    big5: bool = False               # coperta dalle pagine aggregate Big5
+    cup: bool = False                # calendario in un'unica tabella sched_all
+    standings_stage: int = 1         # ultima cifra dell'id results<stagione><id><n>_overall
+    active: bool = True
+
+    def season_label(self, back: int = 0) -> str:
+        ref = reference_time()
+        if self.season == "year":
+            return str(ref.year - back)
+        y = ref.year - (ref.month < SEASON_START_MONTH) - back
+        return f"{y}-{y + 1}"
+
+    @property
+    def en_base(self) -> str:
+        return f"{BASE_URL}/en/comps/{self.comp_id}"
+
+    def schedule_url(self, back: int = 0) -> str:
+        if back == 0:
+            return f"{self.en_base}/schedule/{self.slug}-Scores-and-Fixtures"
+        s = self.season_label(back)
+        return f"{self.en_base}/{s}/schedule/{s}-{self.slug}-Scores-and-Fixtures"
+
+    def standings_urls(self) -> Tuple[str, str]:
+        """(IT, EN) della pagina principale della competizione."""
+        return (f"{BASE_URL}/it/comp/{self.comp_id}/Statistiche-di-{self.slug}",
+                f"{self.en_base}/{self.slug}-Stats")
+
+    def standings_table(self) -> str:
+        return f"results{self.season_label()}{self.comp_id}{self.standings_stage}_overall"
+
+    def stats_url(self, page: str) -> str:
+        return f"{BASE_URL}/it/comp/{self.comp_id}/{page}/Statistiche-di-{self.slug}"
+
+    def params(self) -> Dict[str, str]:
+        """Segnaposto per le TableSpec per competizione (vedi stats_url_template)."""
+        return {"comp_id": str(self.comp_id), "slug": self.slug}
+
+# Ordine = ordine delle righe nei CSV multi-lega (calendari). Gli slug delle voci storiche
+# restano quelli già usati negli URL (l'archivio pagine è indicizzato per URL).
+COMPETITIONS: List[Competition] = [
+    Competition("premier_league", "Premier League", 9, "Premier League", big5=True),
+    Competition("champions_league", "Champions League", 8, "Champions-League",
+                pages=CUP_PAGES, cup=True, standings_stage=2),
+    Competition("la_liga", "La Liga", 12, "La-Liga", big5=True),
+    Competition("bundesliga", "Bundesliga", 20, "Bundesliga", big5=True),
+    Competition("serie_a", "Serie A", 11, "Serie-A", big5=True),
+    Competition("ligue_1", "Ligue 1", 13, "Ligue-1", big5=True),
+    # registrate, da attivare (active=True o FBREF_COMPETITIONS)
+    Competition("europa_league", "Europa League", 19, "Europa-League",
+                pages=CUP_PAGES, cup=True, standings_stage=2, active=False),
+    Competition("conference_league", "Conference League", 882, "Conference-League",
+                pages=CUP_PAGES, cup=True, standings_stage=2, active=False),
+    Competition("eredivisie", "Eredivisie", 23, "Eredivisie", active=False),
+    Competition("primeira_liga", "Primeira Liga", 32, "Primeira-Liga", active=False),
+    Competition("championship", "Championship", 10, "Championship", active=False),
+    Competition("belgian_pro_league", "Belgian Pro League", 37, "Belgian-Pro-League", active=False),
+    Competition("scottish_premiership", "Scottish Premiership", 40, "Scottish-Premiership", active=False),
+    Competition("super_lig", "Super Lig", 26, "Super-Lig", active=False),
+    Competition("serie_b", "Serie B", 18, "Serie-B", active=False),
+    Competition("2_bundesliga", "2. Bundesliga", 33, "2-Bundesliga", active=False),
+    Competition("ligue_2", "Ligue 2", 60, "Ligue-2", active=False),
+    Competition("segunda_division", "Segunda Division", 17, "Segunda-Division", active=False),
+    Competition("austrian_bundesliga", "Austrian Bundesliga", 56, "Austrian-Bundesliga", active=False),
+    Competition("swiss_super_league", "Swiss Super League", 57, "Swiss-Super-League", active=False),
+    Competition("danish_superliga", "Danish Superliga", 50, "Danish-Superliga", active=False),
+    Competition("mls", "Major League Soccer", 22, "Major-League-Soccer", season="year", active=False),
+    Competition("brasileirao", "Brasileirao", 24, "Serie-A", season="year", active=False),
+]
+
+_BY_KEY = {c.key: c for c in COMPETITIONS}
+
+def reference_time() -> datetime:
+    """Istante a cui si riferiscono le stagioni: quello del replay se attivo (rebuild --date)."""
+    at = os.environ.get(REPLAY_ENV, "").strip()
+    if at:
+        return datetime.fromisoformat(at.replace("Z", "+00:00"))
+    return datetime.fromtimestamp(clock.now(), timezone.utc)
+
+# pagine scaricate per competizione: script divisi per lega / aggregati (Big5 una volta + altre)
+PER_COMPETITION: Dict[str, Tuple[str, int]] = {
+    "classifiche.py": (STANDINGS, 1),
+    "current_matches.py": (SCHEDULE, 1),
+    "download_old.py": (SCHEDULE, 2),    # stagione corrente + precedente
+}
+AGGREGATE: Dict[str, Tuple[str, int]] = {
+    "team_performance.py": (SQUADS, 2),
+    "opponent_performance.py": (SQUADS, 2),
+    "league_players.py": (PLAYERS, 3),
+}
+
+# ───────────────────────────────────────────────────
+# Selezione
+# ───────────────────────────────────────────────────
+def get(key: str) -> Competition:
+    return _BY_KEY[key]
+
+def enabled() -> List[Competition]:
+    """Competizioni attive: FBREF_COMPETITIONS se impostata, altrimenti il flag active."""
+    sel = os.environ.get(ENV, "").strip()
+    if not sel:
+        return [c for c in COMPETITIONS if c.active]
+    if sel == "all":
+        return list(COMPETITIONS)
+    keys = [k.strip() for k in sel.split(",") if k.strip()]
+    unknown = [k for k in keys if k not in _BY_KEY]
+    if unknown:
+        print(f"[WARN] {ENV}: competizioni sconosciute {unknown}")
+    return [c for c in COMPETITIONS if c.key in keys]
+
+def active(page: Optional[str] = None, only: Optional[List[str]] = None) -> List[Competition]:
+    """Competizioni attive con la pagina `page`, filtrate per chiave (only) se indicato."""
+    return [c for c in enabled()
+            if (page is None or page in c.pages) and (not only or c.key in only)]
+
+def keys_for(script: str) -> List[str]:
+    """Chiavi lega di uno script divisibile per lega, nell'ordine in cui le scrive."""
+    page, _ = PER_COMPETITION[script]
+    return [c.key for c in active(page)]
+
+def pages_for(script: str, only: Optional[List[str]] = None) -> Optional[int]:
+    """Pagine FBref scaricate da uno script con le competizioni attive (None = non dipende dal registro)."""
+    if script in PER_COMPETITION:
+        page, n = PER_COMPETITION[script]
+        return n * len(active(page, only))
+    if script in AGGREGATE:
+        page, n = AGGREGATE[script]
+        comps = active(page)
+        return n * (any(c.big5 for c in comps) + sum(not c.big5 for c in comps))
+    return None
+
+# ───────────────────────────────────────────────────
+# Aggregati squadre/giocatori: Big5 + singole competizioni
+# ───────────────────────────────────────────────────
+def stats_url_template(page: str) -> str:
+    """URL di una pagina statistiche con segnaposto {comp_id}/{slug} (TableSpec per competizione)."""
+    return f"{BASE_URL}/it/comp/{{comp_id}}/{page}/Statistiche-di-{{slug}}"
+
+def per_competition(spec, tables: Dict[str, Tuple[str, str]]):
+    """
+    La OutputSpec Big5 riscritta per le pagine della singola competizione:
+    tables = nome tabella → (pagina, id tabella sulla pagina della competizione).
+    """
+    return replace(spec, tables=tuple(
+        replace(t, url=stats_url_template(tables[t.name][0]), table_id=tables[t.name][1])
+        for t in spec.tables))
+
+def build_aggregate(page: str, big5_spec, comp_spec, pause=None):
+    """
+    Big5 (una pagina per tabella, solo se c'è almeno una lega Big5 attiva) + ogni altra
+    competizione attiva con la pagina `page`; righe concatenate in big5_spec.path.
+    Una competizione minore che fallisce non blocca le altre.
+    """
+    from fbref_http import lazy_import
+    from table_spec import build
+
+    pd = lazy_import("pandas")
+    comps = active(page)
+    big5 = [c.name for c in comps if c.big5]
+    frames = []
+    if big5:
+        df = build(big5_spec, pause=pause, write=False)
+        if df is not None:
+            if len(big5) < sum(c.big5 for c in COMPETITIONS) and "Competizione" in df.columns:
+                df = df[df["Competizione"].isin(big5)]
+            frames.append(df)
+    for c in comps:
+        if c.big5:
+            continue
+        try:
+            df = build(comp_spec, pause=pause, write=False, **c.params())
+        except Exception as e:
+            print(f"[WARN] {big5_spec.name} {c.name}: {e}")
+            continue
+        if df is not None:
+            df["Competizione"] = c.name
+            frames.append(df)
+    if not frames:
+        print(f"[WARN] {big5_spec.name}: nessuna tabella estratta, file non aggiornato")
+        return None
+    out = pd.concat(frames, ignore_index=True)
+    os.makedirs(os.path.dirname(big5_spec.path), exist_ok=True)
+    out.to_csv(big5_spec.path, index=False, encoding=big5_spec.encoding)
+    print(f"✅ {big5_spec.path} creato ({len(out)} righe, {len(frames)} blocchi, {out.shape[1]} colonne).")
+    return out
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description="Registro delle competizioni FBref")
+    ap.add_argument("--all", action="store_true", help="mostra anche le competizioni non attive")
+    args = ap.parse_args()
+    on = {c.key for c in enabled()}
+    for c in COMPETITIONS:
+        if args.all or c.key in on:
+            flags = ",".join(p for p in c.pages) + (" big5" if c.big5 else "") + (" coppa" if c.cup else "")
+            print(f"{'●' if c.key in on else '○'} {c.key:<22} {c.comp_id:>4}  {c.season_label():<9} {flags}")
+    print()
+    for script in list(PER_COMPETITION) + list(AGGREGATE):
+        print(f"  {script:<26} {pages_for(script):>3} pagine")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
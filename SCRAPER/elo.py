@@ -0,0 +1,225 @@
+# coding: utf-8
+"""
+Rating Elo unico per tutte le competizioni (campionati + Champions League)
+- Input:
+    public/data/all_leagues_matches.csv   (download_old.py, Champions inclusa)
+    public/data/history/*.csv             (stagioni recuperate, come feature_store.py)
+- Una sola scala per squadra (nome in minuscolo): le partite di Champions collegano i
+  campionati, quindi i rating sono confrontabili tra leghe
+- Aggiornamento Elo classico con vantaggio casa e moltiplicatore per scarto gol
+  (World Football Elo); le partite dello stesso giorno sono applicate insieme: attese
+  calcolate dai rating di inizio giornata, variazioni sommate con np.add.at
+- Stato persistente con watermark (data, id partita) dell'ultima partita applicata:
+  ogni refresh applica solo le partite successive; il giorno del watermark viene
+  riapplicato da capo se arrivano altri risultati di quella data, qualunque sia il loro
+  id (stesso esito del ricalcolo completo); risultati aggiunti o corretti nei giorni
+  prima del watermark (impronta di quei giorni) o parametri cambiati → ricalcolo completo
+
+Uso:
+  python SCRAPER/elo.py            # solo partite nuove
+  python SCRAPER/elo.py --full     # ricalcolo completo
+
+Output:
+ - public/data/elo_ratings.csv
+ - .cache/elo/state.json
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from feature_store import load_matches
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+OUTPUT_CSV = "public/data/elo_ratings.csv"
+STATE_JSON = os.path.join(".cache", "elo", "state.json")
+
+PARAMS = {
+    "base": 1500.0,    # rating iniziale
+    "k": 20.0,
+    "home": 60.0,      # punti Elo di vantaggio casa
+}
+
+# ───────────────────────────────────────────────────
+# Aggiornamento vettoriale
+# ───────────────────────────────────────────────────
+def margin_multiplier(gd: np.ndarray) -> np.ndarray:
+    """World Football Elo: 1, 1.5 con due gol di scarto, (11 + N) / 8 da tre in su."""
+    n = np.abs(gd)
+    return np.where(n <= 1, 1.0, np.where(n == 2, 1.5, (11 + n) / 8))
+
+def apply_day(R: np.ndarray, N: np.ndarray, h: np.ndarray, a: np.ndarray, gh: np.ndarray, ga: np.ndarray):
+    """Tutte le partite di un giorno in un passo (ogni squadra gioca al più una volta)."""
+    exp_h = 1 / (1 + 10 ** (-(R[h] + PARAMS["home"] - R[a]) / 400))
+    score = np.where(gh > ga, 1.0, np.where(gh == ga, 0.5, 0.0))
+    delta = PARAMS["k"] * margin_multiplier(gh - ga) * (score - exp_h)
+    np.add.at(R, h, delta)
+    np.add.at(R, a, -delta)
+    np.add.at(N, h, 1)
+    np.add.at(N, a, 1)
+
+def apply_matches(m: pd.DataFrame, teams: Dict[str, int], R: np.ndarray, N: np.ndarray):
+    """
+    Applica m (ordinate per data) giorno per giorno. Ritorna (R, N, snapshot di inizio
+    dell'ultimo giorno applicato) — lo snapshot serve a riapplicare quel giorno.
+    """
+    h = m["home"].str.lower().map(teams).to_numpy()
+    a = m["away"].str.lower().map(teams).to_numpy()
+    gh = m["gh"].to_numpy(dtype=float)
+    ga = m["ga"].to_numpy(dtype=float)
+    days = m["date"].to_numpy()
+    # confini dei giorni su righe ordinate: un passo vettoriale per giorno
+    cuts = np.flatnonzero(days[1:] != days[:-1]) + 1
+    snap = None
+    for s, e in zip(np.r_[0, cuts], np.r_[cuts, len(m)]):
+        snap = (R.copy(), N.copy())
+        apply_day(R, N, h[s:e], a[s:e], gh[s:e], ga[s:e])
+    return R, N, snap
+
+# ───────────────────────────────────────────────────
+# Stato
+# ───────────────────────────────────────────────────
+def load_state() -> Optional[Dict]:
+    try:
+        with open(STATE_JSON, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(state: Dict):
+    os.makedirs(os.path.dirname(STATE_JSON), exist_ok=True)
+    tmp = STATE_JSON + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, STATE_JSON)
+
+def _arrays(ratings: Dict[str, List[float]], teams: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    R = np.full(len(teams), PARAMS["base"])
+    N = np.zeros(len(teams))
+    for t, (r, n) in ratings.items():
+        R[teams[t]], N[teams[t]] = r, n
+    return R, N
+
+def _dict(R: np.ndarray, N: np.ndarray, teams: Dict[str, int]) -> Dict[str, List[float]]:
+    return {t: [float(R[i]), int(N[i])] for t, i in teams.items() if N[i] > 0}
+
+# ───────────────────────────────────────────────────
+# Refresh
+# ───────────────────────────────────────────────────
+def _order(m: pd.DataFrame) -> pd.DataFrame:
+    m = m.assign(_day=m["date"].dt.strftime("%Y-%m-%d"))
+    return m.sort_values(["_day", "match_id"], kind="stable").reset_index(drop=True)
+
+def _fingerprint(m: pd.DataFrame) -> str:
+    """Impronta (id + risultato) delle partite già applicate: scopre aggiunte o correzioni."""
+    h = pd.util.hash_pandas_object(m[["match_id", "gh", "ga"]], index=False).to_numpy()
+    return f"{len(m)}:{int(h.sum(dtype=np.uint64))}"
+
+def refresh(matches: pd.DataFrame, full: bool = False) -> Tuple[Dict, int, str]:
+    """Ritorna (nuovo stato, partite applicate, modalità)."""
+    m = _order(matches)
+    state = None if full else load_state()
+    if state and state.get("params") != PARAMS:
+        state = None   # parametri cambiati: i rating salvati non sono più coerenti
+
+    if state:
+        wm_day = state["watermark"][0]
+        # tutto il giorno del watermark conta come "dopo": i risultati arrivati in ritardo
+        # quel giorno (qualunque match_id) passano dalla riapplicazione del giorno
+        before, day, new = m[m["_day"] < wm_day], m[m["_day"] == wm_day], m[m["_day"] > wm_day]
+        if _fingerprint(before) != state.get("applied"):
+            state = None   # risultati in ritardo o corretti nei giorni prima del watermark
+        elif _fingerprint(day) != state.get("day_applied"):
+            # altri risultati del giorno del watermark: si riparte da inizio giornata
+            base, todo, mode = state["day_start"], m[m["_day"] >= wm_day], "riapplicato giorno"
+            if todo.empty:
+                state = None   # partite del giorno sparite e nessuna dopo: ricalcolo completo
+        elif new.empty:
+            return state, 0, "aggiornato"
+        else:
+            base, todo, mode = state["ratings"], new, "incrementale"
+
+    if not state:
+        base, todo, mode = {}, m, "completo"
+
+    names = sorted(set(base) | set(todo["home"].str.lower()) | set(todo["away"].str.lower()))
+    teams = {t: i for i, t in enumerate(names)}
+    R, N = _arrays(base, teams)
+    R, N, snap = apply_matches(todo, teams, R, N)
+    last = todo.iloc[-1]
+    day_start = _dict(*snap, teams) if snap else base
+    new_state = {
+        "params": PARAMS,
+        "watermark": [last["_day"], last["match_id"]],
+        "ratings": _dict(R, N, teams),
+        "day_start": day_start,
+        # todo arriva sempre fino all'ultima partita di m: impronte prima / dentro l'ultimo giorno
+        "applied": _fingerprint(m[m["_day"] < last["_day"]]),
+        "day_applied": _fingerprint(m[m["_day"] == last["_day"]]),
+        "leagues": _leagues(m),
+    }
+    return new_state, len(todo), mode
+
+def _leagues(m: pd.DataFrame) -> Dict[str, str]:
+    """Campionato di appartenenza (ultimo non Champions) per squadra."""
+    long = pd.concat([m[["home", "league"]].rename(columns={"home": "team"}),
+                      m[["away", "league"]].rename(columns={"away": "team"})])
+    long = long[long["league"] != "champions_league"]
+    return long.assign(team=long["team"].str.lower()).groupby("team")["league"].last().to_dict()
+
+def ratings_table(state: Dict, matches: pd.DataFrame) -> pd.DataFrame:
+    display = {}
+    for col in ("home", "away"):
+        display.update(dict(zip(matches[col].str.lower(), matches[col])))
+    rows = [(display.get(t, t), state["leagues"].get(t, ""), r, n) for t, (r, n) in state["ratings"].items()]
+    df = pd.DataFrame(rows, columns=["Squadra", "Lega", "Elo", "Partite"])
+    df = df.sort_values(["Elo", "Squadra"], ascending=[False, True]).reset_index(drop=True)
+    df.insert(0, "Pos", np.arange(1, len(df) + 1))
+    df["Elo"] = df["Elo"].round(1)
+    return df
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build(full: bool = False):
+    """
+    Aggiorna stato e OUTPUT_CSV; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non ci sono partite giocate.
+    """
+    matches = load_matches()
+    if matches.empty:
+        print("Nessuna partita giocata trovata.")
+        return False
+    state, applied, mode = refresh(matches, full=full)
+    if applied == 0 and os.path.exists(OUTPUT_CSV):
+        print(f"[ELO] nessuna partita nuova dopo {state['watermark'][0]}")
+        return True
+    save_state(state)
+    df = ratings_table(state, matches)
+    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
+    df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
+    print(f"[ELO] {applied} partite applicate ({mode}), watermark {state['watermark'][0]}")
+    print(f"💾 Salvato: {OUTPUT_CSV} ({len(df)} squadre)")
+    return True
+
+def main():
+    ap = argparse.ArgumentParser(description="Rating Elo unico per tutte le competizioni")
+    ap.add_argument("--full", action="store_true", help="ricalcolo completo")
+    args = ap.parse_args()
+    try:
+        build(full=args.full)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# coding: utf-8
+"""
+HTTP anti-403 condiviso dagli script FBref + import "pigri"
+- cloudscraper (interprete nodejs) creato solo alla prima fetch(), non all'import
+- UA rotation, retry/backoff, rispetto Retry-After, rilevazione challenge Cloudflare
+- clearance Cloudflare (cookie + UA) persistita tra i run in clearance_store:
+  le sessioni nuove partono già "sbloccate" finché i cookie sono validi
+- attese (backoff, Retry-After) via clock: con VirtualClock i test non dormono davvero
+- ogni pagina valida finisce nell'archivio (page_archive); con FBREF_REPLAY_AT le pagine
+  vengono lette dall'archivio invece che dalla rete
+- un solo rate limit per processo (FBREF_RATE_PER_MIN richieste al minuto) prima di ogni
+  richiesta, al posto delle pause fisse per lega negli script: il tempo di un refresh
+  dipende dal limite e dal numero di pagine, non da quante leghe ci sono
+- lazy_import(): pandas / bs4 / requests vengono caricati al primo uso di un attributo,
+  così importare uno script per riusare un helper (es. remove_country_codes) è immediato
+"""
+
+import os
+import sys
+import random
+import functools
+import importlib.util
+from types import ModuleType
+
+import clock
+
+# ───────────────────────────────────────────────────
+# Import differiti
+# ───────────────────────────────────────────────────
+def lazy_import(name: str) -> ModuleType:
+    """
+    Ritorna il modulo `name` registrato in sys.modules ma non ancora eseguito:
+    il codice del modulo gira al primo accesso a un suo attributo.
+    Se il modulo è già importato ritorna quello.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# ───────────────────────────────────────────────────
+# Anti-403: cloudscraper
+# ───────────────────────────────────────────────────
+BASE_URL = "https://fbref.com"
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/126.0.0.0 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (iPad; CPU OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_6_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:126.0) Gecko/20100101 Firefox/126.0",
+    "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Linux; Android 13; SM-S928B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile/15E148 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 12_7_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.4 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 16_7 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (X11; Fedora; Linux x86_64; rv:124.0) Gecko/20100101 Firefox/124.0",
+    "Mozilla/5.0 (Windows NT 10.0; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/125.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 11_7_10) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPad; CPU OS 16_7 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/124.0.0.0 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 6.3; WOW64; rv:109.0) Gecko/20100101 Firefox/109.0",
+]
+
+_CF_BLOCK_MARKERS = (
+    "Just a moment", "Attention Required", "/cdn-cgi/challenge-platform", "cf-browser-verification"
+)
+
+_SCRAPER = None
+
+# ───────────────────────────────────────────────────
+# Rate limit
+# ───────────────────────────────────────────────────
+# FBref blocca chi supera ~10 richieste al minuto
+RATE_PER_MIN = float(os.environ.get("FBREF_RATE_PER_MIN", "10"))
+
+class RateLimiter:
+    """
+    Intervallo minimo tra l'inizio di due richieste (60 / per_min secondi): download e
+    parsing della pagina precedente contano già come attesa, nessuna pausa in più.
+    """
+
+    def __init__(self, per_min: float = RATE_PER_MIN):
+        self.interval = 60.0 / per_min if per_min > 0 else 0.0
+        self.next_at = None
+
+    def wait(self):
+        now = clock.monotonic()
+        if self.next_at is not None and now < self.next_at:
+            clock.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+_LIMITER = RateLimiter()
+
+def set_rate(per_min: float) -> RateLimiter:
+    global _LIMITER
+    _LIMITER = RateLimiter(per_min)
+    return _LIMITER
+
+def throttle():
+    _LIMITER.wait()
+
+def _replay(url: str) -> str:
+    """Replay dall'archivio: il rate limit si applica solo con orologio virtuale (simulazione)."""
+    import page_archive
+
+    if isinstance(clock.get_clock(), clock.VirtualClock):
+        throttle()
+    return page_archive.replay(url)
+
+def new_scraper(seed: bool = True):
+    """
+    Sessione cloudscraper. Con seed=True, se c'è una clearance salvata ancora valida,
+    riusa il suo UA (Cloudflare lega cf_clearance allo User-Agent) e i suoi cookie.
+    """
+    import cloudscraper  # pesante (avvia anche l'interprete JS): solo quando serve davvero
+    import clearance_store
+
+    entry = clearance_store.load() if seed else None
+    ua = entry["ua"] if entry else random.choice(USER_AGENTS)
+    s = cloudscraper.create_scraper(browser={"custom": ua}, interpreter="nodejs")
+    s.headers.update({
+        "User-Agent": ua,
+        "Accept-Language": random.choice(["en-US,en;q=0.9", "it-IT,it;q=0.9,en-US;q=0.8"]),
+        "Referer": BASE_URL,
+        "Cache-Control": "no-cache",
+    })
+    s.clearance_sig = ""
+    if entry:
+        clearance_store.seed_jar(s.cookies, entry)
+        s.clearance_sig = clearance_store.signature(entry["cookies"])
+    return s
+
+def get_scraper():
+    """Sessione condivisa, creata alla prima richiesta."""
+    global _SCRAPER
+    if _SCRAPER is None:
+        _SCRAPER = new_scraper()
+    return _SCRAPER
+
+def rotate_scraper(seed: bool = True):
+    global _SCRAPER
+    _SCRAPER = new_scraper(seed=seed)
+    return _SCRAPER
+
+def remember_clearance(s):
+    """Dopo una risposta valida: salva i cookie Cloudflare se sono nuovi/cambiati."""
+    import clearance_store
+
+    cookies = clearance_store.cookies_from_jar(s.cookies)
+    if not clearance_store.has_clearance(cookies):
+        return
+    sig = clearance_store.signature(cookies)
+    if sig != getattr(s, "clearance_sig", ""):
+        if clearance_store.save(s.headers.get("User-Agent", ""), cookies):
+            s.clearance_sig = sig
+
+def forget_clearance():
+    """Pagina di blocco: la clearance salvata non vale più."""
+    import clearance_store
+
+    clearance_store.invalidate()
+
+def looks_blocked(html: str) -> bool:
+    if not html:
+        return False
+    return any(m in html[:6000] for m in _CF_BLOCK_MARKERS)
+
+def archived(get):
+    """
+    Per i fetcher alternativi (es. requests semplice negli script Champions):
+    replay dall'archivio se FBREF_REPLAY_AT è impostata, altrimenti archivia la pagina.
+    """
+    @functools.wraps(get)
+    def wrapper(url, *args, **kwargs):
+        import page_archive
+
+        if page_archive.replaying():
+            return _replay(url)
+        throttle()
+        html = get(url, *args, **kwargs)
+        page_archive.remember(url, html)
+        return html
+    return wrapper
+
+def fetch(url, timeout=25, retries=10, backoff=1.8, jitter=0.35) -> str:
+    """
+    Fetch resiliente con cloudscraper:
+      - rileva challenge Cloudflare (403/429/503 o marker HTML)
+      - ruota UA/scraper ogni 3 tentativi o se bloccato (senza riusare la clearance salvata)
+      - gestisce Retry-After
+      - rispetta il rate limit condiviso prima di ogni tentativo
+      - salva la clearance dopo un 200, la invalida su pagina di blocco
+      - archivia la pagina (o la legge dall'archivio in replay)
+    """
+    import page_archive
+
+    if page_archive.replaying():
+        return _replay(url)
+    delay = 1.2
+    last_exc = None
+
+    for attempt in range(1, retries + 1):
+        try:
+            s = get_scraper()
+            throttle()
+            r = s.get(url, timeout=timeout)
+            status = r.status_code
+            blocked = looks_blocked(r.text)
+
+            if status == 200 and not blocked:
+                remember_clearance(s)
+                page_archive.remember(url, r.text)
+                return r.text
+
+            if status in (429, 403, 503) or blocked:
+                ra = r.headers.get("Retry-After")
+                wait = float(ra) if ra and str(ra).isdigit() else delay
+                wait += random.uniform(0, wait * jitter)
+                if blocked:
+                    forget_clearance()
+                    rotate_scraper(seed=False)
+                elif attempt % 3 == 0:
+                    # sessione nuova davvero: col seed tornerebbero UA e cookie appena rifiutati
+                    rotate_scraper(seed=False)
+                clock.sleep(wait)
+                delay *= backoff
+                continue
+
+            if 500 <= status < 600:
+                clock.sleep(delay + random.uniform(0, delay * jitter))
+                delay *= backoff
+                continue
+
+            r.raise_for_status()
+
+        except Exception as e:
+            last_exc = e
+            if attempt % 3 == 0:
+                rotate_scraper(seed=False)
+            clock.sleep(delay + random.uniform(0, delay * jitter))
+            delay *= backoff
+            continue
+
+    from requests.exceptions import HTTPError
+    raise HTTPError(f"Unable to fetch {url} after {retries} retries; last error: {last_exc}")
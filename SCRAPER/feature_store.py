@@ -0,0 +1,376 @@
+# coding: utf-8
+"""
+Feature store "point-in-time" per le partite giocate (dataset di training)
+- Input:
+    public/data/all_leagues_matches.csv      (download_old.py, stagione corrente)
+    public/data/history/*.csv                (stagioni recuperate, stesso formato)
+- Per ogni partita e per ciascuna squadra, le feature come erano PRIMA del calcio d'inizio
+  (nessun dato di partite successive o dello stesso giorno):
+    xG fatti/subiti e gol fatti/subiti medi sulle ultime N partite (N in WINDOWS),
+    forma (punti nelle ultime FORM_WINDOW), medie stagionali, partite giocate,
+    posizione/punti in classifica alla vigilia, giorni di riposo (tutte le competizioni)
+- Finestre vettoriali: righe squadra-partita ordinate per tempo + somme prefisse
+  (nessun loop per squadra); classifica alla vigilia = cumulata giorno×squadra per
+  lega/stagione con rank per riga
+- Archivio colonnare partizionato lega/stagione: Parquet se pyarrow è installato,
+  altrimenti .npz compressi (NumPy); ogni run aggiunge solo le partite nuove come
+  nuovo file della partizione (compattato oltre MAX_PARTS)
+
+Uso (gira anche come stage di incremental.py a ogni nuovo download dei risultati):
+  python SCRAPER/feature_store.py              # append delle partite nuove
+  python SCRAPER/feature_store.py --rebuild    # riscrive tutto
+  python SCRAPER/feature_store.py stats
+
+  from feature_store import load
+  df = load(leagues=["serie_a"], seasons=["2024-2025", "2025-2026"])
+
+Output:
+ - .cache/features/<lega>/<stagione>/part-XXXX.{parquet|npz}
+ - .cache/features/manifest.json
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from poisson_grid import _key, _read_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # opzionale: senza pyarrow si usa .npz
+    pa = pq = None
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+MATCHES_CSV = "public/data/all_leagues_matches.csv"
+HISTORY_GLOB = "public/data/history/*.csv"
+STORE_DIR = os.path.join(".cache", "features")
+MANIFEST = os.path.join(STORE_DIR, "manifest.json")
+
+WINDOWS = (5, 10)       # partite per le medie mobili xG/gol
+FORM_WINDOW = 5         # partite per la forma (punti)
+MAX_PARTS = 16          # file per partizione prima della compattazione
+SEASON_START_MONTH = 7  # luglio: inizio stagione
+
+FORMAT = "parquet" if pq is not None else "npz"
+
+# ───────────────────────────────────────────────────
+# Partite
+# ───────────────────────────────────────────────────
+def _season(day: pd.Series) -> pd.Series:
+    start = day.dt.year - (day.dt.month < SEASON_START_MONTH)
+    return start.astype(str) + "-" + (start + 1).astype(str)
+
+def _match_id(df: pd.DataFrame) -> pd.Series:
+    raw = df["league"] + "|" + df["date"].dt.strftime("%Y-%m-%d") + "|" + df["home"] + "|" + df["away"]
+    return raw.map(lambda s: hashlib.sha1(s.encode("utf-8")).hexdigest()[:16])
+
+def load_matches(paths: Optional[List[str]] = None) -> pd.DataFrame:
+    """Partite giocate da stagione corrente + storico, una riga per partita (dedup per id)."""
+    if paths is None:
+        paths = [MATCHES_CSV] + sorted(glob.glob(HISTORY_GLOB))
+    frames = [_read_csv(p) for p in paths if os.path.exists(p)]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    raw = pd.concat(frames, ignore_index=True)
+
+    def num(col):
+        return pd.to_numeric(raw[col].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+
+    day = pd.to_datetime(raw["Giorno"], errors="coerce")
+    hm = pd.to_timedelta(raw["Orario"].where(raw["Orario"].str.match(r"^\d{1,2}:\d{2}$"), "00:00") + ":00",
+                         errors="coerce").fillna(pd.Timedelta(0))
+    df = pd.DataFrame({
+        "league": _key(raw["Campionato"]).str.replace(" ", "_"),
+        "date": day,
+        "kickoff": day + hm,
+        "home": raw["Squadra Casa"].astype(str).str.strip(),
+        "away": raw["Squadra Trasferta"].astype(str).str.strip(),
+        "gh": num("Gol Casa"),
+        "ga": num("Gol Trasferta"),
+        "xgh": num("xG Casa"),
+        "xga": num("xG Trasferta"),
+    })
+    df = df[df["date"].notna() & df["gh"].notna() & df["ga"].notna()].copy()
+    df["season"] = _season(df["date"])
+    df["match_id"] = _match_id(df)
+    df = df.drop_duplicates("match_id").sort_values(["kickoff", "league", "home"], kind="stable")
+    return df.reset_index(drop=True)
+
+# ───────────────────────────────────────────────────
+# Feature (vettoriali)
+# ───────────────────────────────────────────────────
+def _team_rows(m: pd.DataFrame) -> pd.DataFrame:
+    """Formato lungo: due righe per partita (squadra, avversaria, fatti/subiti)."""
+    home = pd.DataFrame({"row": m.index, "side": "h", "team": m["home"], "gf": m["gh"], "ga": m["ga"],
+                         "xgf": m["xgh"], "xga": m["xga"]})
+    away = pd.DataFrame({"row": m.index, "side": "a", "team": m["away"], "gf": m["ga"], "ga": m["gh"],
+                         "xgf": m["xga"], "xga": m["xgh"]})
+    t = pd.concat([home, away], ignore_index=True)
+    for c in ("league", "season", "date", "kickoff"):
+        t[c] = m[c].to_numpy()[t["row"].to_numpy()]
+    t["pts"] = np.where(t["gf"] > t["ga"], 3, np.where(t["gf"] == t["ga"], 1, 0))
+    return t
+
+def _prior_window(values: np.ndarray, group_start: np.ndarray, k: Optional[int]):
+    """
+    Su righe ordinate per (gruppo, tempo): somma e conteggio dei valori nelle k righe
+    precedenti dello stesso gruppo (k=None → tutte le precedenti). NaN non contano.
+    """
+    i = np.arange(len(values))
+    lo = group_start if k is None else np.maximum(i - k, group_start)
+    ok = np.isfinite(values)
+    cs = np.concatenate([[0.0], np.cumsum(np.where(ok, values, 0.0))])
+    cn = np.concatenate([[0], np.cumsum(ok)])
+    return cs[i] - cs[lo], cn[i] - cn[lo]
+
+def _mean(s, n):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # arrotondato: le somme prefisse su tutto l'array lasciano errori di 1e-12
+        return np.round(np.where(n > 0, s / np.maximum(n, 1), np.nan), 6)
+
+def rolling_features(t: pd.DataFrame) -> pd.DataFrame:
+    """Medie mobili/forma per (lega, stagione, squadra) e riposo per squadra, solo partite precedenti."""
+    t = t.sort_values(["league", "season", "team", "kickoff"], kind="stable").reset_index(drop=True)
+    grp = (t[["league", "season", "team"]] != t[["league", "season", "team"]].shift()).any(axis=1)
+    start = np.maximum.accumulate(np.where(grp, np.arange(len(t)), 0))
+
+    out = {"played": np.arange(len(t)) - start}
+    for col in ("xgf", "xga", "gf", "ga"):
+        v = t[col].to_numpy(dtype=float)
+        for k in WINDOWS:
+            out[f"{col}_{k}"] = _mean(*_prior_window(v, start, k))
+        out[f"{col}_season"] = _mean(*_prior_window(v, start, None))
+    out[f"form_{FORM_WINDOW}"], _ = _prior_window(t["pts"].to_numpy(dtype=float), start, FORM_WINDOW)
+    feats = pd.concat([t, pd.DataFrame(out)], axis=1)
+
+    # riposo: partita precedente della stessa squadra in qualsiasi competizione
+    feats["_tkey"] = feats["team"].str.lower()
+    feats = feats.sort_values(["_tkey", "kickoff"], kind="stable")
+    prev = feats.groupby("_tkey")["date"].shift()
+    feats["rest_days"] = (feats["date"] - prev).dt.days
+    return feats.drop(columns="_tkey")
+
+def standings_before(m: pd.DataFrame, t: pd.DataFrame) -> pd.DataFrame:
+    """
+    Posizione e punti alla vigilia (partite dei giorni precedenti) per ogni riga squadra-partita.
+    Per lega/stagione: cumulata giorno×squadra, stato del giorno prima, rank per riga
+    (punti, differenza reti, gol fatti; poi nome).
+    """
+    pos = np.full(len(t), np.nan)
+    pts_before = np.full(len(t), np.nan)
+    for _, idx in t.groupby(["league", "season"]).indices.items():
+        g = t.iloc[idx]
+        teams = np.sort(g["team"].unique())
+        days = np.sort(g["date"].unique())
+        ti = np.searchsorted(teams, g["team"].to_numpy())
+        di = np.searchsorted(days, g["date"].to_numpy())
+        shape = (len(days), len(teams))
+        mats = {}
+        for name, v in (("pts", g["pts"]), ("gd", g["gf"] - g["ga"]), ("gf", g["gf"])):
+            a = np.zeros(shape)
+            np.add.at(a, (di, ti), v.to_numpy(dtype=float))
+            # riga d = stato prima del giorno d
+            mats[name] = np.vstack([np.zeros((1, len(teams))), np.cumsum(a, axis=0)[:-1]])
+        # ordinamento per giorno (chiave primaria, ultima) poi punti, differenza reti, gol
+        # fatti e indice squadra (nome): ogni giorno resta un blocco contiguo di squadre
+        n_days, n_teams = shape
+        day = np.repeat(np.arange(n_days), n_teams)
+        team = np.tile(np.arange(n_teams), n_days)
+        flat = np.lexsort((team, -mats["gf"].ravel(), -mats["gd"].ravel(), -mats["pts"].ravel(), day))
+        order = team[flat].reshape(shape)
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(1, len(teams) + 1)[None, :], axis=1)
+        pos[idx] = rank[di, ti]
+        pts_before[idx] = mats["pts"][di, ti]
+    return pd.DataFrame({"position": pos, "points": pts_before}, index=t.index)
+
+FEATURES = (["played"] + [f"{c}_{k}" for c in ("xgf", "xga", "gf", "ga") for k in WINDOWS]
+            + [f"{c}_season" for c in ("xgf", "xga", "gf", "ga")]
+            + [f"form_{FORM_WINDOW}", "position", "points", "rest_days"])
+
+def build_features(m: pd.DataFrame) -> pd.DataFrame:
+    """Una riga per partita: chiavi, risultato e feature h_*/a_* alla vigilia."""
+    t = _team_rows(m)
+    t = pd.concat([t, standings_before(m, t)], axis=1)
+    f = rolling_features(t)
+    base = m[["match_id", "league", "season", "date", "kickoff", "home", "away", "gh", "ga", "xgh", "xga"]]
+    out = base.copy()
+    for side in ("h", "a"):
+        s = f[f["side"] == side].set_index("row")[FEATURES]
+        out = out.join(s.add_prefix(f"{side}_"))
+    return out
+
+# ───────────────────────────────────────────────────
+# Archivio colonnare
+# ───────────────────────────────────────────────────
+def _part_dir(league: str, season: str) -> str:
+    return os.path.join(STORE_DIR, league, season)
+
+def _write_part(df: pd.DataFrame, path: str):
+    tmp = path + ".tmp"
+    if FORMAT == "parquet":
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression="zstd")
+    else:
+        cols = {}
+        for c in df.columns:
+            s = df[c]
+            if pd.api.types.is_datetime64_any_dtype(s):
+                cols[c] = s.to_numpy(dtype="datetime64[s]")
+            elif pd.api.types.is_numeric_dtype(s):
+                cols[c] = s.to_numpy(dtype=float)
+            else:
+                cols[c] = s.astype(str).to_numpy(dtype=str)   # unicode fisso: niente pickle
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **cols)
+    os.replace(tmp, path)
+
+def _read_part(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError(f"pyarrow necessario per leggere {path}")
+        return pq.read_table(path, columns=columns).to_pandas()
+    with np.load(path, allow_pickle=False) as z:
+        names = columns or list(z.files)
+        return pd.DataFrame({c: z[c] for c in names if c in z.files})
+
+def _parts(league: str, season: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(_part_dir(league, season), "part-*.*")))
+
+def load_manifest() -> Dict:
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"partitions": {}}
+
+def _save_manifest(man: Dict):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    man["updated"] = datetime.now().isoformat(timespec="seconds")
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(man, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST)
+
+def append(features: pd.DataFrame, rebuild: bool = False) -> Dict[str, int]:
+    """Scrive le partite non ancora presenti (per partizione); ritorna righe aggiunte per partizione."""
+    if rebuild and os.path.isdir(STORE_DIR):
+        shutil.rmtree(STORE_DIR)
+    man = load_manifest()
+    added: Dict[str, int] = {}
+    ext = "parquet" if FORMAT == "parquet" else "npz"
+
+    for (league, season), part in features.groupby(["league", "season"], sort=True):
+        key = f"{league}/{season}"
+        files = _parts(league, season)
+        known = set()
+        for p in files:
+            known.update(_read_part(p, ["match_id"])["match_id"].astype(str))
+        new = part[~part["match_id"].isin(known)]
+        if new.empty:
+            continue
+        os.makedirs(_part_dir(league, season), exist_ok=True)
+        n = int(os.path.basename(files[-1]).split("-")[1].split(".")[0]) + 1 if files else 0
+        _write_part(new.reset_index(drop=True), os.path.join(_part_dir(league, season), f"part-{n:04d}.{ext}"))
+        files = _parts(league, season)
+        if len(files) > MAX_PARTS:
+            files = [compact(league, season)]
+        added[key] = len(new)
+        man["partitions"][key] = {"parts": len(files), "rows": len(known) + len(new)}
+
+    man["format"] = FORMAT
+    man["features"] = FEATURES
+    _save_manifest(man)
+    return added
+
+def compact(league: str, season: str) -> str:
+    """Riunisce i file di una partizione in uno solo (ordinato per calcio d'inizio)."""
+    files = _parts(league, season)
+    df = pd.concat([_read_part(p) for p in files], ignore_index=True).sort_values("kickoff", kind="stable")
+    ext = "parquet" if FORMAT == "parquet" else "npz"
+    out = os.path.join(_part_dir(league, season), f"part-0000.{ext}")
+    _write_part(df.reset_index(drop=True), out + ".new")
+    for p in files:
+        os.remove(p)
+    os.replace(out + ".new", out)
+    return out
+
+# ───────────────────────────────────────────────────
+# Lettura (training)
+# ───────────────────────────────────────────────────
+def load(leagues: Optional[Iterable[str]] = None, seasons: Optional[Iterable[str]] = None,
+         columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Dataset di training: partizioni filtrate per lega/stagione, solo le colonne richieste."""
+    leagues = set(leagues) if leagues else None
+    seasons = set(seasons) if seasons else None
+    frames = []
+    for key in sorted(load_manifest().get("partitions", {})):
+        league, season = key.split("/")
+        if (leagues and league not in leagues) or (seasons and season not in seasons):
+            continue
+        frames += [_read_part(p, columns) for p in _parts(league, season)]
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values("kickoff", kind="stable").reset_index(drop=True) if "kickoff" in df else df
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build(rebuild: bool = False):
+    """
+    Aggiorna il feature store; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non ci sono partite giocate.
+    """
+    matches = load_matches()
+    if matches.empty:
+        print("Nessuna partita giocata trovata.")
+        return False
+    features = build_features(matches)
+    added = append(features, rebuild=rebuild)
+    for key, n in added.items():
+        print(f"[APPEND] {key}: +{n} partite")
+    print(f"💾 Feature store: {sum(added.values())} nuove partite ({FORMAT}), "
+          f"{len(features)} totali in {STORE_DIR}")
+    return True
+
+def print_stats():
+    man = load_manifest()
+    parts = man.get("partitions", {})
+    if not parts:
+        print("Feature store vuoto.")
+        return
+    for key, p in sorted(parts.items()):
+        print(f"{key:<32} {p['rows']:>6} partite  {p['parts']:>3} file")
+    print(f"Formato: {man.get('format')}  aggiornato: {man.get('updated')}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Feature point-in-time per le partite giocate")
+    ap.add_argument("cmd", nargs="?", default="build", choices=["build", "stats"])
+    ap.add_argument("--rebuild", action="store_true", help="riscrive tutte le partizioni")
+    args = ap.parse_args()
+    try:
+        if args.cmd == "stats":
+            print_stats()
+        else:
+            build(rebuild=args.rebuild)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+# coding: utf-8
+"""
+Build incrementale (stile make) degli artefatti derivati
+- Ogni stage dichiara file di input (anche glob), parametri e output
+- Fingerprint dello stage = sha256 di: contenuto degli input + parametri + sorgente dello stage
+- Se il fingerprint non cambia lo stage non gira; se torna uguale a uno già visto
+  gli output vengono ripristinati dalla cache (indirizzata per contenuto) senza ricalcolo
+- Hash dei file riusati finché dimensione e mtime non cambiano
+- Gli stage vengono eseguiti in ordine di dipendenza (output di uno = input di un altro):
+  se uno stage fallisce o non produce output (build() → False) i suoi dipendenti
+  non girano e il fingerprint non viene registrato, così il run successivo ci riprova
+
+Uso:
+  python SCRAPER/incremental.py                 # solo ciò che è cambiato
+  python SCRAPER/incremental.py poisson_grid    # solo alcuni stage
+  python SCRAPER/incremental.py --force | --dry-run
+
+Nuovo artefatto derivato = una voce in STAGES.
+
+Output:
+ - .cache/incremental/state.json   (hash input/output per stage)
+ - .cache/incremental/objects/     (output in cache per fingerprint)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import argparse
+import importlib
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(".cache", "incremental")
+STATE_FILE = os.path.join(CACHE_DIR, "state.json")
+OBJECTS_DIR = os.path.join(CACHE_DIR, "objects")
+KEEP_FINGERPRINTS = 8   # fingerprint (e relativi output) conservati per stage
+
+DATA = "public/data"
+
+# ───────────────────────────────────────────────────
+# Stage
+# ───────────────────────────────────────────────────
+@dataclass
+class Stage:
+    name: str
+    target: str                        # "modulo:funzione" in SCRAPER/: solleva se fallisce, False se non ha output
+    inputs: List[str]                  # percorsi o glob (relativi alla root del repo)
+    outputs: List[str]
+    params: Callable[[], Dict] = dict  # valutati a ogni run (es. data di oggi)
+    code: List[str] = field(default_factory=list)  # sorgenti extra oltre al modulo del target
+
+    @property
+    def sources(self) -> List[str]:
+        module = self.target.split(":")[0]
+        return [os.path.join("SCRAPER", f"{module}.py")] + self.code
+
+STAGES: List[Stage] = [
+    Stage(
+        name="team_ratings",
+        target="team_ratings:build",
+        inputs=[f"{DATA}/all_leagues_matches.csv"],
+        outputs=[f"{DATA}/team_ratings.json"],
+        code=["SCRAPER/poisson_grid.py"],
+    ),
+    Stage(
+        name="elo",
+        target="elo:build",
+        inputs=[f"{DATA}/all_leagues_matches.csv", f"{DATA}/history/*.csv"],
+        outputs=[f"{DATA}/elo_ratings.csv"],
+        code=["SCRAPER/feature_store.py"],   # lettura partite
+    ),
+    Stage(
+        name="feature_store",
+        target="feature_store:build",
+        inputs=[f"{DATA}/all_leagues_matches.csv", f"{DATA}/history/*.csv"],
+        outputs=[".cache/features/manifest.json"],
+    ),
+    Stage(
+        name="poisson_grid",
+        target="poisson_grid:build",
+        inputs=[
+            f"{DATA}/players/matches_season.csv",
+            f"{DATA}/team_performance.csv",
+            f"{DATA}/opponent_performance.csv",
+            f"{DATA}/champions_casa.csv",
+            f"{DATA}/champions_avversari.csv",
+            f"{DATA}/standings/*.csv",
+            f"{DATA}/team_ratings.json",
+        ],
+        outputs=[f"{DATA}/fixture_probabilities.csv"],
+        # le partite in programma partono da oggi: cambia giorno → cambia output
+        params=lambda: {"day": date.today().isoformat()},
+    ),
+    Stage(
+        name="accumulators",
+        target="accumulators:build",
+        inputs=[f"{DATA}/fixture_probabilities.csv"],
+        outputs=[f"{DATA}/accumulators.json"],
+    ),
+    Stage(
+        name="season_sim",
+        target="season_sim:build",
+        inputs=[
+            f"{DATA}/players/matches_season.csv",
+            f"{DATA}/team_performance.csv",
+            f"{DATA}/opponent_performance.csv",
+            f"{DATA}/champions_casa.csv",
+            f"{DATA}/champions_avversari.csv",
+            f"{DATA}/standings/*.csv",
+            f"{DATA}/team_ratings.json",
+        ],
+        outputs=[f"{DATA}/season_projections.csv"],
+        params=lambda: {"day": date.today().isoformat()},
+        code=["SCRAPER/poisson_grid.py"],   # forze squadra e tassi gol
+    ),
+    Stage(
+        name="leaderboards",
+        target="leaderboards:build",
+        inputs=[
+            f"{DATA}/players/league_players.csv",
+            f"{DATA}/players/champions_league_players.csv",
+        ],
+        outputs=[f"{DATA}/players/leaderboards.json"],
+    ),
+    Stage(
+        name="team_neighbourhood",
+        target="team_neighbourhood:build",
+        inputs=[
+            f"{DATA}/standings/*.csv",
+            f"{DATA}/team_performance.csv",
+            f"{DATA}/opponent_performance.csv",
+            f"{DATA}/champions_casa.csv",
+            f"{DATA}/champions_avversari.csv",
+        ],
+        outputs=[f"{DATA}/team_neighbourhood.json"],
+    ),
+    Stage(
+        name="search_index",
+        target="search_index:build",
+        inputs=[
+            f"{DATA}/players/league_players.csv",
+            f"{DATA}/players/champions_league_players.csv",
+            f"{DATA}/standings/*.csv",
+            f"{DATA}/team_performance.csv",
+        ],
+        outputs=[".cache/search/index.npz"],
+    ),
+    Stage(
+        name="snapshot_history",
+        target="snapshot_history:build",
+        inputs=[
+            f"{DATA}/standings/*.csv",
+            f"{DATA}/team_performance.csv",
+            f"{DATA}/players/league_players.csv",
+        ],
+        # storico append-only (public/data/snapshots): niente output da ripristinare dalla
+        # cache, il giorno nel fingerprint fa registrare ogni nuovo stato dei dataset
+        outputs=[],
+        params=lambda: {"day": date.today().isoformat()},
+    ),
+]
+
+# ───────────────────────────────────────────────────
+# Hash
+# ───────────────────────────────────────────────────
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class FileHashes:
+    """sha256 per file con cache (size, mtime_ns) → niente rilettura dei file invariati."""
+
+    def __init__(self, cache: Dict[str, List]):
+        self.cache = cache
+
+    def get(self, path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        hit = self.cache.get(path)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        digest = sha256_file(path)
+        self.cache[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+def expand(patterns: List[str]) -> List[str]:
+    out = []
+    for p in patterns:
+        matches = sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p]
+        out.extend(m.replace(os.sep, "/") for m in matches)
+    return out
+
+def fingerprint(stage: Stage, hashes: FileHashes) -> Tuple[str, Dict[str, Optional[str]]]:
+    inputs = {p: hashes.get(p) for p in expand(stage.inputs) + stage.sources}
+    payload = json.dumps({"inputs": inputs, "params": stage.params()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest(), inputs
+
+# ───────────────────────────────────────────────────
+# Stato e cache output
+# ───────────────────────────────────────────────────
+def load_state() -> Dict:
+    if not os.path.exists(STATE_FILE):
+        return {"files": {}, "stages": {}}
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            state = json.load(f)
+        state.setdefault("files", {})
+        state.setdefault("stages", {})
+        return state
+    except Exception:
+        return {"files": {}, "stages": {}}
+
+def save_state(state: Dict):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+def _object_path(digest: str) -> str:
+    return os.path.join(OBJECTS_DIR, digest[:2], digest)
+
+def store_outputs(stage: Stage, hashes: FileHashes) -> Dict[str, Optional[str]]:
+    out = {}
+    for path in stage.outputs:
+        digest = hashes.get(path)
+        out[path] = digest
+        if digest and not os.path.exists(_object_path(digest)):
+            os.makedirs(os.path.dirname(_object_path(digest)), exist_ok=True)
+            shutil.copyfile(path, _object_path(digest))
+    return out
+
+def restore_outputs(outputs: Dict[str, Optional[str]], hashes: FileHashes) -> bool:
+    """Ripristina gli output salvati; False se manca qualche oggetto in cache."""
+    if any(d and not os.path.exists(_object_path(d)) for d in outputs.values()):
+        return False
+    for path, digest in outputs.items():
+        if digest is None:
+            continue
+        if hashes.get(path) != digest:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            shutil.copyfile(_object_path(digest), path)
+    return True
+
+def gc_objects(state: Dict) -> int:
+    live = {d for st in state["stages"].values() for outs in st.get("cache", {}).values()
+            for d in outs.values() if d}
+    removed = 0
+    for path in glob.glob(os.path.join(OBJECTS_DIR, "*", "*")):
+        if os.path.basename(path) not in live:
+            os.remove(path)
+            removed += 1
+    return removed
+
+# ───────────────────────────────────────────────────
+# Esecuzione
+# ───────────────────────────────────────────────────
+def ordered(stages: List[Stage]) -> List[Stage]:
+    """Ordine topologico: uno stage viene dopo quelli che producono i suoi input."""
+    produced = {o: s.name for s in stages for o in s.outputs}
+    by_name = {s.name: s for s in stages}
+    seen, out = set(), []
+
+    def visit(s: Stage, stack: tuple):
+        if s.name in seen:
+            return
+        if s.name in stack:
+            raise ValueError(f"dipendenza circolare: {' → '.join(stack + (s.name,))}")
+        for inp in s.inputs:
+            dep = produced.get(inp)
+            if dep and dep != s.name:
+                visit(by_name[dep], stack + (s.name,))
+        seen.add(s.name)
+        out.append(s)
+
+    for s in stages:
+        visit(s, ())
+    return out
+
+def _changed(old: Dict[str, Optional[str]], new: Dict[str, Optional[str]]) -> List[str]:
+    return sorted(p for p in set(old) | set(new) if old.get(p) != new.get(p))
+
+def run_stage(stage: Stage, state: Dict, hashes: FileHashes, force: bool = False,
+              dry_run: bool = False) -> str:
+    """Ritorna 'skip' | 'cache' | 'run' | 'dry' | 'empty' | 'error'."""
+    fp, inputs = fingerprint(stage, hashes)
+    st = state["stages"].setdefault(stage.name, {"cache": {}, "history": []})
+    outputs_ok = all(hashes.get(o) == st.get("outputs", {}).get(o) for o in stage.outputs)
+
+    if not force and st.get("fingerprint") == fp and outputs_ok:
+        print(f"[SKIP] {stage.name}: input invariati")
+        return "skip"
+
+    changed = _changed(st.get("inputs", {}), inputs)
+    why = ", ".join(os.path.basename(p) for p in changed[:6]) or "parametri/output"
+    if dry_run:
+        print(f"[DRY] {stage.name}: da ricostruire ({why})")
+        return "dry"
+
+    cached = st["cache"].get(fp)
+    if not force and cached is not None and stage.outputs and restore_outputs(cached, hashes):
+        print(f"[CACHE] {stage.name}: output ripristinati per fingerprint {fp[:10]}")
+        status = "cache"
+    else:
+        print(f"[RUN] {stage.name}: cambiati {why}")
+        module, func = stage.target.split(":")
+        if SCRAPER_DIR not in sys.path:
+            sys.path.insert(0, SCRAPER_DIR)
+        try:
+            produced = getattr(importlib.import_module(module), func)()
+        except Exception as e:
+            print(f"❌ {stage.name}: {e}")
+            return "error"
+        if produced is False:
+            print(f"[WARN] {stage.name}: nessun output prodotto")
+            return "empty"
+        status = "run"
+
+    outputs = store_outputs(stage, hashes)
+    st.update({"fingerprint": fp, "inputs": inputs, "outputs": outputs})
+    st["cache"][fp] = outputs
+    st["history"] = ([fp] + [h for h in st["history"] if h != fp])[:KEEP_FINGERPRINTS]
+    st["cache"] = {h: st["cache"][h] for h in st["history"] if h in st["cache"]}
+    return status
+
+def build(only: Optional[List[str]] = None, force: bool = False, dry_run: bool = False) -> Dict[str, str]:
+    state = load_state()
+    hashes = FileHashes(state["files"])
+    produced = {o: s.name for s in STAGES for o in s.outputs}
+    results = {}
+    failed = set()   # stage falliti o senza output, e i loro dipendenti
+    for stage in ordered(STAGES):
+        if only and stage.name not in only:
+            continue
+        upstream = sorted({produced[i] for i in stage.inputs if produced.get(i) in failed})
+        if upstream:
+            print(f"[SKIP] {stage.name}: dipende da {', '.join(upstream)} (non riuscito)")
+            results[stage.name] = "blocked"
+            failed.add(stage.name)
+            continue
+        results[stage.name] = run_stage(stage, state, hashes, force=force, dry_run=dry_run)
+        if results[stage.name] in ("error", "empty"):
+            failed.add(stage.name)
+    if not dry_run:
+        gc_objects(state)
+        save_state(state)
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Build incrementale degli artefatti derivati")
+    ap.add_argument("stages", nargs="*", help="stage da considerare (default: tutti)")
+    ap.add_argument("--force", action="store_true", help="ricalcola ignorando gli hash")
+    ap.add_argument("--dry-run", action="store_true", help="mostra cosa verrebbe ricostruito")
+    args = ap.parse_args()
+    try:
+        results = build(args.stages or None, force=args.force, dry_run=args.dry_run)
+        if any(r == "error" for r in results.values()):
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Errore build incrementale: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# coding: utf-8
+"""
+Classifiche giocatori (top-K) precalcolate per il sito
+- Input:
+    public/data/players/league_players.csv            (league_players.py)
+    public/data/players/champions_league_players.csv  (champions_league_players.py)
+- Stessa normalizzazione di player-stats-service.ts (parseInt/parseFloat, default 0)
+- Liste:
+    team:   (campionati|champions, squadra, stat) → top TEAM_K con presenze minime
+            (5 campionati / 3 Champions), come getTopPlayersByStat()
+    stat:   (competizione, stat) → top LEAGUE_K con le stesse presenze minime,
+            come getLeagueTopPlayersByStat()
+    league: (competizione, goals|assists|goalsAndAssists) → top LEAGUE_K,
+            senza soglia, come getLeagueTopPlayers()
+- Selezione parziale (np.partition) invece di ordinare tutto; a parità di valore
+  vince l'ordine del CSV, come il sort stabile lato browser
+- Artefatto compatto: ogni giocatore compare una sola volta, le liste sono indici
+- sources: sha256 dei CSV di input (come in manifest.json di publish.py): il sito usa
+  le liste solo se corrispondono ai CSV pubblicati, altrimenti ordina i CSV
+
+Output:
+ - public/data/players/leaderboards.json
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+DATA_DIR = "public/data"
+LEAGUE_CSV = f"{DATA_DIR}/players/league_players.csv"
+CHAMPIONS_CSV = f"{DATA_DIR}/players/champions_league_players.csv"
+OUTPUT_JSON = f"{DATA_DIR}/players/leaderboards.json"
+
+CHAMPIONS = "Champions League"
+TEAM_K = 10
+LEAGUE_K = 20
+MIN_MATCHES = {"league": 5, "champions": 3}
+
+# campo PlayerStats → (colonna CSV, tipo) come normalizePlayerStats()
+FIELDS = {
+    "pos": ("Pos.", "int"),
+    "name": ("Giocatore", "str"),
+    "nationality": ("Nazione", "str"),
+    "position": ("Ruolo", "str"),
+    "team": ("Squadra", "str"),
+    "league": ("Competizione", "str"),
+    "age": ("Età", "int"),
+    "matches": ("PG", "int"),
+    "starts": ("Tit", "int"),
+    "minutes": ("Min", "int"),
+    "goals": ("Reti", "int"),
+    "assists": ("Assist", "int"),
+    "yellowCards": ("Amm.", "int"),
+    "redCards": ("Esp.", "int"),
+    "xG": ("xG", "num"),
+    "shots": ("Tiri totali", "int"),
+    "shotsOnTarget": ("Tiri in porta", "int"),
+    "foulsCommitted": ("Falli commessi", "int"),
+    "foulsDrawn": ("Falli subiti", "int"),
+    "offsides": ("Fuorigioco", "int"),
+    "progressiveCarries": ("PrgC", "int"),
+    "progressivePasses": ("PrgP", "int"),
+}
+STR_DEFAULTS = {"name": "Sconosciuto", "nationality": "Sconosciuta", "position": "Sconosciuto",
+                "team": "Sconosciuta", "league": "Serie A"}
+
+# NumericPlayerStatsKeys
+STATS = ["goals", "assists", "xG", "shots", "shotsOnTarget", "yellowCards", "redCards",
+         "foulsCommitted", "foulsDrawn", "matches", "minutes", "offsides",
+         "progressiveCarries", "progressivePasses"]
+CATEGORIES = ["goals", "assists", "goalsAndAssists"]
+
+# ───────────────────────────────────────────────────
+# Lettura + normalizzazione (come il sito)
+# ───────────────────────────────────────────────────
+def _js_int(s: pd.Series) -> pd.Series:
+    """parseInt: cifre iniziali, altrimenti 0."""
+    lead = s.astype(str).str.extract(r"^\s*([-+]?\d+)", expand=False)
+    return pd.to_numeric(lead, errors="coerce").fillna(0).astype(np.int64)
+
+def _js_num(s: pd.Series) -> pd.Series:
+    """parseFloat dopo replace(',', '.') (solo la prima virgola), altrimenti 0."""
+    lead = s.astype(str).str.replace(",", ".", n=1, regex=False).str.extract(
+        r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)", expand=False)
+    return pd.to_numeric(lead, errors="coerce").fillna(0.0)
+
+def load_players(path: str, kind: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        print(f"[WARN] file mancante: {path}")
+        return pd.DataFrame(columns=list(FIELDS))
+    raw = pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    out = pd.DataFrame(index=raw.index)
+    for field, (col, typ) in FIELDS.items():
+        s = raw[col] if col in raw.columns else pd.Series("", index=raw.index)
+        if typ == "int":
+            out[field] = _js_int(s)
+        elif typ == "num":
+            out[field] = _js_num(s)
+        else:
+            s = s.str.strip()
+            out[field] = s.where(s != "", STR_DEFAULTS[field])
+    if kind == "champions":
+        out["league"] = CHAMPIONS
+    out["goalsAndAssists"] = out["goals"] + out["assists"]
+    return out.reset_index(drop=True)
+
+# ───────────────────────────────────────────────────
+# Top-K
+# ───────────────────────────────────────────────────
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indici dei k valori più alti, decrescenti; a parità vince l'indice più basso.
+    Selezione parziale: solo i candidati (≤ k + pari merito al k-esimo) vengono ordinati.
+    """
+    n = len(values)
+    if n > k:
+        kth = np.partition(values, n - k)[n - k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        idx = np.concatenate([above, ties])
+    else:
+        idx = np.arange(n)
+    return idx[np.lexsort((idx, -values[idx]))]
+
+def _groups(keys: pd.Series) -> Dict[str, np.ndarray]:
+    return {k: np.asarray(v) for k, v in keys.groupby(keys, sort=True).indices.items()}
+
+def build_lists(players: pd.DataFrame, min_matches: int) -> Dict[str, Dict]:
+    """Liste di indici (righe di players) per squadra, per stat e per categoria."""
+    eligible = np.flatnonzero(players["matches"].to_numpy() >= min_matches)
+    values = {c: players[c].to_numpy() for c in STATS + ["goalsAndAssists"]}
+    # come getPlayerStats(): squadra confrontata in minuscolo, senza filtrare per competizione
+    team_key = players["team"].str.lower()
+
+    team: Dict[str, Dict[str, List[int]]] = {}
+    for key, pos in _groups(team_key.iloc[eligible]).items():
+        rows = eligible[pos]
+        team[key] = {s: rows[top_k(values[s][rows], TEAM_K)].tolist() for s in STATS}
+
+    stat: Dict[str, Dict[str, List[int]]] = {}
+    league: Dict[str, Dict[str, List[int]]] = {}
+    for comp, rows in _groups(players["league"]).items():
+        elig = rows[players["matches"].to_numpy()[rows] >= min_matches]
+        stat[comp] = {s: elig[top_k(values[s][elig], LEAGUE_K)].tolist() for s in STATS}
+        league[comp] = {c: rows[top_k(values[c][rows], LEAGUE_K)].tolist() for c in CATEGORIES}
+    return {"team": team, "stat": stat, "league": league}
+
+# ───────────────────────────────────────────────────
+# Artefatto
+# ───────────────────────────────────────────────────
+def _sha256(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def build_artifact() -> Dict:
+    fields = list(FIELDS)
+    rows: List[List] = []
+    out = {"k": {"team": TEAM_K, "league": LEAGUE_K}, "minMatches": MIN_MATCHES,
+           "fields": fields, "players": rows, "team": {"league": {}, "champions": {}},
+           "stat": {}, "league": {},
+           "sources": {os.path.relpath(p, DATA_DIR).replace(os.sep, "/"): _sha256(p)
+                       for p in (LEAGUE_CSV, CHAMPIONS_CSV)}}
+
+    for kind, path in (("league", LEAGUE_CSV), ("champions", CHAMPIONS_CSV)):
+        players = load_players(path, kind)
+        if players.empty:
+            continue
+        lists = build_lists(players, MIN_MATCHES[kind])
+
+        # riga CSV → posizione nell'array compatto "players" (solo i giocatori usati)
+        used = sorted({i for part in lists.values() for per in part.values()
+                       for idx in per.values() for i in idx})
+        remap = {i: len(rows) + j for j, i in enumerate(used)}
+        records = players.loc[used, fields].to_numpy(dtype=object).tolist()
+        rows.extend([[v.item() if hasattr(v, "item") else v for v in r] for r in records])
+
+        for part, per in lists.items():
+            dest = out["team"][kind] if part == "team" else out[part]
+            for key, by_stat in per.items():
+                dest[key] = {s: [remap[i] for i in idx] for s, idx in by_stat.items()}
+    return out
+
+def build():
+    """
+    Calcola e salva OUTPUT_JSON; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non ci sono giocatori.
+    """
+    art = build_artifact()
+    if not art["players"]:
+        print("Nessun giocatore trovato.")
+        return False
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    tmp = OUTPUT_JSON + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(art, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, OUTPUT_JSON)
+    print(f"💾 Salvato: {OUTPUT_JSON} ({len(art['players'])} giocatori, "
+          f"{sum(len(t) for t in art['team'].values())} squadre, {len(art['league'])} competizioni)")
+    return True
+
+def main():
+    try:
+        build()
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+# coding: utf-8
+"""
+Archivio append-only delle pagine FBref scaricate + rebuild offline
+- Ogni pagina valida restituita da fetch() (e dagli http_get Champions) viene archiviata
+- Corpo deduplicato per sha256: una pagina identica a una già vista costa una riga d'indice
+- Record compressi con zstd (`zstandard`, in requirements.txt); le versioni successive
+  della stessa URL usano l'ultima versione completa ("keyframe") come dizionario →
+  pochi KB invece di MB per snapshot quasi uguali. Se zstandard manca: zlib, solo record
+  completi (avviso al primo salvataggio)
+- Segmenti mensili in sola aggiunta; indice JSONL (url, istante, sha256) e mappa
+  sha256 → (segmento, offset, lunghezza): lettura di una pagina = seek + una decompressione
+- Scritture serializzate con flock: più scraper/shard possono archiviare insieme
+- rebuild: rigenera gli output dei nove script per una o più date leggendo solo
+  dall'archivio (FBREF_REPLAY_AT), script in parallelo su processi separati, pause virtuali
+
+Uso:
+  python SCRAPER/page_archive.py stats
+  python SCRAPER/page_archive.py list [filtro-url]
+  python SCRAPER/page_archive.py get <url> [--at 2025-09-01T12:00:00Z] [-o pagina.html]
+  python SCRAPER/page_archive.py rebuild --date 2025-09-01 [--out DIR] [--workers N] [script ...]
+  python SCRAPER/page_archive.py rebuild --from 2025-08-15 --to 2025-10-01
+
+Variabili:
+  FBREF_ARCHIVE=0         non archiviare
+  FBREF_ARCHIVE_DIR=...   cartella dell'archivio (default .cache/archive)
+
+Output:
+ - .cache/archive/segments/<AAAAMM>.seg   (record compressi)
+ - .cache/archive/index.jsonl             (un fetch per riga)
+ - .cache/archive/blobs.jsonl             (un corpo distinto per riga)
+ - <out>/<data>/public/data/...           (rebuild, default .cache/rebuild)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import zlib
+import bisect
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import clock
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+_WARNED = False
+
+try:
+    import fcntl
+except ImportError:  # Windows: scritture non serializzate
+    fcntl = None
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.environ.get("FBREF_ARCHIVE_DIR") or os.path.join(".cache", "archive")
+REBUILD_DIR = os.path.join(".cache", "rebuild")
+REPLAY_ENV = "FBREF_REPLAY_AT"
+
+ZSTD_LEVEL = 12
+ZLIB_LEVEL = 9
+KEYFRAME_EVERY = 30       # dopo N delta della stessa URL si riparte da un record completo
+
+# i nove script che scaricano da FBref (quelli rigenerabili dall'archivio)
+SCRIPTS = [
+    "classifiche.py",
+    "current_matches.py",
+    "download_old.py",
+    "team_performance.py",
+    "opponent_performance.py",
+    "champions_casa.py",
+    "champions_avversari.py",
+    "league_players.py",
+    "champions_league_players.py",
+]
+
+def _paths(root: str) -> Dict[str, str]:
+    return {
+        "segments": os.path.join(root, "segments"),
+        "index": os.path.join(root, "index.jsonl"),
+        "blobs": os.path.join(root, "blobs.jsonl"),
+        "lock": os.path.join(root, "write.lock"),
+    }
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# ───────────────────────────────────────────────────
+# Archivio
+# ───────────────────────────────────────────────────
+class PageArchive:
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self.p = _paths(root)
+        self._loaded_at = (-1, -1)
+        self.fetches: Dict[str, List[Tuple[str, str]]] = {}   # url → [(istante, sha)] ordinati
+        self.blobs: Dict[str, Dict] = {}                       # sha → record
+        self._bodies: Dict[str, bytes] = {}                    # cache keyframe decompressi
+
+    # ── indice ──────────────────────────────────────
+    def _stat(self) -> Tuple[int, int]:
+        sizes = []
+        for k in ("index", "blobs"):
+            try:
+                sizes.append(os.path.getsize(self.p[k]))
+            except OSError:
+                sizes.append(0)
+        return tuple(sizes)
+
+    def load(self):
+        """Rilegge l'indice solo se i file sono cresciuti (append-only)."""
+        if self._stat() == self._loaded_at:
+            return
+        self.fetches, self.blobs = {}, {}
+        if os.path.exists(self.p["blobs"]):
+            with open(self.p["blobs"], encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        self.blobs[rec["sha"]] = rec
+        if os.path.exists(self.p["index"]):
+            with open(self.p["index"], encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        self.fetches.setdefault(rec["url"], []).append((rec["t"], rec["sha"]))
+        for v in self.fetches.values():
+            v.sort()
+        self._loaded_at = self._stat()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        os.makedirs(self.p["segments"], exist_ok=True)
+        with open(self.p["lock"], "a+") as lk:
+            if fcntl is not None:
+                fcntl.flock(lk.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lk.fileno(), fcntl.LOCK_UN)
+
+    # ── compressione ────────────────────────────────
+    def _pick_base(self, url: str) -> Optional[str]:
+        """Keyframe dell'URL da usare come dizionario, se la catena non è troppo lunga."""
+        if zstd is None:
+            return None
+        deltas = 0
+        for _, sha in reversed(self.fetches.get(url, [])):
+            rec = self.blobs.get(sha)
+            if rec is None:
+                continue
+            if rec.get("base") is None:
+                return sha if deltas < KEYFRAME_EVERY else None
+            deltas += 1
+        return None
+
+    def _compress(self, body: bytes, base: Optional[bytes]) -> Tuple[bytes, str]:
+        global _WARNED
+        if zstd is None:
+            if not _WARNED:
+                print("[WARN] zstandard non installato (pip install -r requirements.txt): "
+                      "archivio senza delta, record zlib completi")
+                _WARNED = True
+            return zlib.compress(body, ZLIB_LEVEL), "zlib"
+        kw = {"level": ZSTD_LEVEL}
+        if base is not None:
+            kw["dict_data"] = zstd.ZstdCompressionDict(base, dict_type=zstd.DICT_TYPE_RAWCONTENT)
+        return zstd.ZstdCompressor(**kw).compress(body), "zstd"
+
+    def _decompress(self, data: bytes, rec: Dict) -> bytes:
+        if rec["codec"] == "zlib":
+            return zlib.decompress(data)
+        if zstd is None:
+            raise RuntimeError("record zstd ma il pacchetto zstandard non è installato")
+        kw = {}
+        if rec.get("base"):
+            kw["dict_data"] = zstd.ZstdCompressionDict(self.body(rec["base"]),
+                                                       dict_type=zstd.DICT_TYPE_RAWCONTENT)
+        return zstd.ZstdDecompressor(**kw).decompress(data, max_output_size=rec["size"])
+
+    # ── scrittura ───────────────────────────────────
+    def store(self, url: str, html: str, fetched_at: Optional[float] = None) -> Dict:
+        """Archivia una pagina; ritorna la riga d'indice. Corpo già presente → solo indice."""
+        body = html.encode("utf-8")
+        sha = hashlib.sha256(body).hexdigest()
+        t = _iso(clock.now() if fetched_at is None else fetched_at)
+        with self._write_lock():
+            self.load()
+            if sha not in self.blobs:
+                base = self._pick_base(url)
+                data, codec = self._compress(body, self.body(base) if base else None)
+                seg = os.path.join(self.p["segments"], f"{t[:4]}{t[5:7]}.seg")
+                with open(seg, "ab") as f:
+                    off = f.tell()
+                    f.write(data)
+                rec = {"sha": sha, "seg": os.path.basename(seg), "off": off, "len": len(data),
+                       "size": len(body), "codec": codec, "base": base}
+                with open(self.p["blobs"], "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec) + "\n")
+                self.blobs[sha] = rec
+            entry = {"url": url, "t": t, "sha": sha}
+            with open(self.p["index"], "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.fetches.setdefault(url, []).append((t, sha))
+            self.fetches[url].sort()
+            self._loaded_at = self._stat()
+        return entry
+
+    # ── lettura ─────────────────────────────────────
+    def body(self, sha: str) -> bytes:
+        if sha in self._bodies:
+            return self._bodies[sha]
+        rec = self.blobs[sha]
+        with open(os.path.join(self.p["segments"], rec["seg"]), "rb") as f:
+            f.seek(rec["off"])
+            data = f.read(rec["len"])
+        body = self._decompress(data, rec)
+        if rec.get("base") is None:
+            self._bodies[sha] = body   # i keyframe servono da dizionario ad altri record
+        return body
+
+    def lookup(self, url: str, at: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(istante, sha) dell'ultimo fetch di url con istante <= at (ISO UTC)."""
+        self.load()
+        snaps = self.fetches.get(url)
+        if not snaps:
+            return None
+        if at is None:
+            return snaps[-1]
+        i = bisect.bisect_right(snaps, (at, "\uffff"))
+        return snaps[i - 1] if i else None
+
+    def get(self, url: str, at: Optional[str] = None) -> Optional[str]:
+        hit = self.lookup(url, at)
+        return self.body(hit[1]).decode("utf-8") if hit else None
+
+    def dates(self) -> List[str]:
+        self.load()
+        return sorted({t[:10] for snaps in self.fetches.values() for t, _ in snaps})
+
+    def stats(self) -> Dict:
+        self.load()
+        n_fetch = sum(len(v) for v in self.fetches.values())
+        by_sha = {}
+        for snaps in self.fetches.values():
+            for _, sha in snaps:
+                by_sha[sha] = by_sha.get(sha, 0) + 1
+        raw = sum(self.blobs[s]["size"] * c for s, c in by_sha.items() if s in self.blobs)
+        stored = sum(r["len"] for r in self.blobs.values())
+        return {"urls": len(self.fetches), "fetches": n_fetch, "bodies": len(self.blobs),
+                "deltas": sum(1 for r in self.blobs.values() if r.get("base")),
+                "raw_bytes": raw, "stored_bytes": stored}
+
+# ───────────────────────────────────────────────────
+# Hook per gli scraper
+# ───────────────────────────────────────────────────
+_ARCHIVE: Optional[PageArchive] = None
+
+def get_archive() -> PageArchive:
+    global _ARCHIVE
+    if _ARCHIVE is None:
+        _ARCHIVE = PageArchive()
+    return _ARCHIVE
+
+def enabled() -> bool:
+    return os.environ.get("FBREF_ARCHIVE", "1") != "0"
+
+def replaying() -> bool:
+    return bool(os.environ.get(REPLAY_ENV))
+
+def remember(url: str, html: str):
+    """Chiamato dopo ogni pagina valida: un errore d'archivio non deve mai fermare lo scraper."""
+    if not enabled() or replaying():
+        return
+    try:
+        get_archive().store(url, html)
+    except Exception as e:
+        print(f"[WARN] archivio pagine: {e}")
+
+def replay(url: str) -> str:
+    """Pagina archiviata all'istante FBREF_REPLAY_AT (niente rete)."""
+    html = get_archive().get(url, os.environ[REPLAY_ENV])
+    if html is None:
+        raise LookupError(f"{url} non presente in archivio al {os.environ[REPLAY_ENV]}")
+    return html
+
+# ───────────────────────────────────────────────────
+# Rebuild offline
+# ───────────────────────────────────────────────────
+def _rebuild_one(script: str, day: str, out_root: str) -> Tuple[str, str, int]:
+    """Uno script in un processo separato, con cwd = <out>/<data>: scrive in <out>/<data>/public/data."""
+    cwd = os.path.join(out_root, day)
+    os.makedirs(cwd, exist_ok=True)
+    env = dict(os.environ)
+    env.update({
+        REPLAY_ENV: f"{day}T23:59:59Z",
+        "FBREF_ARCHIVE_DIR": os.path.abspath(ARCHIVE_DIR),
+        "FBREF_VIRTUAL_CLOCK": "1",   # rate limit/backoff non servono offline
+    })
+    with open(os.path.join(cwd, f"{script[:-3]}.log"), "w", encoding="utf-8") as log:
+        rc = subprocess.run([sys.executable, os.path.join(SCRAPER_DIR, script)], cwd=cwd, env=env,
+                            stdout=log, stderr=subprocess.STDOUT, check=False).returncode
+    return script, day, rc
+
+def rebuild(days: List[str], scripts: Optional[List[str]] = None, out_root: str = REBUILD_DIR,
+            workers: Optional[int] = None) -> int:
+    scripts = scripts or SCRIPTS
+    out_root = os.path.abspath(out_root)
+    tasks = [(s, d) for d in days for s in scripts]
+    print(f"[REBUILD] {len(days)} date × {len(scripts)} script → {out_root}")
+    t0 = clock.monotonic()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2) as ex:
+        for script, day, rc in ex.map(lambda t: _rebuild_one(t[0], t[1], out_root), tasks):
+            mark = "✅" if rc == 0 else "❌"
+            failed += rc != 0
+            print(f"  {mark} {day} {script}" + ("" if rc == 0 else f" (codice {rc}, vedi {day}/{script[:-3]}.log)"))
+    print(f"💾 Rebuild in {clock.monotonic() - t0:.1f}s, {failed} errori")
+    return 1 if failed else 0
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+def main():
+    ap = argparse.ArgumentParser(description="Archivio pagine FBref + rebuild offline")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="dimensioni e deduplicazione")
+    p_list = sub.add_parser("list", help="URL archiviate")
+    p_list.add_argument("filter", nargs="?", default="")
+    p_get = sub.add_parser("get", help="estrae una pagina")
+    p_get.add_argument("url")
+    p_get.add_argument("--at", default=None, help="istante ISO UTC (default: ultima versione)")
+    p_get.add_argument("-o", "--output", default=None)
+    p_rb = sub.add_parser("rebuild", help="rigenera gli output dall'archivio")
+    p_rb.add_argument("scripts", nargs="*", help=f"default: tutti ({len(SCRIPTS)})")
+    p_rb.add_argument("--date", default=None)
+    p_rb.add_argument("--from", dest="date_from", default=None)
+    p_rb.add_argument("--to", dest="date_to", default=None)
+    p_rb.add_argument("--out", default=REBUILD_DIR)
+    p_rb.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    try:
+        arc = get_archive()
+        if zstd is None:
+            print("[INFO] zstandard non installato: record zlib senza delta")
+        if args.cmd == "stats":
+            s = arc.stats()
+            ratio = s["raw_bytes"] / s["stored_bytes"] if s["stored_bytes"] else 0
+            print(f"URL: {s['urls']}  fetch: {s['fetches']}  corpi distinti: {s['bodies']} ({s['deltas']} delta)")
+            print(f"Pagine: {_fmt_bytes(s['raw_bytes'])} → archivio: {_fmt_bytes(s['stored_bytes'])} (×{ratio:.1f})")
+        elif args.cmd == "list":
+            arc.load()
+            for url, snaps in sorted(arc.fetches.items()):
+                if args.filter in url:
+                    print(f"{len(snaps):>5}  {snaps[0][0]} → {snaps[-1][0]}  {url}")
+        elif args.cmd == "get":
+            html = arc.get(args.url, args.at)
+            if html is None:
+                print("❌ Pagina non in archivio")
+                sys.exit(1)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(html)
+                print(f"💾 Salvato: {args.output}")
+            else:
+                sys.stdout.write(html)
+        else:
+            unknown = [s for s in args.scripts if s not in SCRIPTS]
+            if unknown:
+                raise ValueError(f"script sconosciuti: {unknown}")
+            if args.date:
+                days = [args.date]
+            else:
+                days = [d for d in arc.dates()
+                        if (not args.date_from or d >= args.date_from) and (not args.date_to or d <= args.date_to)]
+            if not days:
+                print("Nessuna data in archivio per l'intervallo richiesto.")
+                return
+            sys.exit(rebuild(days, args.scripts, args.out, args.workers))
+    except Exception as e:
+        print(f"❌ Errore archivio: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# coding: utf-8
+"""
+Join 1:1 per i dataset giocatori (standard + shooting + misc)
+- Chiave stabile: ID giocatore FBref (dal link /players/<id>/ o /giocatori/<id>/) + Squadra
+- Dedup esplicito per chiave prima del merge → nessun prodotto cartesiano tra omonimi
+- Merge hash di pandas con validate="one_to_one" (costo lineare nelle righe)
+- Report di validazione: duplicati scartati, righe senza corrispondenza, fan-out evitato
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from fbref_http import lazy_import
+
+pd = lazy_import("pandas")
+
+PLAYER_ID_COL = "ID Giocatore"
+JOIN_KEYS = [PLAYER_ID_COL, "Squadra"]
+
+_PLAYER_ID_RE = re.compile(r"/(?:players|giocatori|jugadores|spieler|joueurs)/([0-9a-f]{8})(?:/|$)")
+
+def extract_player_id(href: Optional[str]) -> str:
+    """'/it/giocatori/e342ad68/Mohamed-Salah' -> 'e342ad68' ('' se assente)."""
+    m = _PLAYER_ID_RE.search(href or "")
+    return m.group(1) if m else ""
+
+def player_id_from_row(tr) -> str:
+    """ID dal link nella cella data-stat='player' di una riga <tr>."""
+    cell = tr.find(["th", "td"], attrs={"data-stat": "player"})
+    a = cell.find("a") if cell else None
+    return extract_player_id(a.get("href")) if a else ""
+
+def _fold(name: str) -> str:
+    s = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", " ", s).strip().lower()
+
+def fill_missing_ids(df: pd.DataFrame, name_col: str = "Giocatore") -> pd.DataFrame:
+    """Righe senza link (rare) → chiave sintetica dal nome normalizzato."""
+    if PLAYER_ID_COL not in df.columns:
+        df[PLAYER_ID_COL] = ""
+    ids = df[PLAYER_ID_COL].fillna("").astype(str).str.strip()
+    missing = ids == ""
+    if missing.any() and name_col in df.columns:
+        ids = ids.mask(missing, "name:" + df[name_col].map(_fold))
+    df[PLAYER_ID_COL] = ids
+    return df
+
+def _fanout(left: pd.DataFrame, right: pd.DataFrame, on: List[str]) -> int:
+    """Righe che un merge ingenuo (senza dedup) produrrebbe sulle chiavi comuni."""
+    lc = left.groupby(on, sort=False).size()
+    rc = right.groupby(on, sort=False).size()
+    both = lc.to_frame("l").join(rc.to_frame("r"), how="inner")
+    return int((both["l"] * both["r"]).sum())
+
+def keyed_join(left: pd.DataFrame, right: pd.DataFrame, on: List[str] = JOIN_KEYS,
+               how: str = "left", name: str = "") -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Merge 1:1 su `on`. Le chiavi duplicate vengono ridotte alla prima occorrenza
+    su entrambi i lati prima del merge, quindi l'output non cresce per duplicati spuri.
+    Ritorna (df, report).
+    """
+    report: Dict[str, int] = {
+        "left_rows": len(left),
+        "right_rows": len(right),
+        "naive_rows": _fanout(left, right, on),
+    }
+
+    l_dup = left.duplicated(subset=on, keep="first")
+    r_dup = right.duplicated(subset=on, keep="first")
+    report["left_dupes_dropped"] = int(l_dup.sum())
+    report["right_dupes_dropped"] = int(r_dup.sum())
+    left, right = left[~l_dup], right[~r_dup]
+
+    # colonne non-chiave già presenti a sinistra non vengono duplicate
+    right = right[on + [c for c in right.columns if c not in on and c not in left.columns]]
+
+    merged = left.merge(right, on=on, how=how, validate="one_to_one", indicator=True)
+    matched = int((merged["_merge"] == "both").sum())
+    report["matched"] = matched
+    report["unmatched_left"] = int((merged["_merge"] == "left_only").sum())
+    report["unmatched_right"] = len(right) - matched
+    report["output_rows"] = len(merged)
+    report["fanout_avoided"] = max(0, report["naive_rows"] - matched)
+    merged.drop(columns="_merge", inplace=True)
+
+    if name:
+        print_report(name, report)
+    return merged, report
+
+def print_report(name: str, report: Dict[str, int]):
+    print(
+        f"[JOIN] {name}: {report['left_rows']}×{report['right_rows']} → {report['output_rows']} righe "
+        f"(match {report['matched']}, senza match L/R {report['unmatched_left']}/{report['unmatched_right']}, "
+        f"dup scartati L/R {report['left_dupes_dropped']}/{report['right_dupes_dropped']}, "
+        f"fan-out evitato {report['fanout_avoided']})"
+    )
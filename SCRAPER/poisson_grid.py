@@ -0,0 +1,300 @@
+# coding: utf-8
+"""
+Griglia Poisson (NumPy) per tutte le partite in programma
+- Input:
+    public/data/players/matches_season.csv   (current_matches.py)
+    public/data/team_performance.csv         (team_performance.py)
+    public/data/opponent_performance.csv     (opponent_performance.py)
+    public/data/champions_casa.csv / champions_avversari.csv
+    public/data/standings/<league>.csv       (classifiche.py)
+    public/data/team_ratings.json            (team_ratings.py, se presente)
+- Per ogni partita: tassi gol attesi casa/trasferta (rating Dixon-Coles se entrambe
+  le squadre sono nel modello, altrimenti medie gol/xG per partita), matrice dei risultati
+  (0..MAX_GOALS x 0..MAX_GOALS) e mercati derivati (1X2, O/U, Goal/NoGoal, multigol)
+- Tutti i calcoli sono array batch su (n_partite, gol_casa, gol_trasferta):
+  nessun loop Python per partita o per linea.
+
+Output:
+ - public/data/fixture_probabilities.csv
+"""
+
+import os
+import glob
+import json
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+MATCHES_CSV = "public/data/players/matches_season.csv"
+TEAM_PERF_CSV = "public/data/team_performance.csv"
+OPP_PERF_CSV = "public/data/opponent_performance.csv"
+CHAMPIONS_CASA_CSV = "public/data/champions_casa.csv"
+CHAMPIONS_AVV_CSV = "public/data/champions_avversari.csv"
+STANDINGS_DIR = os.path.join("public", "data", "standings")
+RATINGS_JSON = "public/data/team_ratings.json"
+OUTPUT_CSV = "public/data/fixture_probabilities.csv"
+
+MAX_GOALS = 10          # griglia 0..10 gol per squadra (massa residua trascurabile)
+HOME_ADV = 1.10         # fattore moltiplicativo casa / trasferta
+MIN_RATE = 0.2          # come Math.max(predicted, 0.2) lato sito
+PRIOR_MATCHES = 3.0     # shrink verso la media di lega a inizio stagione
+
+TOTAL_LINES = [1.5, 2.5, 3.5]
+TEAM_LINES = [0.5, 1.5, 2.5]
+MULTIGOL_TOTAL = [(1, 2), (1, 3), (2, 3)]
+MULTIGOL_TEAM = [(1, 1), (2, 2), (1, 2), (2, 3)]
+
+# ───────────────────────────────────────────────────
+# Lettura input
+# ───────────────────────────────────────────────────
+def _read_csv(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        print(f"[WARN] file mancante: {path}")
+        return pd.DataFrame()
+    return pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+
+def _num(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s.astype(str).str.replace(",", ".", regex=False), errors="coerce").fillna(0.0)
+
+def _key(s: pd.Series) -> pd.Series:
+    return s.astype(str).str.strip().str.lower()
+
+def load_fixtures(path: str = MATCHES_CSV, from_date: Optional[date] = None) -> pd.DataFrame:
+    """Partite con data >= from_date (default: oggi)."""
+    df = _read_csv(path)
+    if df.empty:
+        return df
+    giorno = pd.to_datetime(df["Giorno"], errors="coerce")
+    cutoff = pd.Timestamp(from_date or date.today())
+    df = df[giorno >= cutoff].copy()
+    df["_lega"] = _key(df["Campionato"])
+    df["_casa"] = _key(df["Squadra Casa"])
+    df["_trasf"] = _key(df["Squadra Trasferta"])
+    return df.reset_index(drop=True)
+
+def _per_match(df: pd.DataFrame, goals_col: str, xg_col: str) -> pd.DataFrame:
+    pg = _num(df["PG"]).replace(0, np.nan)
+    return pd.DataFrame({
+        "goals": _num(df[goals_col]) / pg,
+        "xg": _num(df[xg_col]) / pg,
+        "pg": _num(df["PG"]),
+    })
+
+def load_strengths() -> pd.DataFrame:
+    """
+    Una riga per (lega, squadra) con:
+      att = gol segnati attesi per partita (media gol/xG per partita)
+      dif = gol concessi attesi per partita (media gol/xG concessi per partita)
+    Fonti: team/opponent performance (Big5), champions_casa/avversari (UCL),
+    con le colonne xG/xGA della classifica come ulteriore stima.
+    """
+    frames = []
+
+    tp, op = _read_csv(TEAM_PERF_CSV), _read_csv(OPP_PERF_CSV)
+    if not tp.empty and not op.empty:
+        f = _per_match(tp, "Reti", "xG")
+        f["_lega"], f["_team"] = _key(tp["Competizione"]), _key(tp["Squadra"])
+        # opponent_performance: "Reti"/"xG" = gol/xG concessi dalla squadra
+        a = _per_match(op, "Reti", "xG")
+        a["_lega"], a["_team"] = _key(op["Competizione"]), _key(op["Squadra"])
+        frames.append(f.merge(a, on=["_lega", "_team"], suffixes=("_for", "_ag")))
+
+    cc, ca = _read_csv(CHAMPIONS_CASA_CSV), _read_csv(CHAMPIONS_AVV_CSV)
+    if not cc.empty and not ca.empty:
+        f = _per_match(cc, "Reti", "xG")
+        f["_lega"], f["_team"] = "champions league", _key(cc["Squadra"])
+        a = _per_match(ca, "Reti", "xG")
+        a["_lega"], a["_team"] = "champions league", _key(ca["Squadra"])
+        frames.append(f.merge(a, on=["_lega", "_team"], suffixes=("_for", "_ag")))
+
+    if not frames:
+        return pd.DataFrame(columns=["_lega", "_team", "att", "dif"])
+    st = pd.concat(frames, ignore_index=True)
+
+    std = [_read_csv(p) for p in sorted(glob.glob(os.path.join(STANDINGS_DIR, "*.csv")))]
+    std = [s for s in std if not s.empty]
+    if std:
+        s = pd.concat(std, ignore_index=True)
+        pg = _num(s["PG"]).replace(0, np.nan)
+        s = pd.DataFrame({
+            "_lega": _key(s["Lega"]),
+            "_team": _key(s["Squadra"]),
+            "xg_std": _num(s["xG"]) / pg,
+            "xga_std": _num(s["xGA"]) / pg,
+        })
+        st = st.merge(s, on=["_lega", "_team"], how="left")
+    else:
+        st["xg_std"] = np.nan
+        st["xga_std"] = np.nan
+
+    att = st[["goals_for", "xg_for", "xg_std"]].mean(axis=1, skipna=True)
+    dif = st[["goals_ag", "xg_ag", "xga_std"]].mean(axis=1, skipna=True)
+
+    # shrink verso la media di lega: con poche partite giocate i tassi sono rumorosi
+    league_avg = att.groupby(st["_lega"]).transform("mean")
+    w = st["pg_for"] / (st["pg_for"] + PRIOR_MATCHES)
+    st["att"] = (w * att + (1 - w) * league_avg).fillna(league_avg)
+    league_avg_d = dif.groupby(st["_lega"]).transform("mean")
+    st["dif"] = (w * dif + (1 - w) * league_avg_d).fillna(league_avg_d)
+    return st[["_lega", "_team", "att", "dif"]].drop_duplicates(["_lega", "_team"])
+
+def load_ratings(path: str = RATINGS_JSON) -> Dict:
+    """Parametri per lega di team_ratings.py ({} se il modello non è ancora stato stimato)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("leagues", {})
+
+def rated_goals(fixtures: pd.DataFrame, ratings: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tassi Dixon-Coles: exp(mu + casa + att_casa - dif_trasf), exp(mu + att_trasf - dif_casa).
+    NaN dove la lega o una delle due squadre non è nel modello.
+    """
+    n = len(fixtures)
+    lam_h, lam_a = np.full(n, np.nan), np.full(n, np.nan)
+    for lega, pos in fixtures.groupby("_lega").indices.items():
+        r = ratings.get(lega.replace(" ", "_"))
+        if not r:
+            continue
+        att = {k: t["att"] for k, t in r["teams"].items()}
+        dif = {k: t["def"] for k, t in r["teams"].items()}
+        f = fixtures.iloc[pos]
+        ah, aa = f["_casa"].map(att).to_numpy(dtype=float), f["_trasf"].map(att).to_numpy(dtype=float)
+        dh, da = f["_casa"].map(dif).to_numpy(dtype=float), f["_trasf"].map(dif).to_numpy(dtype=float)
+        lam_h[pos] = np.exp(r["mu"] + r["home"] + ah - da)
+        lam_a[pos] = np.exp(r["mu"] + aa - dh)
+    return lam_h, lam_a
+
+# ───────────────────────────────────────────────────
+# Modello vettoriale
+# ───────────────────────────────────────────────────
+def expected_goals(fixtures: pd.DataFrame, strengths: pd.DataFrame,
+                   ratings: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    lambda_casa  = att_casa  * dif_trasf / media_lega * HOME_ADV
+    lambda_trasf = att_trasf * dif_casa  / media_lega / HOME_ADV
+    Squadre senza dati → media di lega.
+    Con ratings (team_ratings.py) le partite tra squadre stimate usano i tassi del modello.
+    """
+    league_mean = strengths.groupby("_lega")["att"].mean().rename("_mu")
+    s = strengths.set_index(["_lega", "_team"])
+
+    home = pd.MultiIndex.from_arrays([fixtures["_lega"], fixtures["_casa"]])
+    away = pd.MultiIndex.from_arrays([fixtures["_lega"], fixtures["_trasf"]])
+    mu = fixtures["_lega"].map(league_mean).to_numpy(dtype=float)
+    mu = np.where(np.isfinite(mu) & (mu > 0), mu, 1.35)
+
+    def col(idx, c):
+        v = s[c].reindex(idx).to_numpy(dtype=float)
+        return np.where(np.isfinite(v), v, mu)
+
+    lam_h = col(home, "att") * col(away, "dif") / mu * HOME_ADV
+    lam_a = col(away, "att") * col(home, "dif") / mu / HOME_ADV
+    if ratings:
+        rh, ra = rated_goals(fixtures, ratings)
+        known = np.isfinite(rh) & np.isfinite(ra)
+        lam_h, lam_a = np.where(known, rh, lam_h), np.where(known, ra, lam_a)
+    return np.maximum(lam_h, MIN_RATE), np.maximum(lam_a, MIN_RATE)
+
+def poisson_pmf_matrix(lam: np.ndarray, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """PMF Poisson per k = 0..max_goals, shape (n, max_goals+1), in log-space."""
+    k = np.arange(max_goals + 1)
+    log_fact = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, max_goals + 1)))))
+    lam = np.asarray(lam, dtype=float)[:, None]
+    return np.exp(k * np.log(lam) - lam - log_fact)
+
+def score_grid(lam_h: np.ndarray, lam_a: np.ndarray, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """Matrice risultati P[i, casa, trasf], shape (n, G+1, G+1)."""
+    ph = poisson_pmf_matrix(lam_h, max_goals)
+    pa = poisson_pmf_matrix(lam_a, max_goals)
+    return ph[:, :, None] * pa[:, None, :]
+
+def market_probabilities(grid: np.ndarray) -> Dict[str, np.ndarray]:
+    """Tutti i mercati come riduzioni della griglia con maschere (n,)."""
+    g = grid.shape[1]
+    hi, ai = np.indices((g, g))
+    tot = hi + ai
+
+    def p(mask: np.ndarray) -> np.ndarray:
+        return (grid * mask).sum(axis=(1, 2))
+
+    out: Dict[str, np.ndarray] = {}
+    p1, px, p2 = p(hi > ai), p(hi == ai), p(hi < ai)
+    out.update({"1": p1, "X": px, "2": p2, "1X": p1 + px, "X2": px + p2, "12": p1 + p2})
+
+    for line in TOTAL_LINES:
+        over = p(tot > line)
+        out[f"Over {line}"] = over
+        out[f"Under {line}"] = 1 - over
+    for m, n in MULTIGOL_TOTAL:
+        out[f"Multigol {m}-{n}"] = p((tot >= m) & (tot <= n))
+
+    gg = p((hi > 0) & (ai > 0))
+    out["Goal"] = gg
+    out["NoGoal"] = 1 - gg
+
+    for side, goals in (("Casa", hi), ("Trasferta", ai)):
+        for line in TEAM_LINES:
+            over = p(goals > line)
+            out[f"Over {line} {side}"] = over
+            out[f"Under {line} {side}"] = 1 - over
+        for m, n in MULTIGOL_TEAM:
+            out[f"Multigol {m}-{n} {side}"] = p((goals >= m) & (goals <= n))
+    return out
+
+def most_likely_score(grid: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n, g, _ = grid.shape
+    flat = grid.reshape(n, -1)
+    idx = flat.argmax(axis=1)
+    return idx // g, idx % g, flat[np.arange(n), idx]
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build_table(fixtures: pd.DataFrame, strengths: pd.DataFrame,
+                ratings: Optional[Dict] = None) -> pd.DataFrame:
+    lam_h, lam_a = expected_goals(fixtures, strengths, ratings)
+    grid = score_grid(lam_h, lam_a)
+    markets = market_probabilities(grid)
+    sh, sa, sp = most_likely_score(grid)
+
+    cols: List[str] = ["Squadra Casa", "Squadra Trasferta", "Orario", "Giorno", "Campionato"]
+    out = fixtures[cols].copy()
+    out["xG Casa"] = np.round(lam_h, 2)
+    out["xG Trasferta"] = np.round(lam_a, 2)
+    for label, prob in markets.items():
+        # stessa scala del sito (0..100, clamp a 99.9 come clampProb)
+        out[label] = np.round(np.clip(prob * 100, 0, 99.9), 1)
+    out["Risultato"] = [f"{h}-{a}" for h, a in zip(sh, sa)]
+    out["Prob. Risultato"] = np.round(sp * 100, 1)
+    return out
+
+def build():
+    """
+    Calcola e salva OUTPUT_CSV; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non ci sono partite in programma.
+    """
+    fixtures = load_fixtures()
+    if fixtures.empty:
+        print("Nessuna partita in programma trovata.")
+        return False
+    strengths = load_strengths()
+    df = build_table(fixtures, strengths, load_ratings())
+    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
+    df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
+    print(f"💾 Salvato: {OUTPUT_CSV} ({len(df)} partite)")
+    return True
+
+def main():
+    try:
+        build()
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# coding: utf-8
+"""
+Publish della cartella dati (da lanciare dopo gli scraper)
+- Per ogni output in public/data (csv/json) scrive una copia con hash del contenuto
+  nel nome:   players/league_players.csv → dist/players/league_players.<hash>.csv
+- Varianti precompresse accanto a ogni file hashed: .gz (sempre) e .br (se il
+  pacchetto `brotli` è installato), per hosting statico con gzip_static/brotli_static
+- manifest.json: nome logico → file hashed (+ sha256 e dimensioni)
+Il manifest va servito senza cache; i file hashed possono avere cache "immutable":
+se un contenuto non cambia, il nome non cambia e i client non lo riscaricano.
+
+Output:
+ - public/data/dist/**.<hash>.{csv,json}[.gz|.br]
+ - public/data/manifest.json
+"""
+
+import os
+import gzip
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Set
+
+try:
+    import brotli  # opzionale
+except ImportError:
+    brotli = None
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+DATA_DIR = os.path.join("public", "data")
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+PUBLISH_EXT = (".csv", ".json")
+HASH_LEN = 10
+# file hashed delle generazioni precedenti da conservare (client con manifest vecchio in cache)
+KEEP_GENERATIONS = 1
+
+# ───────────────────────────────────────────────────
+# Helpers
+# ───────────────────────────────────────────────────
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def hashed_name(logical: str, digest: str) -> str:
+    """'players/league_players.csv' + digest → 'players/league_players.<hash>.csv'"""
+    stem, ext = os.path.splitext(logical)
+    return f"{stem}.{digest[:HASH_LEN]}{ext}"
+
+def gzip_bytes(data: bytes) -> bytes:
+    # mtime=0 → output deterministico: stesso contenuto, stessi byte
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def brotli_bytes(data: bytes) -> Optional[bytes]:
+    if brotli is None:
+        return None
+    return brotli.compress(data, quality=11)
+
+def _write_if_missing(path: str, data: bytes) -> bool:
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+def iter_outputs(data_dir: str = DATA_DIR) -> Iterable[str]:
+    """Percorsi logici (relativi a data_dir, separatore '/') dei file da pubblicare."""
+    for root, dirs, files in os.walk(data_dir):
+        rel_root = os.path.relpath(root, data_dir)
+        top = rel_root.split(os.sep)[0]
+        if rel_root != "." and (top == DIST_DIRNAME or top.startswith(".")):
+            dirs[:] = []
+            continue
+        dirs.sort()
+        for name in sorted(files):
+            if name == MANIFEST_NAME or not name.endswith(PUBLISH_EXT):
+                continue
+            rel = os.path.normpath(os.path.join(rel_root, name))
+            yield rel.replace(os.sep, "/")
+
+def load_manifest(data_dir: str = DATA_DIR) -> Dict:
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+# ───────────────────────────────────────────────────
+# Publish
+# ───────────────────────────────────────────────────
+def publish(data_dir: str = DATA_DIR) -> Dict:
+    dist = os.path.join(data_dir, DIST_DIRNAME)
+    previous = load_manifest(data_dir)
+    files: Dict[str, Dict] = {}
+    written = unchanged = 0
+
+    for logical in iter_outputs(data_dir):
+        with open(os.path.join(data_dir, logical), "rb") as f:
+            data = f.read()
+        digest = _sha256(data)
+        hashed = hashed_name(logical, digest)
+        target = os.path.join(dist, hashed)
+
+        entry = {"file": f"{DIST_DIRNAME}/{hashed}", "sha256": digest, "bytes": len(data)}
+        if _write_if_missing(target, data):
+            written += 1
+        else:
+            unchanged += 1
+
+        gz = target + ".gz"
+        if not os.path.exists(gz):
+            _write_if_missing(gz, gzip_bytes(data))
+        entry["gzip_bytes"] = os.path.getsize(gz)
+
+        br = target + ".br"
+        if not os.path.exists(br):
+            payload = brotli_bytes(data)
+            if payload is not None:
+                _write_if_missing(br, payload)
+        if os.path.exists(br):
+            entry["br_bytes"] = os.path.getsize(br)
+
+        files[logical] = entry
+
+    generations = list(previous.get("previous", []))
+    prev_files = {k: v["file"] for k, v in previous.get("files", {}).items()}
+    # stessi file della generazione corrente (rerun su dati invariati): niente rotazione,
+    # altrimenti la vera generazione precedente uscirebbe da KEEP_GENERATIONS e verrebbe rimossa
+    if prev_files and prev_files != {k: v["file"] for k, v in files.items()}:
+        generations.insert(0, prev_files)
+    generations = generations[:KEEP_GENERATIONS]
+
+    manifest = {
+        "generated": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "files": files,
+        "previous": generations,
+    }
+    out = os.path.join(data_dir, MANIFEST_NAME)
+    tmp = out + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, out)
+
+    keep: Set[str] = {e["file"] for e in files.values()}
+    for gen in generations:
+        keep.update(gen.values())
+    removed = prune(dist, data_dir, keep)
+
+    print(f"📦 Publish: {len(files)} file ({written} nuovi, {unchanged} invariati, {removed} rimossi)"
+          + ("" if brotli else " — brotli non installato, solo .gz"))
+    return manifest
+
+def prune(dist: str, data_dir: str, keep: Set[str]) -> int:
+    """Rimuove i file hashed (e varianti) non referenziati dal manifest corrente/precedenti."""
+    removed = 0
+    if not os.path.isdir(dist):
+        return 0
+    for root, _, names in os.walk(dist):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, data_dir).replace(os.sep, "/")
+            base = rel[:-3] if rel.endswith((".gz", ".br")) else rel
+            if base not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+def main():
+    try:
+        publish()
+    except Exception as e:
+        print(f"❌ Errore publish: {e}")
+
+if __name__ == "__main__":
+    main()
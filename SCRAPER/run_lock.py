@@ -0,0 +1,287 @@
+# coding: utf-8
+"""
+Coordinamento dei run sovrapposti (lock advisory + coalescing)
+- Un lock di run per (script, argomenti): un secondo trigger mentre lo stesso run è in
+  corso non riparte, si "aggancia" e ne riusa l'esito → zero richieste in più a FBref
+- Un lock per ogni file di output: due run diversi che scrivono lo stesso CSV
+  (es. classifiche completa e classifiche serie_a) non si sovrappongono
+- Lock con flock: rilasciati dal kernel anche se il processo muore, niente lock orfani
+- Chi detiene il lock (pid, host, script, inizio) è scritto nel file di lock
+
+Uso:
+  python SCRAPER/run_lock.py run classifiche.py serie_a
+  python SCRAPER/run_lock.py status
+
+Output:
+ - .cache/locks/*.lock   (holder corrente)
+ - .cache/locks/*.result (esito dell'ultimo run, letto da chi si aggancia)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import glob
+import time
+import socket
+import argparse
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: niente flock → lock disattivati
+    fcntl = None
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCK_DIR = os.path.join(".cache", "locks")
+DATA = "public/data"
+POLL = 2.0                 # secondi tra un tentativo e l'altro mentre si aspetta
+WAIT_TIMEOUT = 3 * 3600    # oltre questo un run bloccato rinuncia
+
+# file scritti da ogni script (senza argomenti)
+SCRIPT_OUTPUTS: Dict[str, List[str]] = {
+    "current_matches.py": [f"{DATA}/players/matches_season.csv"],
+    "download_old.py": [f"{DATA}/all_leagues_matches.csv"],
+    "team_performance.py": [f"{DATA}/team_performance.csv"],
+    "opponent_performance.py": [f"{DATA}/opponent_performance.csv"],
+    "champions_casa.py": [f"{DATA}/champions_casa.csv"],
+    "champions_avversari.py": [f"{DATA}/champions_avv.csv"],
+    "league_players.py": [f"{DATA}/players/league_players.csv"],
+    "champions_league_players.py": [f"{DATA}/players/champions_league_players.csv"],
+    "poisson_grid.py": [f"{DATA}/fixture_probabilities.csv"],
+    "accumulators.py": [f"{DATA}/accumulators.json"],
+    "elo.py": [f"{DATA}/elo_ratings.csv"],
+    "team_ratings.py": [f"{DATA}/team_ratings.json"],
+    "feature_store.py": [".cache/features/manifest.json"],
+    "season_sim.py": [f"{DATA}/season_projections.csv"],
+    "leaderboards.py": [f"{DATA}/players/leaderboards.json"],
+    "team_neighbourhood.py": [f"{DATA}/team_neighbourhood.json"],
+    "search_index.py": [".cache/search/index.npz"],
+    "change_feed.py": [f"{DATA}/changes/changelog.json"],
+    "snapshot_history.py": [f"{DATA}/snapshots"],
+    "publish.py": [f"{DATA}/manifest.json"],
+}
+
+# script con un CSV unico per tutte le leghe: i run filtrati scrivono in --out
+SPLIT_OUTPUT = {"current_matches.py", "download_old.py"}
+
+def out_arg(args: List[str]) -> Optional[str]:
+    """Valore di --out negli argomenti, se presente."""
+    if "--out" in args[:-1]:
+        return args[args.index("--out") + 1]
+    return None
+
+def outputs_for(script: str, args: List[str]) -> List[str]:
+    """Output di uno script; classifiche.py dipende dalle leghe richieste, i run con --out dal percorso dato."""
+    if script in SPLIT_OUTPUT and out_arg(args):
+        return [out_arg(args)]
+    if script == "classifiche.py":
+        from competitions import STANDINGS, active
+        return [f"{DATA}/standings/{c.key}.csv" for c in active(STANDINGS, args)]
+    if script == "incremental.py":
+        from incremental import STAGES
+        return sorted({o for s in STAGES if not args or s.name in args for o in s.outputs})
+    return SCRIPT_OUTPUTS.get(script, [])
+
+# ───────────────────────────────────────────────────
+# Lock
+# ───────────────────────────────────────────────────
+def _lock_path(kind: str, name: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_")
+    return os.path.join(LOCK_DIR, f"{kind}--{safe}.lock")
+
+def run_key(script: str, args: List[str]) -> str:
+    return " ".join([script, *args])
+
+def _holder_info(script: str, args: List[str]) -> Dict:
+    return {
+        "pid": os.getpid(),
+        "host": socket.gethostname(),
+        "run": run_key(script, args),
+        "started": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+def read_holder(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read().strip()
+        return json.loads(text) if text else None
+    except (OSError, ValueError):
+        return None
+
+def try_lock(path: str, holder: Dict):
+    """File aperto e bloccato in esclusiva, oppure None se già preso."""
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    f = open(path, "a+", encoding="utf-8")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return None
+    f.seek(0)
+    f.truncate()
+    f.write(json.dumps(holder))
+    f.flush()
+    return f
+
+def release(f):
+    try:
+        f.seek(0)
+        f.truncate()
+        f.flush()
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+def is_locked(path: str) -> bool:
+    if fcntl is None or not os.path.exists(path):
+        return False
+    with open(path, "a+", encoding="utf-8") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
+
+def wait_unlocked(path: str, timeout: float = WAIT_TIMEOUT) -> bool:
+    deadline = time.monotonic() + timeout
+    while is_locked(path):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(POLL)
+    return True
+
+@contextmanager
+def output_locks(paths: List[str], holder: Dict, timeout: float = WAIT_TIMEOUT) -> Iterator[None]:
+    """Lock esclusivi sugli output, presi in ordine fisso (niente deadlock tra run)."""
+    held = []
+    deadline = time.monotonic() + timeout
+    try:
+        for out in sorted(set(paths)):
+            path = _lock_path("out", out)
+            announced = False
+            while (f := try_lock(path, holder)) is None:
+                if not announced:
+                    other = read_holder(path) or {}
+                    print(f"[WAIT] {out} in scrittura da '{other.get('run', '?')}' (pid {other.get('pid', '?')})")
+                    announced = True
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"lock su {out} non ottenuto entro {timeout:.0f}s")
+                time.sleep(POLL)
+            held.append(f)
+        yield
+    finally:
+        for f in reversed(held):
+            release(f)
+
+# ───────────────────────────────────────────────────
+# Run coordinati
+# ───────────────────────────────────────────────────
+def _result_path(lock_path: str) -> str:
+    return lock_path[:-len(".lock")] + ".result"
+
+def _read_result(lock_path: str) -> Optional[Dict]:
+    return read_holder(_result_path(lock_path))
+
+def _write_result(lock_path: str, result: Dict):
+    tmp = _result_path(lock_path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    os.replace(tmp, _result_path(lock_path))
+
+def run_locked(script: str, args: Optional[List[str]] = None) -> int:
+    """
+    Esegue `python SCRAPER/<script> args` con lock di run + lock sugli output.
+    Se lo stesso run è già in corso si aggancia: aspetta la fine e ne ritorna l'esito.
+    """
+    args = list(args or [])
+    holder = _holder_info(script, args)
+    run_lock = _lock_path("run", run_key(script, args))
+
+    f = try_lock(run_lock, holder)
+    for _ in range(20):
+        # lock preso ma senza holder: è solo una sonda di status()/wait, riprova
+        if f is not None or read_holder(run_lock) is not None:
+            break
+        time.sleep(0.05)
+        f = try_lock(run_lock, holder)
+    if f is None:
+        other = read_holder(run_lock) or {}
+        print(f"[ATTACH] '{run_key(script, args)}' già in corso (pid {other.get('pid', '?')}, "
+              f"dal {other.get('started', '?')}): attendo l'esito")
+        if not wait_unlocked(run_lock):
+            print(f"[WARN] run in corso oltre {WAIT_TIMEOUT}s, rinuncio")
+            return 1
+        result = _read_result(run_lock) or {}
+        print(f"[ATTACH] concluso con codice {result.get('rc', '?')}")
+        return int(result.get("rc", 1))
+
+    rc = 1
+    try:
+        with output_locks(outputs_for(script, args), holder):
+            cmd = [sys.executable, os.path.join(SCRAPER_DIR, script), *args]
+            rc = subprocess.run(cmd, check=False).returncode
+    except Exception as e:
+        print(f"[ERROR] {run_key(script, args)}: {e}")
+    finally:
+        _write_result(run_lock, {**holder, "rc": rc,
+                                 "finished": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")})
+        release(f)
+    return rc
+
+def status() -> List[Dict]:
+    """Stato di tutti i lock noti: chi li tiene ora e l'ultimo esito."""
+    rows = []
+    for path in sorted(glob.glob(os.path.join(LOCK_DIR, "*.lock"))):
+        held = is_locked(path)
+        rows.append({
+            "lock": os.path.basename(path)[:-len(".lock")],
+            "held": held,
+            "holder": read_holder(path) if held else None,
+            "last": _read_result(path),
+        })
+    return rows
+
+def print_status():
+    rows = status()
+    if not rows:
+        print("Nessun lock registrato.")
+    for r in rows:
+        if r["held"]:
+            h = r["holder"] or {}
+            print(f"🔒 {r['lock']:<48} {h.get('run', '?')} (pid {h.get('pid', '?')}@{h.get('host', '?')}, "
+                  f"dal {h.get('started', '?')})")
+        else:
+            last = r["last"] or {}
+            tail = f" (ultimo: rc {last['rc']} alle {last['finished']})" if last else ""
+            print(f"🔓 {r['lock']:<48} libero{tail}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Run coordinati con lock advisory")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="esegue uno script SCRAPER con lock")
+    p_run.add_argument("script")
+    p_run.add_argument("args", nargs=argparse.REMAINDER)
+    sub.add_parser("status", help="mostra lock e holder")
+    args = ap.parse_args()
+
+    if fcntl is None:
+        print("[WARN] fcntl non disponibile: lock disattivati")
+    if args.cmd == "status":
+        print_status()
+    else:
+        sys.exit(run_locked(args.script, args.args))
+
+if __name__ == "__main__":
+    main()
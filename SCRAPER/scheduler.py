@@ -0,0 +1,268 @@
+# coding: utf-8
+"""
+Scheduler "matchday-aware" per gli script SCRAPER (modalità daemon)
+
+Invece di lanciare tutti gli script a cadenza fissa, legge i calendari già prodotti
+da current_matches.py (matches_season.csv) e pianifica i refresh su una coda a priorità:
+ - classifica della lega (classifiche.py <lega>) poco dopo la fine delle sue partite
+ - calendario (current_matches.py: solo partite e orari) dopo l'ultima fascia del giorno
+ - risultati e xG (download_old.py → all_leagues_matches.csv, usato dal sito, da
+   team_ratings, elo e feature_store) una volta per giornata, dopo l'ultima partita
+ - aggregati squadre (team/opponent performance: Big5 + competizioni attive del registro)
+   una volta per giornata
+ - aggregati Champions (champions_casa/avversari) dopo le serate di coppa
+ - tabelle giocatori (league_players, champions_league_players) di notte
+Dopo ogni job: change_feed.py (delta per riga rispetto al run precedente) e incremental.py.
+Ogni job ha jitter casuale; i job girano uno alla volta e ogni richiesta passa dal rate
+limit di fbref_http (FBREF_RATE_PER_MIN, unico budget): job ravvicinati si accodano
+invece di colpire FBref in raffica.
+
+Uso:
+  python SCRAPER/scheduler.py            # daemon
+  python SCRAPER/scheduler.py --dry-run  # stampa il piano e termina
+  python SCRAPER/scheduler.py --rate 6   # richieste FBref al minuto per gli script lanciati
+"""
+
+import os
+import heapq
+import random
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import clock
+from competitions import KICKOFF_TZ, MATCH_LENGTH, SQUADS, active, pages_for
+from fbref_http import RATE_PER_MIN
+from run_lock import run_locked
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+MATCHES_CSV = "public/data/players/matches_season.csv"
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SETTLE = timedelta(minutes=25)            # tempo perché FBref aggiorni i dati
+BIG5_SETTLE = timedelta(minutes=60)
+NIGHTLY_AT = (4, 30)                      # tabelle giocatori alle 04:30
+HORIZON = timedelta(days=2)               # quanto avanti pianificare
+LOOKBACK = timedelta(hours=6)             # partite appena finite non ancora refreshate
+REPLAN_EVERY = timedelta(hours=6)
+JITTER_S = 300                            # 0..5 minuti
+
+# leghe coperte dagli aggregati squadre (Big5 + altre competizioni attive del registro)
+SQUAD_LEAGUES = {c.name.lower() for c in active(SQUADS)}
+
+# priorità: numero più basso = più urgente
+PRIO_STANDINGS, PRIO_SCHEDULE, PRIO_RESULTS, PRIO_AGGREGATES, PRIO_PLAYERS = 0, 1, 2, 3, 4
+
+# costo stimato in richieste per script (pagine scaricate)
+SCRIPT_COST = {
+    "classifiche.py": 1,            # per singola lega
+    "current_matches.py": pages_for("current_matches.py"),
+    "download_old.py": pages_for("download_old.py"),
+    "team_performance.py": pages_for("team_performance.py"),
+    "opponent_performance.py": pages_for("opponent_performance.py"),
+    "champions_casa.py": 2,
+    "champions_avversari.py": 2,
+    "league_players.py": pages_for("league_players.py"),
+    "champions_league_players.py": 3,
+}
+
+# ───────────────────────────────────────────────────
+# Job & coda
+# ───────────────────────────────────────────────────
+@dataclass(order=True)
+class Job:
+    run_at: float
+    priority: int
+    key: str = field(compare=False)
+    scripts: List[Tuple[str, ...]] = field(compare=False, default_factory=list)
+
+    @property
+    def cost(self) -> int:
+        return sum(SCRIPT_COST.get(s[0], 2) for s in self.scripts)
+
+class JobQueue:
+    """Heap per (run_at, priority) con coalescing per chiave: un solo job pendente per key."""
+
+    def __init__(self):
+        self._heap: List[Job] = []
+        self._pending: Dict[str, Job] = {}
+
+    def push(self, job: Job) -> bool:
+        cur = self._pending.get(job.key)
+        if cur is not None and cur.run_at <= job.run_at:
+            return False
+        if cur is not None:
+            cur.key = ""  # invalidato, verrà scartato al pop
+        self._pending[job.key] = job
+        heapq.heappush(self._heap, job)
+        return True
+
+    def pop(self) -> Optional[Job]:
+        while self._heap:
+            job = heapq.heappop(self._heap)
+            if job.key and self._pending.get(job.key) is job:
+                del self._pending[job.key]
+                return job
+        return None
+
+    def peek(self) -> Optional[Job]:
+        while self._heap and not (self._heap[0].key and self._pending.get(self._heap[0].key) is self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+# ───────────────────────────────────────────────────
+# Pianificazione dai calendari
+# ───────────────────────────────────────────────────
+def league_key(campionato: str) -> str:
+    """'Serie A' -> 'serie_a' (come i file di classifiche.py)."""
+    return campionato.strip().lower().replace(" ", "_")
+
+def load_kickoffs(path: str = MATCHES_CSV) -> pd.DataFrame:
+    """Colonne: lega (lowercase), kickoff (datetime tz-aware)."""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["lega", "kickoff"])
+    df = pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    orario = df["Orario"].where(df["Orario"].str.strip() != "", "15:00")
+    ts = pd.to_datetime(df["Giorno"] + " " + orario, errors="coerce", format="mixed")
+    out = pd.DataFrame({"lega": df["Campionato"].str.strip().str.lower(), "kickoff": ts})
+    out = out.dropna(subset=["kickoff"])
+    out["kickoff"] = out["kickoff"].dt.tz_localize(KICKOFF_TZ, nonexistent="shift_forward", ambiguous="NaT")
+    return out.dropna(subset=["kickoff"])
+
+def _jitter(ts: datetime) -> float:
+    return ts.timestamp() + random.uniform(0, JITTER_S)
+
+def _nightly(now: datetime) -> datetime:
+    run = now.replace(hour=NIGHTLY_AT[0], minute=NIGHTLY_AT[1], second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+def plan_jobs(kickoffs: pd.DataFrame, now: datetime) -> List[Job]:
+    """
+    Job per le partite che finiscono in [now - LOOKBACK, now + HORIZON]:
+    una slot per (lega, giorno) e una per giornata (giorno) sugli aggregati.
+    """
+    jobs: List[Job] = []
+    if not kickoffs.empty:
+        ko = kickoffs.copy()
+        ko["end"] = ko["kickoff"] + MATCH_LENGTH
+        ko = ko[(ko["end"] >= now - LOOKBACK) & (ko["end"] <= now + HORIZON)]
+        ko["giorno"] = ko["kickoff"].dt.date
+
+        last_end = ko.groupby(["lega", "giorno"])["end"].max()
+        for (lega, g), end in last_end.items():
+            when = max(end + SETTLE, now)
+            jobs.append(Job(_jitter(when), PRIO_STANDINGS, f"standings:{lega}:{g}",
+                            [("classifiche.py", league_key(lega))]))
+
+        # calendario unico per tutte le leghe: dopo l'ultima fascia del giorno
+        for g, end in ko.groupby("giorno")["end"].max().items():
+            jobs.append(Job(_jitter(max(end + SETTLE, now)), PRIO_SCHEDULE, f"schedule:{g}",
+                            [("current_matches.py",)]))
+
+        # risultati/xG di tutte le leghe in un solo file: un run completo per giornata
+        # (un run filtrato per lega scrive solo in un CSV a parte, --out)
+        for g, end in ko.groupby("giorno")["end"].max().items():
+            jobs.append(Job(_jitter(max(end + BIG5_SETTLE, now)), PRIO_RESULTS, f"results:{g}",
+                            [("download_old.py",)]))
+
+        big5 = ko[ko["lega"].isin(SQUAD_LEAGUES)]
+        for g, end in big5.groupby("giorno")["end"].max().items():
+            jobs.append(Job(_jitter(max(end + BIG5_SETTLE, now)), PRIO_AGGREGATES, f"big5:{g}",
+                            [("team_performance.py",), ("opponent_performance.py",)]))
+
+        ucl = ko[ko["lega"] == "champions league"]
+        for g, end in ucl.groupby("giorno")["end"].max().items():
+            jobs.append(Job(_jitter(max(end + BIG5_SETTLE, now)), PRIO_AGGREGATES, f"ucl:{g}",
+                            [("champions_casa.py",), ("champions_avversari.py",)]))
+
+    night = _nightly(now)
+    jobs.append(Job(_jitter(night), PRIO_PLAYERS, f"players:{night.date()}",
+                    [("league_players.py",), ("champions_league_players.py",)]))
+    return jobs
+
+# ───────────────────────────────────────────────────
+# Esecuzione
+# ───────────────────────────────────────────────────
+def run_script(script: str, *args: str) -> int:
+    """Via run_lock: un run uguale già in corso (es. avviato a mano) non viene duplicato."""
+    print(f"[RUN] {' '.join([os.path.join(SCRIPTS_DIR, script), *args])}")
+    try:
+        return run_locked(script, list(args))
+    except Exception as e:
+        print(f"[ERROR] {script}: {e}")
+        return 1
+
+def run_job(job: Job):
+    for entry in job.scripts:
+        rc = run_script(*entry)
+        if rc != 0:
+            print(f"[WARN] {entry[0]} terminato con codice {rc}")
+    # delta per riga dei dataset appena scaricati (changes/), poi gli artefatti derivati:
+    # si ricostruiscono solo quelli con input cambiati
+    run_script("change_feed.py")
+    run_script("incremental.py")
+
+def _fmt(ts: float) -> str:
+    return datetime.fromtimestamp(ts, KICKOFF_TZ).strftime("%Y-%m-%d %H:%M")
+
+def daemon(dry_run: bool = False, rate_per_min: float = RATE_PER_MIN):
+    # gli script ereditano il limite: è l'unico budget di richieste verso FBref
+    os.environ["FBREF_RATE_PER_MIN"] = str(rate_per_min)
+    queue = JobQueue()
+    done: set = set()
+    next_replan = 0.0
+
+    while True:
+        now = clock.now()
+        if now >= next_replan:
+            added = 0
+            for job in plan_jobs(load_kickoffs(), datetime.fromtimestamp(now, KICKOFF_TZ)):
+                if job.key not in done and queue.push(job):
+                    added += 1
+            next_replan = now + REPLAN_EVERY.total_seconds()
+            print(f"[PLAN] {added} nuovi job, {len(queue)} in coda")
+
+        if dry_run:
+            while (job := queue.pop()) is not None:
+                print(f"  {_fmt(job.run_at)}  p{job.priority}  {job.key:<32} {job.scripts}")
+            return
+
+        job = queue.peek()
+        if job is None:
+            clock.sleep(min(600.0, max(1.0, next_replan - now)))
+            continue
+
+        wait = job.run_at - now
+        if wait > 0:
+            # non dormire oltre il prossimo replan: i calendari possono cambiare
+            clock.sleep(min(wait, max(1.0, next_replan - now)))
+            continue
+
+        queue.pop()
+        print(f"[JOB] {job.key} (~{job.cost} richieste, ≥{job.cost / rate_per_min:.1f} min a {rate_per_min:g}/min)")
+        run_job(job)
+        done.add(job.key)
+
+        if any(s[0] == "current_matches.py" for s in job.scripts):
+            next_replan = 0.0  # nuovi orari → ripianifica subito
+
+def main():
+    ap = argparse.ArgumentParser(description="Scheduler matchday-aware per gli script FBref")
+    ap.add_argument("--dry-run", action="store_true", help="stampa i job pianificati e termina")
+    ap.add_argument("--rate", type=float, default=RATE_PER_MIN, help="richieste FBref al minuto (FBREF_RATE_PER_MIN)")
+    args = ap.parse_args()
+    try:
+        daemon(dry_run=args.dry_run, rate_per_min=args.rate)
+    except KeyboardInterrupt:
+        print("\nScheduler interrotto.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# coding: utf-8
+"""
+Indice di ricerca precalcolato per giocatori e squadre
+- Input:
+    public/data/players/league_players.csv            (league_players.py)
+    public/data/players/champions_league_players.csv  (champions_league_players.py)
+    public/data/standings/*.csv, public/data/team_performance.csv (squadre)
+- Nomi normalizzati: accenti rimossi (NFKD + lettere speciali ø/ß/ł/đ/ı/þ...),
+  minuscolo, punteggiatura → spazio
+- Voci:
+    prefissi di ogni parola (fino a MAX_PREFIX caratteri) → id entità
+    trigrammi del nome completo → id entità (ricerca approssimata, errori di battitura)
+- Ranking: nome esatto > tutte le parole come prefisso > somiglianza trigrammi (Dice),
+  a parità vince il peso (minuti giocati; squadre prima dei giocatori)
+- Formato compatto: chiavi ordinate + offset + posting concatenati (uint16/uint32)
+  in un .npz compresso; nessun CSV da caricare per cercare
+
+Uso:
+  python SCRAPER/search_index.py                 # costruisce l'indice
+  python SCRAPER/search_index.py "lautaro"      # prova una ricerca
+
+  from search_index import search
+  search("mbape", limit=5)
+
+Output:
+ - .cache/search/index.npz
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import glob
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from competitions import COMPETITIONS
+from poisson_grid import _read_csv
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+LEAGUE_CSV = "public/data/players/league_players.csv"
+CHAMPIONS_CSV = "public/data/players/champions_league_players.csv"
+STANDINGS_DIR = os.path.join("public", "data", "standings")
+TEAM_PERF_CSV = "public/data/team_performance.csv"
+INDEX_NPZ = os.path.join(".cache", "search", "index.npz")
+
+MAX_PREFIX = 8          # prefissi più lunghi vengono verificati sul nome
+MIN_DICE = 0.35         # somiglianza minima per i risultati approssimati
+TEAM_WEIGHT = 1e6       # squadre davanti ai giocatori a parità di punteggio
+CUP_NAMES = {c.name.lower() for c in COMPETITIONS if c.cup}
+
+# lettere che NFKD non scompone
+_FOLD = str.maketrans({"ø": "o", "ß": "ss", "ł": "l", "đ": "d", "ı": "i", "þ": "th", "ð": "d",
+                       "æ": "ae", "œ": "oe", "’": "'"})
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize(text: str) -> str:
+    """'Ødegaard' → 'odegaard', 'Vinicius Júnior' → 'vinicius junior'."""
+    s = unicodedata.normalize("NFKD", str(text).lower().translate(_FOLD))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", s.replace("'", "")).strip()
+
+def trigrams(norm: str) -> List[str]:
+    padded = f"  {norm} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+# ───────────────────────────────────────────────────
+# Entità
+# ───────────────────────────────────────────────────
+def load_entities() -> pd.DataFrame:
+    """Una riga per squadra (lega) e per giocatore (squadra, competizione)."""
+    frames = []
+    for path, comp in ((LEAGUE_CSV, None), (CHAMPIONS_CSV, "Champions League")):
+        df = _read_csv(path)
+        if df.empty:
+            continue
+        frames.append(pd.DataFrame({
+            "kind": "player",
+            "name": df["Giocatore"].str.strip(),
+            "team": df["Squadra"].str.strip(),
+            "league": comp or df["Competizione"].str.strip(),
+            "weight": pd.to_numeric(df["Min"].str.replace(",", "", regex=False), errors="coerce").fillna(0),
+        }))
+
+    teams = [_read_csv(p) for p in sorted(glob.glob(os.path.join(STANDINGS_DIR, "*.csv")))]
+    teams = [pd.DataFrame({"name": t["Squadra"], "league": t["Lega"].str.title()}) for t in teams if not t.empty]
+    tp = _read_csv(TEAM_PERF_CSV)
+    if not tp.empty:
+        teams.append(pd.DataFrame({"name": tp["Squadra"], "league": tp["Competizione"]}))
+    if teams:
+        t = pd.concat(teams, ignore_index=True)
+        t["name"] = t["name"].str.strip()
+        # una squadra in Champions e in campionato resta etichettata col campionato
+        cup = t["league"].str.strip().str.lower().isin(CUP_NAMES)
+        t = t.assign(_cup=cup).sort_values("_cup", kind="stable").drop_duplicates("name")
+        frames.append(pd.DataFrame({"kind": "team", "name": t["name"], "team": t["name"],
+                                    "league": t["league"], "weight": TEAM_WEIGHT}))
+    if not frames:
+        return pd.DataFrame(columns=["kind", "name", "team", "league", "weight"])
+    ent = pd.concat(frames, ignore_index=True)
+    ent = ent[ent["name"] != ""].drop_duplicates(["kind", "name", "team", "league"])
+    ent["norm"] = ent["name"].map(normalize)
+    return ent.sort_values(["weight", "name"], ascending=[False, True]).reset_index(drop=True)
+
+# ───────────────────────────────────────────────────
+# Costruzione / serializzazione
+# ───────────────────────────────────────────────────
+def _postings(table: Dict[str, set], dtype) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    keys = sorted(table)
+    lists = [np.array(sorted(table[k]), dtype=dtype) for k in keys]
+    offsets = np.concatenate([[0], np.cumsum([len(x) for x in lists])]).astype(np.uint32)
+    flat = np.concatenate(lists) if lists else np.zeros(0, dtype=dtype)
+    return np.array(keys, dtype=str), offsets, flat
+
+def build_index(ent: pd.DataFrame) -> Dict[str, np.ndarray]:
+    prefixes: Dict[str, set] = defaultdict(set)
+    grams: Dict[str, set] = defaultdict(set)
+    n_grams = np.zeros(len(ent), dtype=np.uint16)
+    for i, norm in enumerate(ent["norm"]):
+        for tok in norm.split():
+            for p in range(1, min(len(tok), MAX_PREFIX) + 1):
+                prefixes[tok[:p]].add(i)
+        g = trigrams(norm)
+        n_grams[i] = len(g)
+        for t in g:
+            grams[t].add(i)
+    dtype = np.uint16 if len(ent) < 65536 else np.uint32
+    pk, po, pp = _postings(prefixes, dtype)
+    tk, to, tp = _postings(grams, dtype)
+    return {
+        "kind": ent["kind"].to_numpy(dtype=str), "name": ent["name"].to_numpy(dtype=str),
+        "team": ent["team"].to_numpy(dtype=str), "league": ent["league"].to_numpy(dtype=str),
+        "norm": ent["norm"].to_numpy(dtype=str), "weight": ent["weight"].to_numpy(dtype=np.float32),
+        "n_grams": n_grams,
+        "prefix_keys": pk, "prefix_offsets": po, "prefix_postings": pp,
+        "gram_keys": tk, "gram_offsets": to, "gram_postings": tp,
+    }
+
+def save(arrays: Dict[str, np.ndarray], path: str = INDEX_NPZ):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+
+# ───────────────────────────────────────────────────
+# Query
+# ───────────────────────────────────────────────────
+class SearchIndex:
+    """Indice caricato in memoria; le chiavi diventano dict → lookup O(1) per voce."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.kind = arrays["kind"].tolist()
+        self.name = arrays["name"].tolist()
+        self.team = arrays["team"].tolist()
+        self.league = arrays["league"].tolist()
+        self.norm = arrays["norm"].tolist()
+        self.n_grams = arrays["n_grams"].astype(np.int32)
+        self._prefix = self._table(arrays, "prefix")
+        self._gram = self._table(arrays, "gram")
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        for i, n in enumerate(self.norm):
+            self._exact[n].append(i)
+
+    @staticmethod
+    def _table(arrays, name) -> Dict[str, np.ndarray]:
+        keys, off, post = arrays[f"{name}_keys"], arrays[f"{name}_offsets"], arrays[f"{name}_postings"]
+        return {k: post[off[i]:off[i + 1]] for i, k in enumerate(keys.tolist())}
+
+    @classmethod
+    def load(cls, path: str = INDEX_NPZ) -> "SearchIndex":
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def _prefix_ids(self, tokens: List[str]) -> List[int]:
+        """Entità in cui ogni parola della query è prefisso di una parola del nome."""
+        ids: Optional[set] = None
+        for tok in sorted(tokens, key=len, reverse=True):   # più selettiva prima
+            post = self._prefix.get(tok[:MAX_PREFIX])
+            if post is None:
+                return []
+            cand = post.tolist() if ids is None else [i for i in post.tolist() if i in ids]
+            if len(tok) > MAX_PREFIX:
+                cand = [i for i in cand if any(w.startswith(tok) for w in self.norm[i].split())]
+            ids = set(cand)
+            if not ids:
+                return []
+        return sorted(ids or ())
+
+    def _fuzzy_ids(self, norm: str, exclude: set) -> List[Tuple[float, int]]:
+        q = trigrams(norm)
+        posts = [self._gram[g] for g in q if g in self._gram]
+        if not posts:
+            return []
+        counts = np.bincount(np.concatenate(posts), minlength=len(self.norm))
+        cand = np.flatnonzero(counts * 2 >= MIN_DICE * (len(q) + 1))
+        dice = 2 * counts[cand] / (len(q) + self.n_grams[cand])
+        keep = dice >= MIN_DICE
+        return [(float(d), int(i)) for d, i in zip(dice[keep], cand[keep]) if int(i) not in exclude]
+
+    def search(self, query: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict]:
+        """Risultati ordinati: esatti, per prefisso, approssimati (entità già ordinate per peso)."""
+        norm = normalize(query)
+        if not norm:
+            return []
+        scored: List[Tuple[float, int]] = [(3.0, i) for i in self._exact.get(norm, [])]
+        seen = {i for _, i in scored}
+        scored += [(2.0, i) for i in self._prefix_ids(norm.split()) if i not in seen]
+        if kind:
+            scored = [(s, i) for s, i in scored if self.kind[i] == kind]
+        if len(scored) < limit:
+            seen = {i for _, i in scored}
+            fuzzy = [(s, i) for s, i in self._fuzzy_ids(norm, seen) if not kind or self.kind[i] == kind]
+            scored += fuzzy
+        # id più basso = peso maggiore (entità ordinate per peso in costruzione)
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [{"kind": self.kind[i], "name": self.name[i], "team": self.team[i],
+                 "league": self.league[i], "score": round(s, 3)} for s, i in scored[:limit]]
+
+_INDEX: Optional[SearchIndex] = None
+
+def search(query: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict]:
+    """Ricerca sull'indice salvato (caricato alla prima chiamata)."""
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = SearchIndex.load()
+    return _INDEX.search(query, limit=limit, kind=kind)
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build():
+    """
+    Costruisce e salva INDEX_NPZ; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non ci sono giocatori né squadre.
+    """
+    ent = load_entities()
+    if ent.empty:
+        print("Nessun giocatore o squadra trovati.")
+        return False
+    arrays = build_index(ent)
+    save(arrays)
+    n_pl = int((ent["kind"] == "player").sum())
+    print(f"💾 Salvato: {INDEX_NPZ} ({n_pl} giocatori, {len(ent) - n_pl} squadre, "
+          f"{len(arrays['prefix_keys'])} prefissi, {len(arrays['gram_keys'])} trigrammi, "
+          f"{os.path.getsize(INDEX_NPZ) / 1024:.0f} KB)")
+    return True
+
+def main():
+    try:
+        if len(sys.argv) > 1:
+            idx = SearchIndex.load()
+            t0 = time.perf_counter()
+            res = idx.search(" ".join(sys.argv[1:]))
+            us = (time.perf_counter() - t0) * 1e6
+            for r in res:
+                print(f"  [{r['kind']}] {r['name']} — {r['team']} ({r['league']})  {r['score']}")
+            print(f"[INFO] {len(res)} risultati in {us:.0f} µs")
+        else:
+            build()
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
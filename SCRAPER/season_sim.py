@@ -0,0 +1,247 @@
+# coding: utf-8
+"""
+Simulazione Monte Carlo delle stagioni (classifiche finali attese)
+- Input:
+    public/data/standings/<league>.csv       (classifica attuale: Pt, DR, Rf)
+    public/data/players/matches_season.csv   (partite rimanenti: da oggi, escluse quelle di
+                                              oggi già finite, già contate in classifica)
+    + forze squadra di poisson_grid (team/opponent performance, xG/xGA classifica,
+      rating Dixon-Coles di team_ratings.py se presenti)
+- Per ogni partita rimanente: tassi gol attesi come poisson_grid.expected_goals,
+  gol estratti da Poisson indipendenti (CDF invertita) per N stagioni alla volta
+- Tutto in array batch (stagioni, partite): punti/gol per squadra con un prodotto
+  matriciale partite→squadre, classifica finale con un argsort per riga
+  (criteri: punti, differenza reti, gol fatti, poi sorteggio)
+- I batch girano su un process pool; ogni batch ha il proprio stream
+  (SeedSequence(seed, lega).spawn) → risultati identici con 1 o N processi
+- Solo campionati (la Champions ha fase a eliminazione diretta)
+
+Uso:
+  python SCRAPER/season_sim.py                       # SIMS stagioni per lega
+  python SCRAPER/season_sim.py --sims 500000 --workers 8 --seed 7
+
+Output:
+ - public/data/season_projections.csv
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import clock
+from competitions import KICKOFF_TZ, MATCH_LENGTH
+from poisson_grid import (MAX_GOALS, _key, _num, _read_csv, expected_goals, load_fixtures,
+                          load_ratings, load_strengths, poisson_pmf_matrix)
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+STANDINGS_DIR = os.path.join("public", "data", "standings")
+OUTPUT_CSV = "public/data/season_projections.csv"
+
+SIMS = 200_000          # stagioni simulate per lega
+BATCH = 5_000           # stagioni per batch (memoria ~ BATCH × partite rimanenti)
+SEED = 20250815
+TOP = 4                 # posti "Champions"
+
+# retrocessioni dirette per lega (chiave = file di classifiche.py)
+RELEGATION = {
+    "premier_league": 3,
+    "la_liga": 3,
+    "serie_a": 3,
+    "bundesliga": 2,
+    "ligue_1": 2,
+}
+
+# ───────────────────────────────────────────────────
+# Input per lega
+# ───────────────────────────────────────────────────
+def remaining_fixtures(now: datetime) -> pd.DataFrame:
+    """
+    Partite da oggi in poi senza quelle già finite (calcio d'inizio + MATCH_LENGTH ≤ now):
+    matches_season.csv non ha i risultati e le classifiche vengono aggiornate subito dopo
+    la fine delle partite, quindi simularle di nuovo le conterebbe due volte.
+    """
+    fx = load_fixtures(from_date=now.date())
+    if fx.empty:
+        return fx
+    orario = fx["Orario"].where(fx["Orario"].astype(str).str.strip() != "", "15:00")
+    ko = pd.to_datetime(fx["Giorno"] + " " + orario, errors="coerce", format="mixed")
+    ko = ko.dt.tz_localize(KICKOFF_TZ, nonexistent="shift_forward", ambiguous="NaT")
+    ended = (ko + MATCH_LENGTH <= pd.Timestamp(now)).fillna(False)
+    return fx[~ended].reset_index(drop=True)
+
+def load_league(league: str, fixtures: pd.DataFrame, strengths: pd.DataFrame,
+                ratings: Optional[Dict] = None) -> Optional[Dict]:
+    """Classifica attuale + partite rimanenti tra squadre della classifica, come array."""
+    table = _read_csv(os.path.join(STANDINGS_DIR, f"{league}.csv"))
+    if table.empty:
+        return None
+    lega = _key(table["Lega"]).iloc[0]
+    teams = table["Squadra"].astype(str).str.strip().tolist()
+    idx = {t.lower(): i for i, t in enumerate(teams)}
+
+    fx = fixtures[fixtures["_lega"] == lega]
+    home = fx["_casa"].map(idx)
+    away = fx["_trasf"].map(idx)
+    known = home.notna() & away.notna()
+    if (~known).any():
+        print(f"[WARN] {league}: {int((~known).sum())} partite con squadre non in classifica, ignorate")
+    fx = fx[known]
+    lam_h, lam_a = expected_goals(fx, strengths, ratings) if len(fx) else (np.zeros(0), np.zeros(0))
+
+    return {
+        "league": league,
+        "teams": teams,
+        "points": _num(table["Pt"]).to_numpy(dtype=np.int64),
+        "gd": _num(table["DR"]).to_numpy(dtype=np.int64),
+        "gf": _num(table["Rf"]).to_numpy(dtype=np.int64),
+        "home": home[known].to_numpy(dtype=np.int64),
+        "away": away[known].to_numpy(dtype=np.int64),
+        "lam_h": lam_h,
+        "lam_a": lam_a,
+    }
+
+# ───────────────────────────────────────────────────
+# Simulazione vettoriale
+# ───────────────────────────────────────────────────
+def sample_goals(rng, lam: np.ndarray, n: int) -> np.ndarray:
+    """
+    Gol Poisson per (n stagioni, partite) per inversione della CDF troncata a MAX_GOALS
+    (come la griglia di poisson_grid): un uniforme float32 + MAX_GOALS confronti
+    vettoriali, molto più rapido di rng.poisson su milioni di estrazioni.
+    """
+    cdf = np.cumsum(poisson_pmf_matrix(lam, MAX_GOALS), axis=1)[:, :-1].astype(np.float32)
+    u = rng.random((n, len(lam)), dtype=np.float32)
+    goals = np.zeros((n, len(lam)), dtype=np.int8)
+    for k in range(cdf.shape[1]):
+        goals += u > cdf[:, k]
+    return goals
+
+def simulate_batch(lg: Dict, n: int, seed) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    n stagioni → (conteggi posizioni finali (squadre, posizioni), somma punti finali per squadra).
+    Squadre e partite sono poche: il lavoro è tutto sull'asse delle stagioni.
+    """
+    rng = np.random.default_rng(seed)
+    t = len(lg["teams"])
+    f = len(lg["home"])
+
+    # incidenza partita→squadra (f, t): punti/gol per squadra = prodotto matriciale
+    h_inc = np.zeros((f, t), dtype=np.float32)
+    a_inc = np.zeros((f, t), dtype=np.float32)
+    h_inc[np.arange(f), lg["home"]] = 1.0
+    a_inc[np.arange(f), lg["away"]] = 1.0
+
+    gh = sample_goals(rng, lg["lam_h"], n)
+    ga = sample_goals(rng, lg["lam_a"], n)
+    draw = (gh == ga).astype(np.float32)
+    pts_h = 3 * (gh > ga) + draw
+    pts_a = 3 * (ga > gh) + draw
+    diff = (gh - ga).astype(np.float32)
+
+    points = lg["points"] + np.rint(pts_h @ h_inc + pts_a @ a_inc)
+    gd = lg["gd"] + np.rint(diff @ h_inc - diff @ a_inc)
+    gf = lg["gf"] + np.rint(gh.astype(np.float32) @ h_inc + ga.astype(np.float32) @ a_inc)
+
+    # chiave unica: punti ≫ differenza reti ≫ gol fatti ≫ sorteggio
+    key = points * 1e8 + (gd + 1e4) * 1e3 + gf + rng.random((n, t))
+    order = np.argsort(-key, axis=1)
+    pos = np.empty_like(order)
+    np.put_along_axis(pos, order, np.arange(t)[None, :], axis=1)
+
+    counts = np.bincount((np.arange(t)[None, :] * t + pos).ravel(), minlength=t * t).reshape(t, t)
+    return counts, points.sum(axis=0)
+
+def _batches(n: int, batch: int = BATCH) -> List[int]:
+    return [min(batch, n - i) for i in range(0, n, batch)]
+
+def simulate(leagues: List[Dict], sims: int = SIMS, seed: int = SEED,
+             workers: Optional[int] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Batch di tutte le leghe in un unico pool; somma dei conteggi per lega."""
+    tasks = []
+    for li, lg in enumerate(leagues):
+        sizes = _batches(sims)
+        streams = np.random.SeedSequence([seed, li]).spawn(len(sizes))
+        tasks += [(lg, n, s) for n, s in zip(sizes, streams)]
+
+    totals: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if workers == 1:
+        results = [simulate_batch(*t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(simulate_batch, *zip(*tasks)))
+    for (lg, _, _), (counts, pts) in zip(tasks, results):
+        c, p = totals.get(lg["league"], (0, 0))
+        totals[lg["league"]] = (c + counts, p + pts)
+    return totals
+
+# ───────────────────────────────────────────────────
+# Output
+# ───────────────────────────────────────────────────
+def projection_table(lg: Dict, counts: np.ndarray, pts_sum: np.ndarray, sims: int) -> pd.DataFrame:
+    t = len(lg["teams"])
+    prob = counts / sims
+    rel = RELEGATION.get(lg["league"], 3)
+    out = pd.DataFrame({
+        "Lega": lg["league"],
+        "Squadra": lg["teams"],
+        "Pt": lg["points"],
+        "Pt attesi": np.round(pts_sum / sims, 1),
+        "Pos media": np.round(prob @ np.arange(1, t + 1), 2),
+        "Titolo %": np.round(prob[:, 0] * 100, 2),
+        f"Top {TOP} %": np.round(prob[:, :TOP].sum(axis=1) * 100, 2),
+        "Retrocessione %": np.round(prob[:, t - rel:].sum(axis=1) * 100, 2),
+    })
+    for p in range(t):
+        out[f"P{p + 1} %"] = np.round(prob[:, p] * 100, 2)
+    return out.sort_values(["Pos media", "Squadra"]).reset_index(drop=True)
+
+def build(sims: int = SIMS, seed: int = SEED, workers: Optional[int] = None):
+    """
+    Calcola e salva OUTPUT_CSV; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non c'è nessuna classifica da simulare.
+    """
+    fixtures = remaining_fixtures(datetime.fromtimestamp(clock.now(), KICKOFF_TZ))
+    strengths = load_strengths()
+    ratings = load_ratings()
+    leagues = [lg for lg in (load_league(k, fixtures, strengths, ratings) for k in RELEGATION) if lg]
+    if not leagues:
+        print("Nessuna classifica trovata.")
+        return False
+
+    t0 = time.perf_counter()
+    totals = simulate(leagues, sims=sims, seed=seed, workers=workers)
+    elapsed = time.perf_counter() - t0
+
+    df = pd.concat([projection_table(lg, *totals[lg["league"]], sims) for lg in leagues], ignore_index=True)
+    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
+    df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
+    for lg in leagues:
+        print(f"[SIM] {lg['league']}: {len(lg['home'])} partite rimanenti × {sims} stagioni")
+    print(f"💾 Salvato: {OUTPUT_CSV} ({len(df)} squadre, {elapsed:.1f}s di simulazione)")
+    return True
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulazione Monte Carlo delle classifiche finali")
+    ap.add_argument("--sims", type=int, default=SIMS, help="stagioni simulate per lega")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--workers", type=int, default=None, help="processi (default: tutti i core)")
+    args = ap.parse_args()
+    try:
+        build(sims=args.sims, seed=args.seed, workers=args.workers)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# coding: utf-8
+"""
+Sharding dei job di refresh su più runner CI (modello di costo + LPT)
+- Un job = (script, argomenti): classifiche, calendari e storico vanno per lega,
+  gli aggregati Big5/Champions e le tabelle giocatori sono job unici
+- Costo di un job = media mobile (EWMA) dei tempi misurati nei run precedenti
+  (fetch + parsing + pause di cortesia); senza storico: pagine stimate × SECONDS_PER_PAGE
+- Assegnazione Longest-Processing-Time first: job dal più pesante, ognuno allo shard
+  meno carico → makespan entro 4/3 dell'ottimo, tempo totale ≈ somma / N
+- Il piano si calcola una volta sola (plan --out) e lo stesso file va a tutti i runner:
+  nessun runner ripianifica con uno storico diverso (job doppi o saltati)
+- Ogni shard gira da solo (IP e sessione propri) e salva gli output per job in una
+  cartella (calendari e risultati per lega ci scrivono direttamente con --out);
+  merge ricompone public/data (i CSV divisi per lega vengono riconcatenati
+  nell'ordine canonico) e aggiorna lo storico dei tempi
+- Storico dei tempi versionato nel repo (SCRAPER/shard_timings.json): chi pianifica
+  lo trova su ogni checkout; va committato dopo il merge insieme ai dati
+
+Uso:
+  python SCRAPER/shard_plan.py plan 4 --out plan.json        # piano (da passare ai runner)
+  python SCRAPER/shard_plan.py run --plan plan.json --shard 0/4 --out shards/0
+  python SCRAPER/shard_plan.py merge shards/0 shards/1 shards/2 shards/3
+
+Output:
+ - plan.json                                 (plan --out: job di ogni shard)
+ - <out>/shard.json e <out>/parts/<n>/...   (run: output di ogni job dello shard)
+ - public/data/...                           (merge)
+ - SCRAPER/shard_timings.json                (merge: storico tempi per job)
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import heapq
+import shutil
+import argparse
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from competitions import AGGREGATE, PER_COMPETITION, keys_for, pages_for
+from run_lock import DATA, SPLIT_OUTPUT, outputs_for, run_key, run_locked
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+TIMINGS_FILE = os.environ.get("FBREF_SHARD_TIMINGS") or os.path.join(SCRAPER_DIR, "shard_timings.json")
+SECONDS_PER_PAGE = 12.0   # fetch + parsing + rate limit, stima iniziale
+EWMA_ALPHA = 0.3          # peso dell'ultimo run nella media mobile
+
+# script divisibili per lega → pagine per singola lega (registro competizioni)
+PER_LEAGUE = {script: pages for script, (_, pages) in PER_COMPETITION.items()}
+# script non divisibili → pagine totali (aggregati: Big5 + competizioni attive)
+WHOLE = {
+    **{script: pages_for(script) for script in AGGREGATE},
+    "champions_casa.py": 2,
+    "champions_avversari.py": 2,
+    "champions_league_players.py": 3,
+}
+
+# ───────────────────────────────────────────────────
+# Job e storico
+# ───────────────────────────────────────────────────
+@dataclass
+class ShardJob:
+    index: int                # posizione canonica: ordine di ricomposizione dei CSV
+    script: str
+    args: Tuple[str, ...]
+    pages: int
+
+    @property
+    def key(self) -> str:
+        return run_key(self.script, list(self.args))
+
+def league_keys(script: str) -> List[str]:
+    """Chiavi lega nell'ordine in cui lo script le scrive (= ordine delle righe nel CSV)."""
+    return keys_for(script)
+
+def all_jobs() -> List[ShardJob]:
+    specs: List[Tuple[str, Tuple[str, ...], int]] = []
+    for script, pages in PER_LEAGUE.items():
+        specs += [(script, (lg,), pages) for lg in league_keys(script)]
+    specs += [(script, (), pages) for script, pages in WHOLE.items()]
+    return [ShardJob(i, s, a, p) for i, (s, a, p) in enumerate(specs)]
+
+def load_timings(path: str = TIMINGS_FILE) -> Dict[str, Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_timings(timings: Dict[str, Dict], path: str = TIMINGS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(timings, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def record(timings: Dict[str, Dict], key: str, seconds: float):
+    t = timings.get(key)
+    if t is None:
+        timings[key] = {"ewma": round(seconds, 2), "last": round(seconds, 2), "runs": 1}
+    else:
+        t["ewma"] = round(EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * t["ewma"], 2)
+        t["last"] = round(seconds, 2)
+        t["runs"] += 1
+
+def estimate(job: ShardJob, timings: Dict[str, Dict]) -> float:
+    t = timings.get(job.key)
+    return float(t["ewma"]) if t else job.pages * SECONDS_PER_PAGE
+
+# ───────────────────────────────────────────────────
+# Piano LPT
+# ───────────────────────────────────────────────────
+def plan(n: int, jobs: Optional[List[ShardJob]] = None,
+         timings: Optional[Dict[str, Dict]] = None) -> List[List[ShardJob]]:
+    """
+    Longest-Processing-Time first. Deterministico solo a parità di storico e di
+    competizioni attive: per questo i runner leggono il piano salvato (save_plan).
+    """
+    jobs = all_jobs() if jobs is None else jobs
+    timings = load_timings() if timings is None else timings
+    shards: List[List[ShardJob]] = [[] for _ in range(n)]
+    heap = [(0.0, i) for i in range(n)]
+    for job in sorted(jobs, key=lambda j: (-estimate(j, timings), j.index)):
+        load, i = heapq.heappop(heap)
+        shards[i].append(job)
+        heapq.heappush(heap, (load + estimate(job, timings), i))
+    for s in shards:
+        s.sort(key=lambda j: j.index)
+    return shards
+
+def save_plan(shards: List[List[ShardJob]], path: str):
+    obj = {"of": len(shards),
+           "shards": [[{"index": j.index, "script": j.script, "args": list(j.args), "pages": j.pages}
+                       for j in s] for s in shards]}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=1)
+
+def load_plan(path: str) -> List[List[ShardJob]]:
+    with open(path, encoding="utf-8") as f:
+        obj = json.load(f)
+    return [[ShardJob(j["index"], j["script"], tuple(j["args"]), j["pages"]) for j in s]
+            for s in obj["shards"]]
+
+def print_plan(n: int, out: Optional[str] = None):
+    timings = load_timings()
+    shards = plan(n, timings=timings)
+    if out:
+        save_plan(shards, out)
+    total = sum(estimate(j, timings) for s in shards for j in s)
+    loads = [sum(estimate(j, timings) for j in s) for s in shards]
+    for i, (s, load) in enumerate(zip(shards, loads)):
+        print(f"\n── shard {i}/{n}: {len(s)} job, ~{load / 60:.1f} min")
+        for j in s:
+            src = "storico" if j.key in timings else "stima"
+            print(f"  {j.key:<40} {estimate(j, timings):>7.1f}s ({src})")
+    makespan = max(loads) if loads else 0.0
+    speedup = total / makespan if makespan else 1.0
+    print(f"\nTotale ~{total / 60:.1f} min, makespan ~{makespan / 60:.1f} min → speedup ×{speedup:.2f}")
+    if out:
+        print(f"💾 Piano salvato: {out}")
+
+# ───────────────────────────────────────────────────
+# Run di uno shard
+# ───────────────────────────────────────────────────
+def _rel(path: str) -> str:
+    return os.path.relpath(path, DATA).replace(os.sep, "/")
+
+def _part(out_dir: str, job: ShardJob, path: str) -> str:
+    return os.path.join(out_dir, "parts", str(job.index), _rel(path))
+
+def job_args(job: ShardJob, out_dir: str) -> List[str]:
+    """
+    Argomenti del run: i job per lega degli script a CSV unico scrivono direttamente nella
+    parte (--out), senza riscrivere il file condiviso in public/data con una sola lega.
+    """
+    args = list(job.args)
+    if job.script in SPLIT_OUTPUT and args:
+        (path,) = outputs_for(job.script, [])
+        args += ["--out", _part(out_dir, job, path)]
+    return args
+
+def run_shard(shard: int, n: int, out_dir: str, plan_file: str) -> int:
+    """Esegue i job dello shard dal piano condiviso; gli output di ogni job vanno in <out>/parts/<index>/."""
+    shards = load_plan(plan_file)
+    if len(shards) != n:
+        raise ValueError(f"{plan_file} è un piano per {len(shards)} shard, non {n}")
+    jobs = shards[shard]
+    manifest = {"shard": shard, "of": n, "jobs": []}
+    failed = 0
+    print(f"[SHARD] {shard}/{n}: {len(jobs)} job")
+    for job in jobs:
+        t0 = time.monotonic()
+        args = job_args(job, out_dir)
+        rc = run_locked(job.script, args)
+        seconds = time.monotonic() - t0
+        saved = []
+        if rc == 0:
+            for path in outputs_for(job.script, list(job.args)):
+                dest = _part(out_dir, job, path)
+                written = dest if "--out" in args else path   # con --out già nella parte
+                if os.path.exists(written):
+                    if written != dest:
+                        os.makedirs(os.path.dirname(dest), exist_ok=True)
+                        shutil.copyfile(written, dest)
+                    saved.append(_rel(path))
+        else:
+            failed += 1
+            print(f"[WARN] {job.key} terminato con codice {rc}")
+        print(f"[TIME] {job.key}: {seconds:.1f}s")
+        manifest["jobs"].append({"index": job.index, "key": job.key, "rc": rc,
+                                 "seconds": round(seconds, 2), "outputs": saved})
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "shard.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return 1 if failed else 0
+
+# ───────────────────────────────────────────────────
+# Merge
+# ───────────────────────────────────────────────────
+def concat_csv(parts: List[str], dest: str):
+    """Concatenazione testuale: stessa intestazione, righe nell'ordine delle parti (byte-identico al run unico)."""
+    header = None
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp = dest + ".tmp"
+    with open(tmp, "w", encoding="utf-8-sig", newline="") as out:
+        for p in parts:
+            with open(p, encoding="utf-8-sig", newline="") as f:
+                first = f.readline()
+                if header is None:
+                    header = first
+                    out.write(first)
+                elif first != header:
+                    raise ValueError(f"intestazione diversa in {p}")
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, dest)
+
+def merge(shard_dirs: List[str], dest: str = DATA) -> int:
+    """Ricompone dest dagli output degli shard; un file con qualche parte fallita resta quello precedente."""
+    timings = load_timings()
+    parts: Dict[str, List[Tuple[int, str]]] = {}
+    failed: Dict[str, List[str]] = {}
+    seen: Dict[int, int] = {}
+    for d in shard_dirs:
+        with open(os.path.join(d, "shard.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        seen[manifest["shard"]] = manifest["of"]
+        for j in manifest["jobs"]:
+            if j["rc"] != 0:
+                script, *args = j["key"].split(" ")
+                for path in outputs_for(script, args):
+                    failed.setdefault(_rel(path), []).append(j["key"])
+                continue
+            record(timings, j["key"], j["seconds"])
+            for rel in j["outputs"]:
+                parts.setdefault(rel, []).append((j["index"], os.path.join(d, "parts", str(j["index"]), rel)))
+
+    n = max(seen.values(), default=0)
+    missing = sorted(set(range(n)) - set(seen))
+    if missing or len(set(seen.values())) > 1:
+        # CSV per lega senza alcune parti = leghe sparite dal file: meglio non toccare nulla
+        raise ValueError(f"shard mancanti {missing} o piani diversi tra le cartelle")
+
+    written = 0
+    for rel, items in sorted(parts.items()):
+        if rel in failed:
+            print(f"[WARN] {rel}: job falliti {failed[rel]}, tengo la versione precedente")
+            continue
+        target = os.path.join(dest, rel)
+        files = [p for _, p in sorted(items)]
+        if len(files) == 1:
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            shutil.copyfile(files[0], target)
+        else:
+            concat_csv(files, target)
+        written += 1
+        print(f"[MERGE] {rel} ({len(files)} parti)")
+    save_timings(timings)
+    print(f"💾 {written} file ricomposti in {dest}")
+    return 1 if failed else 0
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def _parse_shard(value: str) -> Tuple[int, int]:
+    i, n = (int(x) for x in value.split("/"))
+    if not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"shard {value} fuori range")
+    return i, n
+
+def main():
+    ap = argparse.ArgumentParser(description="Sharding dei job FBref su più runner")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_plan = sub.add_parser("plan", help="mostra il piano per N shard")
+    p_plan.add_argument("n", type=int)
+    p_plan.add_argument("--out", help="salva il piano (da passare a run --plan)")
+    p_run = sub.add_parser("run", help="esegue uno shard")
+    p_run.add_argument("--plan", required=True, help="piano salvato da plan --out")
+    p_run.add_argument("--shard", type=_parse_shard, required=True, help="i/N, es. 0/4")
+    p_run.add_argument("--out", required=True, help="cartella degli output dello shard")
+    p_merge = sub.add_parser("merge", help="ricompone public/data dagli shard")
+    p_merge.add_argument("dirs", nargs="+")
+    p_merge.add_argument("--dest", default=DATA)
+    args = ap.parse_args()
+
+    try:
+        if args.cmd == "plan":
+            print_plan(args.n, args.out)
+        elif args.cmd == "run":
+            sys.exit(run_shard(*args.shard, args.out, args.plan))
+        else:
+            sys.exit(merge(args.dirs, args.dest))
+    except Exception as e:
+        print(f"❌ Errore shard: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
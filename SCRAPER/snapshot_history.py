@@ -0,0 +1,313 @@
+# coding: utf-8
+"""
+Storico compresso a delta di classifiche, statistiche squadra e giocatori
+- Ogni run registra i dataset in DATASETS come delta per chiave rispetto allo snapshot
+  precedente (stesso diff vettoriale di change_feed.py: righe aggiunte, chiavi rimosse,
+  solo le celle cambiate), con checkpoint completi periodici
+- Nuovo checkpoint quando: primo snapshot, schema/chiavi cambiati, MAX_CHAIN delta dalla
+  base oppure delta accumulati più grandi del checkpoint stesso (ricostruzione veloce,
+  spazio ≤ ~2× le modifiche)
+- Giorni senza modifiche non scrivono nulla → lo spazio cresce con le modifiche,
+  non con il numero di giorni; uno snapshot per data (un nuovo run nello stesso giorno
+  sostituisce quello registrato)
+- Ricostruzione esatta: se cambia l'ordine delle righe il delta porta la permutazione
+- API di lettura: dates(), snapshot(dataset, data), series(dataset, chiave, colonne)
+- Gira come stage di incremental.py: scheduler.py lo lancia dopo ogni job, quindi ogni
+  refresh che cambia i dataset viene registrato
+
+Uso:
+  python SCRAPER/snapshot_history.py                                   # registra il run
+  python SCRAPER/snapshot_history.py --date 2025-09-14                 # data esplicita
+  python SCRAPER/snapshot_history.py --show standings/serie_a.csv --at 2025-09-14
+  python SCRAPER/snapshot_history.py --series standings/serie_a.csv Squadra=Inter --cols Pos Pt
+
+Output:
+ - public/data/snapshots/<dataset>/index.json
+ - public/data/snapshots/<dataset>/<data>.{full|delta}.json.gz
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import glob
+import gzip
+import json
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import clock
+from change_feed import DATA_DIR, PLAYER_KEYS, diff_frames, pick_keys, read_table, _sha256
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+# .json.gz: versionato con i dati ma ignorato da publish.py (solo .csv/.json)
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+
+MAX_CHAIN = 30          # delta massimi tra due checkpoint
+CHAIN_RATIO = 1.0       # checkpoint se i delta accumulati superano questa frazione del completo
+
+# nome logico (glob relativo a DATA_DIR) → chiavi candidate, la prima presente vince
+DATASETS: Dict[str, List[List[str]]] = {
+    "standings/*.csv": [["Lega", "Squadra"]],
+    "team_performance.csv": [["Competizione", "Squadra"]],
+    "players/league_players.csv": PLAYER_KEYS,
+}
+
+# ───────────────────────────────────────────────────
+# File del singolo dataset
+# ───────────────────────────────────────────────────
+def _dir(logical: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, os.path.splitext(logical)[0])
+
+def _read_gz(path: str) -> Dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_gz(path: str, obj) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        # mtime=0 → stesso contenuto, stessi byte (diff git puliti)
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+def load_index(logical: str) -> List[Dict]:
+    try:
+        with open(os.path.join(_dir(logical), "index.json"), encoding="utf-8") as f:
+            return json.load(f)["snapshots"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+def _save_index(logical: str, entries: List[Dict]):
+    path = os.path.join(_dir(logical), "index.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"dataset": logical, "snapshots": entries}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+# ───────────────────────────────────────────────────
+# Delta
+# ───────────────────────────────────────────────────
+def _key_index(df: pd.DataFrame, keys: List[str]) -> pd.MultiIndex:
+    return pd.MultiIndex.from_frame(df[keys])
+
+def make_delta(old: pd.DataFrame, new: pd.DataFrame, keys: List[str]) -> Dict:
+    """Delta old → new; "order" solo se l'ordine dopo apply_delta non coincide già con new."""
+    d = diff_frames(old, new, keys)
+    d["keys"] = keys
+    rebuilt = apply_delta(old, d)
+    perm = _key_index(rebuilt, keys).get_indexer(_key_index(new, keys))
+    if not np.array_equal(perm, np.arange(len(new))):
+        d["order"] = perm.tolist()
+    return d
+
+def apply_delta(df: pd.DataFrame, d: Dict) -> pd.DataFrame:
+    """Rimosse → fuori, cambiate → celle aggiornate, aggiunte → in coda, poi eventuale riordino."""
+    keys = d["keys"]
+    idx = _key_index(df, keys)
+    out = df
+    if d["removed"]:
+        gone = idx.isin(pd.MultiIndex.from_frame(pd.DataFrame(d["removed"], columns=keys)))
+        out = out[~gone]
+        idx = idx[~gone]
+    if d["changed"]:
+        out = out.copy()
+        rows = idx.get_indexer(pd.MultiIndex.from_tuples([tuple(c[k] for k in keys) for c in d["changed"]],
+                                                         names=keys))
+        cols = {c: j for j, c in enumerate(out.columns)}
+        values = out.to_numpy(dtype=object)
+        for r, c in zip(rows, d["changed"]):
+            for col, val in c["set"].items():
+                values[r, cols[col]] = val
+        out = pd.DataFrame(values, columns=out.columns)
+    if d["added"]:
+        out = pd.concat([out, pd.DataFrame(d["added"], columns=df.columns)], ignore_index=True)
+    out = out.reset_index(drop=True)
+    if "order" in d:
+        out = out.iloc[d["order"]].reset_index(drop=True)
+    return out
+
+def _full(df: pd.DataFrame, keys: Optional[List[str]]) -> Dict:
+    return {"keys": keys, "columns": list(df.columns), "rows": df.to_numpy(dtype=object).tolist()}
+
+def _from_full(obj: Dict) -> pd.DataFrame:
+    return pd.DataFrame(obj["rows"], columns=obj["columns"], dtype=object).astype(str)
+
+# ───────────────────────────────────────────────────
+# Lettura
+# ───────────────────────────────────────────────────
+def dates(logical: str) -> List[str]:
+    return [e["date"] for e in load_index(logical)]
+
+def _chain(entries: List[Dict], date: Optional[str]) -> List[Dict]:
+    """Ultimo checkpoint ≤ date + delta successivi fino a date."""
+    upto = [e for e in entries if date is None or e["date"] <= date]
+    if not upto:
+        return []
+    start = max(i for i, e in enumerate(upto) if e["kind"] == "full")
+    return upto[start:]
+
+def _rebuild(logical: str, entries: List[Dict], date: Optional[str] = None) -> Optional[pd.DataFrame]:
+    chain = _chain(entries, date)
+    if not chain:
+        return None
+    base = _dir(logical)
+    df = _from_full(_read_gz(os.path.join(base, chain[0]["file"])))
+    for e in chain[1:]:
+        df = apply_delta(df, _read_gz(os.path.join(base, e["file"])))
+    return df
+
+def snapshot(logical: str, date: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Dataset com'era alla data (YYYY-MM-DD, None = ultimo); None se non registrato."""
+    return _rebuild(logical, load_index(logical), date)
+
+def series(logical: str, key: Dict[str, str], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Serie storica di una sola entità (es. {"Lega": "serie a", "Squadra": "Inter"}):
+    una riga per snapshot in cui l'entità esiste. Legge i checkpoint e i delta ma
+    segue solo la riga richiesta, senza ricostruire le tabelle intere.
+    """
+    base = _dir(logical)
+    rows: List[Dict] = []
+    cur: Optional[Dict[str, str]] = None
+    for e in load_index(logical):
+        obj = _read_gz(os.path.join(base, e["file"]))
+        if e["kind"] == "full":
+            cols = obj["columns"]
+            want = [cols.index(k) for k in key]
+            cur = next((dict(zip(cols, r)) for r in obj["rows"]
+                        if all(r[j] == v for j, v in zip(want, key.values()))), None)
+        else:
+            match = lambda rec: all(rec.get(k) == v for k, v in key.items())
+            if cur is not None and any(match(r) for r in obj["removed"]):
+                cur = None
+            for c in obj["changed"]:
+                if cur is not None and match(c):
+                    cur.update(c["set"])
+            for r in obj["added"]:
+                if match(r):
+                    cur = dict(r)
+        if cur is not None:
+            rows.append({"date": e["date"], **{c: cur.get(c, "") for c in (columns or cur)}})
+    return pd.DataFrame(rows)
+
+# ───────────────────────────────────────────────────
+# Scrittura
+# ───────────────────────────────────────────────────
+def record(logical: str, candidates: List[List[str]], date: str) -> Optional[str]:
+    """Registra lo stato attuale del dataset alla data; ritorna il tipo scritto o None."""
+    path = os.path.join(DATA_DIR, logical)
+    sha = _sha256(path)
+    entries = load_index(logical)
+    base = _dir(logical)
+
+    # stessa data: il nuovo run sostituisce lo snapshot del giorno. Il file sostituito si
+    # cancella solo dopo aver salvato il nuovo indice (un errore a metà lascia lo storico valido)
+    replaced = None
+    if entries and entries[-1]["date"] == date:
+        if entries[-1]["sha256"] == sha:
+            return None
+        replaced = entries.pop()["file"]
+    if entries and entries[-1]["sha256"] == sha:
+        # tornato allo snapshot precedente: basta togliere quello del giorno
+        if replaced:
+            _save_index(logical, entries)
+            os.remove(os.path.join(base, replaced))
+        return None
+
+    new = read_table(path)
+    keys = pick_keys(new, candidates)
+    unique = keys is not None and not new.duplicated(subset=keys).any()
+    prev = _rebuild(logical, entries)
+
+    chain = _chain(entries, None)
+    chain_bytes = sum(e["bytes"] for e in chain[1:])
+    full_bytes = chain[0]["bytes"] if chain else 0
+    need_full = (prev is None or not unique
+                 or list(prev.columns) != list(new.columns)
+                 or chain[0].get("keys") != keys
+                 or len(chain) > MAX_CHAIN
+                 or chain_bytes > CHAIN_RATIO * full_bytes)
+
+    if need_full:
+        kind, obj = "full", _full(new, keys if unique else None)
+    else:
+        kind, obj = "delta", make_delta(prev, new, keys)
+    name = f"{date}.{kind}.json.gz"
+    size = _write_gz(os.path.join(base, name), obj)
+    entries.append({"date": date, "kind": kind, "file": name, "sha256": sha,
+                    "keys": keys if unique else None, "rows": len(new), "bytes": size})
+    _save_index(logical, entries)
+    if replaced and replaced != name:
+        os.remove(os.path.join(base, replaced))
+    return kind
+
+def _expand() -> List[tuple]:
+    out = []
+    for pattern, keys in DATASETS.items():
+        for path in sorted(glob.glob(os.path.join(DATA_DIR, pattern))):
+            out.append((os.path.relpath(path, DATA_DIR).replace(os.sep, "/"), keys))
+    return out
+
+def build(date: Optional[str] = None):
+    """
+    Registra tutti i dataset; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non c'è nessun dataset da registrare.
+    """
+    date = date or datetime.fromtimestamp(clock.now(), timezone.utc).strftime("%Y-%m-%d")
+    datasets = _expand()
+    if not datasets:
+        print("Nessun dataset da registrare.")
+        return False
+    written = 0
+    for logical, candidates in datasets:
+        kind = record(logical, candidates, date)
+        if kind:
+            written += 1
+            e = load_index(logical)[-1]
+            print(f"[SNAP] {logical}: {'checkpoint' if kind == 'full' else 'delta'} {e['bytes'] / 1024:.1f} KB")
+    if not written:
+        print(f"Nessuna modifica da registrare ({date}).")
+        return True
+    total = sum(os.path.getsize(p) for p in glob.glob(os.path.join(SNAPSHOT_DIR, "**", "*.gz"), recursive=True))
+    print(f"💾 Snapshot {date}: {written} dataset, storico totale {total / 1024:.0f} KB")
+    return True
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description="Storico compresso a delta dei dataset")
+    ap.add_argument("--date", help="data dello snapshot da registrare (YYYY-MM-DD)")
+    ap.add_argument("--show", metavar="DATASET", help="stampa lo snapshot ricostruito")
+    ap.add_argument("--at", help="data per --show (default: ultimo)")
+    ap.add_argument("--series", nargs="+", metavar=("DATASET", "COL=VAL"), help="serie di un'entità")
+    ap.add_argument("--cols", nargs="*", help="colonne per --series")
+    args = ap.parse_args()
+    try:
+        if args.show:
+            df = snapshot(args.show, args.at)
+            if df is None:
+                raise ValueError(f"nessuno snapshot per {args.show}")
+            print(df.to_string(index=False))
+        elif args.series:
+            logical, *pairs = args.series
+            key = dict(p.split("=", 1) for p in pairs)
+            print(series(logical, key, args.cols).to_string(index=False))
+        else:
+            build(args.date)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
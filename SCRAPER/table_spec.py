@@ -0,0 +1,313 @@
+# coding: utf-8
+"""
+Spec dichiarative per le tabelle FBref → estrattori compilati e in cache
+- TableSpec: pagina (template URL), id tabella (esatto o regex, con segnaposto),
+  modalità "intestazione" (2ª riga del thead, troncata a PrgP) oppure colonne per
+  data-stat con sinonimi; rename e pulizia per tabella
+- OutputSpec: tabelle da unire, chiavi di join, nomi/ordine finali, dtypes, file di output
+- compile_table(): ogni spec viene compilata una volta sola (lru_cache) in un estrattore
+  lxml che fa un unico passaggio sulle righe; le tabelle dentro <!-- ... --> vengono
+  cercate solo nei commenti che contengono l'id, senza riparsare tutti gli altri
+- Una pagina condivisa da più tabelle (es. for/against) viene scaricata una volta per build
+
+Nuovi output = nuova OutputSpec, senza riscrivere la logica di parsing.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from fbref_http import lazy_import, fetch
+from player_join import PLAYER_ID_COL, extract_player_id
+
+pd = lazy_import("pandas")
+lxml_html = lazy_import("lxml.html")
+
+# ───────────────────────────────────────────────────
+# Spec
+# ───────────────────────────────────────────────────
+class Col(NamedTuple):
+    """Colonna in output (`name`) presa dal primo data-stat presente tra `stats`."""
+    name: str
+    stats: Tuple[str, ...]
+
+def _pairs(d) -> Tuple[Tuple[str, str], ...]:
+    return tuple(d.items()) if isinstance(d, dict) else tuple(d)
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    url: str                                  # template, es. ".../comp/{comp}/stats/..."
+    table_id: str                             # id esatto o regex (se regex=True)
+    columns: Tuple[Col, ...] = ()             # vuoto → modalità intestazione
+    regex: bool = False
+    stop_at: Optional[str] = "PrgP"           # tronca le colonne d'intestazione dopo questa
+    link_text: bool = True                    # testo del link/alt dell'img se presenti
+    require_all: bool = False                 # solo righe con tutti i data-stat richiesti
+    player_id: bool = False                   # aggiunge PLAYER_ID_COL dal link giocatore
+    rename: Tuple[Tuple[str, str], ...] = ()
+    prepare: Optional[Callable] = None        # df → df, prima del join
+
+    def __post_init__(self):
+        object.__setattr__(self, "columns", tuple(Col(c[0], tuple(c[1])) for c in self.columns))
+        object.__setattr__(self, "rename", _pairs(self.rename))
+
+@dataclass(frozen=True)
+class OutputSpec:
+    name: str
+    path: str
+    tables: Tuple[TableSpec, ...]
+    on: Tuple[str, ...] = ("Squadra",)
+    how: str = "inner"
+    rename: Tuple[Tuple[str, str], ...] = ()
+    order: Tuple[str, ...] = ()               # vuoto → tutte le colonne così come sono
+    fill_missing: bool = True                 # colonne di `order` assenti → ""
+    keep_extra: bool = False                  # colonne fuori da `order` in coda
+    dtypes: Tuple[Tuple[str, type], ...] = ()
+    encoding: str = "utf-8-sig"
+    finish: Optional[Callable] = None         # df → df, dopo join/rename, prima di dtypes/ordine
+    join: Optional[Callable] = None           # (left, right, on, how, name) → df
+
+    def __post_init__(self):
+        object.__setattr__(self, "tables", tuple(self.tables))
+        object.__setattr__(self, "on", tuple(self.on))
+        object.__setattr__(self, "rename", _pairs(self.rename))
+        object.__setattr__(self, "order", tuple(self.order))
+        object.__setattr__(self, "dtypes", _pairs(self.dtypes))
+
+# ───────────────────────────────────────────────────
+# Helpers DOM (lxml)
+# ───────────────────────────────────────────────────
+def cell_text(el) -> str:
+    """Come bs4 get_text(strip=True): pezzi di testo strippati e concatenati."""
+    return "".join(s.strip() for s in el.itertext())
+
+def _link_text(el) -> str:
+    a = el.find(".//a")
+    if a is not None:
+        return cell_text(a)
+    img = el.find(".//img")
+    if img is not None:
+        return (img.get("alt") or "").strip()
+    return cell_text(el)
+
+def _row_player_id(cells) -> str:
+    for c in cells:
+        if c.get("data-stat") == "player":
+            a = c.find(".//a")
+            return extract_player_id(a.get("href")) if a is not None else ""
+    return ""
+
+def _is_header_row(tr) -> bool:
+    return "thead" in (tr.get("class") or "").split()
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Virgola decimale → punto e niente virgolette, vettoriale su tutte le colonne."""
+    for col in df.columns:
+        df[col] = df[col].astype(str).str.replace('"', "", regex=False).str.replace(",", ".", regex=False)
+    return df
+
+# ───────────────────────────────────────────────────
+# Estrattore compilato
+# ───────────────────────────────────────────────────
+class Extractor:
+    def __init__(self, spec: TableSpec):
+        self.spec = spec
+        self._text = _link_text if spec.link_text else cell_text
+        # tutti i data-stat utili (sinonimi compresi): lookup O(1) per cella
+        self._wanted = frozenset(ds for col in spec.columns for ds in col.stats)
+        self._rename = dict(spec.rename)
+
+    def _id_matcher(self, table_id: str):
+        if self.spec.regex:
+            rx = re.compile(table_id)
+            return (lambda tid: bool(tid) and rx.fullmatch(tid) is not None), rx.search
+        needle = f'id="{table_id}"'
+        return (lambda tid: tid == table_id), (lambda text: needle in text)
+
+    def find_table(self, doc, table_id: str):
+        match, in_comment = self._id_matcher(table_id)
+        if not self.spec.regex:
+            t = doc.get_element_by_id(table_id, None)
+            if t is not None and t.tag == "table":
+                return t
+        else:
+            for t in doc.iter("table"):
+                if match(t.get("id")):
+                    return t
+        # dentro i commenti: riparsa solo quelli che contengono l'id
+        from lxml import etree
+
+        for com in doc.iter(etree.Comment):
+            text = com.text or ""
+            if "<table" not in text or not in_comment(text):
+                continue
+            frag = lxml_html.fromstring(text)
+            for t in frag.iter("table"):
+                if match(t.get("id")):
+                    print(f"Found table with ID '{t.get('id')}' within comments.")
+                    return t
+        return None
+
+    def extract(self, html: str, **params) -> pd.DataFrame:
+        table_id = self.spec.table_id.format(**params)
+        doc = lxml_html.fromstring(html)
+        table = self.find_table(doc, table_id)
+        if table is None:
+            raise ValueError(f"Tabella con ID '{table_id}' non trovata.")
+        rows = self._by_header(table, table_id) if not self.spec.columns else self._by_datastat(table)
+        df = normalize_frame(rows)
+        if self._rename:
+            df.rename(columns=self._rename, inplace=True)
+        if self.spec.prepare is not None:
+            df = self.spec.prepare(df)
+        return df
+
+    def _body_rows(self, table):
+        for tbody in table.iter("tbody"):
+            for tr in tbody.iterchildren("tr"):
+                if not _is_header_row(tr):
+                    yield tr
+
+    def _by_header(self, table, table_id: str) -> pd.DataFrame:
+        thead = table.find("thead")
+        header_rows = thead.findall("tr") if thead is not None else []
+        if len(header_rows) < 2:
+            raise ValueError(f"Non ci sono abbastanza righe di intestazione nella tabella con ID '{table_id}'.")
+        headers = [cell_text(th) for th in header_rows[1].iter("th")]
+        stop = len(headers)
+        if self.spec.stop_at and self.spec.stop_at in headers:
+            stop = headers.index(self.spec.stop_at) + 1
+        headers = headers[:stop]
+
+        text, with_id = self._text, self.spec.player_id
+        rows = []
+        for tr in self._body_rows(table):
+            cells = [c for c in tr.iterchildren() if c.tag in ("th", "td")]
+            if not any(c.tag == "th" and c.get("scope") == "row" for c in cells):
+                continue
+            row = [text(c) for c in cells[:stop]]
+            row += [""] * (stop - len(row))
+            if with_id:
+                row.append(_row_player_id(cells))
+            rows.append(row)
+        return pd.DataFrame(rows, columns=headers + ([PLAYER_ID_COL] if with_id else []))
+
+    def _by_datastat(self, table) -> pd.DataFrame:
+        cols, wanted, text = self.spec.columns, self._wanted, self._text
+        present = set()
+        raw: List[Tuple[Dict[str, str], str]] = []
+        # unico passaggio: per riga solo le celle con data-stat richiesti
+        for tr in self._body_rows(table):
+            cells = [c for c in tr.iterchildren() if c.tag in ("th", "td")]
+            vals = {}
+            for c in cells:
+                ds = c.get("data-stat")
+                if ds in wanted:
+                    vals[ds] = text(c)
+            if not vals:
+                continue
+            present.update(vals)
+            raw.append((vals, _row_player_id(cells) if self.spec.player_id else ""))
+
+        chosen = [next((s for s in col.stats if s in present), None) for col in cols]
+        missing = [col.stats[0] for col, ds in zip(cols, chosen) if ds is None]
+        if missing:
+            print(f"Warning: The following data-stat keys are missing: {', '.join(missing)}")
+
+        rows = []
+        for vals, pid in raw:
+            if self.spec.require_all and any(ds is None or ds not in vals for ds in chosen):
+                continue
+            row = [vals.get(ds, "") if ds else "" for ds in chosen]
+            if self.spec.player_id:
+                row.append(pid)
+            rows.append(row)
+        names = [c.name for c in cols] + ([PLAYER_ID_COL] if self.spec.player_id else [])
+        df = pd.DataFrame(rows, columns=names)
+        df.attrs["missing"] = [col.name for col, ds in zip(cols, chosen) if ds is None]
+        return df
+
+@lru_cache(maxsize=None)
+def compile_table(spec: TableSpec) -> Extractor:
+    return Extractor(spec)
+
+# ───────────────────────────────────────────────────
+# Build di un output
+# ───────────────────────────────────────────────────
+def _merge(left, right, on, how, name):
+    return pd.merge(left, right, on=list(on), how=how)
+
+def _report_empty(frames: List[pd.DataFrame], on: Tuple[str, ...]):
+    print(f"Merged dataframe is empty. Check if {', '.join(on)} matches correctly in all tables.")
+    keys = [set(map(tuple, f[list(on)].to_numpy())) if all(k in f.columns for k in on) else set()
+            for f in frames]
+    for i, k in enumerate(keys):
+        others = set().union(*(keys[:i] + keys[i + 1:])) if len(keys) > 1 else set()
+        print(f"  solo nella tabella {i + 1}: {sorted(k - others)[:20]}")
+
+def apply_dtypes(df: pd.DataFrame, dtypes) -> pd.DataFrame:
+    for col, dtype in dtypes:
+        if col not in df.columns:
+            print(f"Colonna '{col}' non trovata nel dataframe.")
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except Exception as e:
+            print(f"Errore nella conversione della colonna '{col}': {e}")
+    return df
+
+def apply_order(df: pd.DataFrame, spec: OutputSpec) -> pd.DataFrame:
+    if not spec.order:
+        return df
+    if spec.fill_missing:
+        for c in spec.order:
+            if c not in df.columns:
+                df[c] = ""
+    cols = [c for c in spec.order if c in df.columns]
+    if spec.keep_extra:
+        cols += [c for c in df.columns if c not in spec.order]
+    return df[cols]
+
+def build(spec: OutputSpec, fetcher: Callable[[str], str] = fetch,
+          pause: Optional[Callable[[], None]] = None, write: bool = True, **params) -> Optional[pd.DataFrame]:
+    """
+    Scarica ed estrae ogni tabella, unisce sulle chiavi, applica rename/finish/dtypes/ordine
+    e salva in spec.path. Ritorna il DataFrame (None se il join è vuoto: niente file vuoti).
+    """
+    pages: Dict[str, str] = {}
+    frames: List[pd.DataFrame] = []
+    for i, t in enumerate(spec.tables):
+        url = t.url.format(**params)
+        if url not in pages:
+            if pause is not None and pages:
+                pause()
+            pages[url] = fetcher(url)
+        df = compile_table(t).extract(pages[url], **params)
+        print(f"[{spec.name}] {t.name}: {len(df)} righe")
+        frames.append(df)
+
+    join = spec.join or _merge
+    merged = frames[0]
+    for t, df in zip(spec.tables[1:], frames[1:]):
+        merged = join(merged, df, spec.on, spec.how, f"+{t.name}")
+    if merged.empty:
+        _report_empty(frames, spec.on)
+        return None
+
+    if spec.rename:
+        merged = merged.rename(columns=dict(spec.rename))
+    if spec.finish is not None:
+        merged = spec.finish(merged)
+    merged = apply_dtypes(merged, spec.dtypes)
+    merged = apply_order(merged, spec)
+
+    if write:
+        os.makedirs(os.path.dirname(spec.path) or ".", exist_ok=True)
+        merged.to_csv(spec.path, index=False, encoding=spec.encoding)
+        print(f"✅ {spec.path} creato ({len(merged)} righe, {merged.shape[1]} colonne).")
+    return merged
@@ -0,0 +1,237 @@
+# coding: utf-8
+"""
+Medie "squadre vicine in classifica" precalcolate per i pannelli squadra
+- Input:
+    public/data/standings/<league>.csv             (classifiche.py)
+    public/data/team_performance.csv               (team_performance.py)
+    public/data/opponent_performance.csv           (opponent_performance.py)
+    public/data/champions_casa.csv / champions_avversari.csv (Champions)
+- Stessa logica di team-service.getTeamStats(): vicine = posizioni ±3,
+  prime 3 → 1..6, ultime 3 → ultime 6; reti dalla classifica (Rf/Rs invertiti per
+  'opponent'), xG/xAG/falli/fuorigioco/ammonizioni dal file performance;
+  medie divise per il numero di squadre vicine in classifica
+- In più le medie dell'intera lega (totali e per partita)
+- Vettoriale: somme prefisse per lega + finestre [inizio, fine] con searchsorted,
+  nessun ciclo per squadra nel calcolo; valori non numerici contano 0, divisioni per 0 → null
+- Tabella unica con chiave "<lega>|<squadra>|<team|opponent>" (lega come nel nome file)
+- sources: sha256 dei CSV di input (come in manifest.json di publish.py): il sito usa
+  le medie solo se corrispondono ai CSV pubblicati, altrimenti ricalcola dai CSV
+
+Output:
+ - public/data/team_neighbourhood.json
+"""
+
+from __future__ import annotations
+
+import os
+import glob
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+DATA_DIR = "public/data"
+STANDINGS_DIR = os.path.join(DATA_DIR, "standings")
+PERF_FILES = {
+    ("league", "team"): "public/data/team_performance.csv",
+    ("league", "opponent"): "public/data/opponent_performance.csv",
+    ("champions", "team"): "public/data/champions_casa.csv",
+    ("champions", "opponent"): "public/data/champions_avversari.csv",
+}
+OUTPUT_JSON = "public/data/team_neighbourhood.json"
+
+WINDOW = 3   # posizioni sopra/sotto
+
+# etichetta del sito → campo della squadra
+LABELS = {
+    "Reti Fatte": "goalsFor",
+    "Reti Subite": "goalsAgainst",
+    "xG": "xG",
+    "xAG": "xAG",
+    "Falli Comessi": "foulsCommitted",
+    "Falli Subiti": "foulsSuffered",
+    "Fuorigioco": "offside",
+    "Ammonizioni": "yellowCards",
+}
+# campo → colonna del file performance (le reti vengono dalla classifica)
+PERF_COLS = {
+    "xG": "xG",
+    "xAG": "xAG",
+    "foulsCommitted": "Falli commessi",
+    "foulsSuffered": "Falli subiti",
+    "offside": "Fuorigioco",
+    "yellowCards": "Amm.",
+}
+PER_MATCH = {f: "perMatch" + f[0].upper() + f[1:] for f in LABELS.values()}
+PER_MATCH["xG"], PER_MATCH["xAG"] = "perMatchXG", "perMatchXAG"
+
+# ───────────────────────────────────────────────────
+# Lettura
+# ───────────────────────────────────────────────────
+def _read_csv(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+
+def _num(s: pd.Series) -> np.ndarray:
+    return pd.to_numeric(s, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+def _div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b != 0, a / np.where(b != 0, b, 1), np.nan)
+
+def perf_frame(path: str) -> pd.DataFrame:
+    """
+    Per squadra: valori della prima riga (come .find) e somme su tutte le righe con
+    quel nome (come il filter delle vicine), totali e per partita (PG del file performance).
+    """
+    df = _read_csv(path)
+    if df.empty:
+        return pd.DataFrame()
+    out = pd.DataFrame({"Squadra": df["Squadra"]})
+    pg = _num(df["PG"])
+    for field, col in PERF_COLS.items():
+        v = _num(df[col]) if col in df.columns else np.zeros(len(df))
+        out[field] = v
+        out[PER_MATCH[field]] = _div(v, pg)
+    first = out.drop_duplicates("Squadra").set_index("Squadra")
+    sums = out.fillna(0.0).groupby("Squadra").sum()
+    return first.join(sums, rsuffix="_sum")
+
+# ───────────────────────────────────────────────────
+# Finestre vettoriali
+# ───────────────────────────────────────────────────
+def windows(pos: np.ndarray, n: int) -> np.ndarray:
+    """(inizio, fine) di posizioni per ogni squadra, come getTeamStats()."""
+    start = np.maximum(pos - WINDOW, 1)
+    end = pos + WINDOW
+    top = pos <= 3
+    start, end = np.where(top, 1, start), np.where(top, 6, end)
+    bottom = pos >= n - 2
+    return np.where(bottom, n - 5, start), np.where(bottom, n, end)
+
+def window_sums(pos_sorted: np.ndarray, values: np.ndarray, start: np.ndarray, end: np.ndarray):
+    """Somme di values (righe ordinate per posizione) sulle finestre [start, end] + conteggi."""
+    cs = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+    lo = np.searchsorted(pos_sorted, start, side="left")
+    hi = np.searchsorted(pos_sorted, end, side="right")
+    return cs[hi] - cs[lo], hi - lo
+
+def league_table(league: str, table: pd.DataFrame, perf: pd.DataFrame, source: str) -> Dict[str, Dict]:
+    if perf.empty:
+        return {}   # come getTeamStats: senza file performance → valori di default lato sito
+    table = table.assign(_pos=pd.to_numeric(table["Pos"], errors="coerce")).dropna(subset=["_pos"])
+    table = table.sort_values("_pos", kind="stable").reset_index(drop=True)
+    n = len(table)
+    pos = table["_pos"].to_numpy(dtype=float)
+    pg = _num(table["PG"])
+    rf, rs = _num(table["Rf"]), _num(table["Rs"])
+    gf, ga = (rf, rs) if source == "team" else (rs, rf)
+
+    # colonne per squadra nell'ordine della classifica: totali e per partita
+    joined = perf.reindex(table["Squadra"])
+    fields = list(LABELS.values())
+    total = np.column_stack([gf, ga] + [
+        joined.get(f"{f}_sum", pd.Series(0.0, index=joined.index)).fillna(0.0).to_numpy(dtype=float)
+        for f in fields[2:]])
+    per_match = np.column_stack([np.nan_to_num(_div(gf, pg)), np.nan_to_num(_div(ga, pg))] + [
+        joined.get(f"{PER_MATCH[f]}_sum", pd.Series(0.0, index=joined.index)).fillna(0.0).to_numpy(dtype=float)
+        for f in fields[2:]])
+
+    start, end = windows(pos, n)
+    tot_sum, count = window_sums(pos, total, start, end)
+    pm_sum, _ = window_sums(pos, per_match, start, end)
+    near_total = tot_sum / np.maximum(count, 1)[:, None]
+    near_pm = pm_sum / np.maximum(count, 1)[:, None]
+    league_total, league_pm = total.mean(axis=0), per_match.mean(axis=0)
+
+    labels = list(LABELS)
+    out: Dict[str, Dict] = {}
+    for i, team in enumerate(table["Squadra"]):
+        if team not in perf.index:
+            continue  # squadra senza riga performance → default lato sito
+        own = perf.loc[team]
+        stats = {"goalsFor": gf[i], "goalsAgainst": ga[i]}
+        stats.update({f: own[f] for f in PERF_COLS})
+        rec = {**stats, "played": pg[i]}
+        rec.update({PER_MATCH[f]: (stats[f] / pg[i] if pg[i] else None) for f in fields})
+        rec["leagueAverage"] = {
+            "total": dict(zip(labels, near_total[i])),
+            "perMatch": dict(zip(labels, near_pm[i])),
+        }
+        rec["leagueWide"] = {
+            "total": dict(zip(labels, league_total)),
+            "perMatch": dict(zip(labels, league_pm)),
+        }
+        rec["window"] = [int(start[i]), int(end[i])]
+        out[f"{league}|{team}|{source}"] = rec
+    return out
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def _clean(obj):
+    """JSON compatto: float arrotondati, NaN/inf → null."""
+    if isinstance(obj, dict):
+        return {k: _clean(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clean(v) for v in obj]
+    if isinstance(obj, (float, np.floating)):
+        return round(float(obj), 4) if np.isfinite(obj) else None
+    if isinstance(obj, np.integer):
+        return int(obj)
+    return obj
+
+def _sha256(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _logical(path: str) -> str:
+    """Percorso relativo a public/data, come le chiavi del manifest."""
+    return os.path.relpath(path, DATA_DIR).replace(os.sep, "/")
+
+def build():
+    """
+    Calcola e salva OUTPUT_JSON; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se nessuna squadra ha classifica e dati performance.
+    """
+    perfs = {k: perf_frame(p) for k, p in PERF_FILES.items()}
+    teams: Dict[str, Dict] = {}
+    leagues: List[str] = []
+    sources = {_logical(p): _sha256(p) for p in PERF_FILES.values()}
+    for path in sorted(glob.glob(os.path.join(STANDINGS_DIR, "*.csv"))):
+        sources[_logical(path)] = _sha256(path)
+        league = os.path.splitext(os.path.basename(path))[0]
+        table = _read_csv(path)
+        if table.empty:
+            continue
+        kind = "champions" if league == "champions_league" else "league"
+        for source in ("team", "opponent"):
+            teams.update(league_table(league, table, perfs[(kind, source)], source))
+        leagues.append(league)
+    if not teams:
+        print("Nessuna squadra con classifica e dati performance.")
+        return False
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    tmp = OUTPUT_JSON + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_clean({"leagues": leagues, "teams": teams, "sources": sources}), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, OUTPUT_JSON)
+    print(f"💾 Salvato: {OUTPUT_JSON} ({len(teams)} voci, {len(leagues)} leghe)")
+    return True
+
+def main():
+    try:
+        build()
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+
+if __name__ == "__main__":
+    main()
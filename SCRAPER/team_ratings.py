@@ -0,0 +1,283 @@
+# coding: utf-8
+"""
+Rating attacco/difesa per squadra (modello Dixon-Coles con decadimento temporale)
+- Input:
+    public/data/all_leagues_matches.csv   (download_old.py: risultati + xG)
+- Modello per lega:
+    log λ_casa  = mu + casa + att[casa]  - dif[trasf]
+    log λ_trasf = mu        + att[trasf] - dif[casa]
+  con correzione di Dixon-Coles (rho) sui risultati bassi (0-0, 1-0, 0-1, 1-1)
+- Obiettivo: gol "osservati" = mix di gol reali e xG (XG_WEIGHT), ogni partita pesata
+  exp(-XI · giorni fa) rispetto all'ultima giornata; penalità L2 su att/dif
+  (shrink verso la media di lega, rende il problema identificabile)
+- Fit Newton/Fisher scoring vettoriale (NumPy, design denso partite×parametri) con
+  backtracking; ogni refresh riparte dai parametri salvati (warm start) → dopo una
+  giornata bastano pochi passi invece di ripartire da zero
+- Parametri salvati per lega; una lega che fallisce tiene quelli precedenti
+
+Uso:
+  python SCRAPER/team_ratings.py            # refit con warm start
+  python SCRAPER/team_ratings.py --cold     # ignora i parametri salvati
+
+Output:
+ - public/data/team_ratings.json
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from poisson_grid import RATINGS_JSON, _key, _read_csv
+
+# ───────────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────────
+MATCHES_CSV = "public/data/all_leagues_matches.csv"
+
+XI = 0.0019            # decadimento per giorno (emivita ~ 1 anno, come Dixon-Coles)
+XG_WEIGHT = 0.5        # quota di xG nel gol "osservato" (0 = solo gol reali)
+RIDGE = 0.5            # penalità L2 su att/dif (in "partite equivalenti")
+RHO_BOUND = 0.2
+MAX_ITER = 100
+TOL = 1e-5             # passo massimo sui parametri (rating usati a 4 decimali)
+
+# ───────────────────────────────────────────────────
+# Dati
+# ───────────────────────────────────────────────────
+def load_results(path: str = MATCHES_CSV) -> pd.DataFrame:
+    """Partite giocate (entrambi i gol numerici) con chiavi lega/squadre e data."""
+    df = _read_csv(path)
+    if df.empty:
+        return df
+    gh = pd.to_numeric(df["Gol Casa"], errors="coerce")
+    ga = pd.to_numeric(df["Gol Trasferta"], errors="coerce")
+    day = pd.to_datetime(df["Giorno"], errors="coerce")
+    ok = gh.notna() & ga.notna() & day.notna()
+    df = df[ok]
+    xh = pd.to_numeric(df["xG Casa"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    xa = pd.to_numeric(df["xG Trasferta"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    return pd.DataFrame({
+        "lega": _key(df["Campionato"]),
+        "casa": df["Squadra Casa"].astype(str).str.strip(),
+        "trasf": df["Squadra Trasferta"].astype(str).str.strip(),
+        "day": day[ok],
+        "gh": gh[ok].astype(int),
+        "ga": ga[ok].astype(int),
+        "xh": xh,
+        "xa": xa,
+    }).reset_index(drop=True)
+
+def league_arrays(df: pd.DataFrame) -> Dict:
+    """Indici squadra, pesi temporali e gol osservati (gol/xG) come array."""
+    names = sorted(set(df["casa"]) | set(df["trasf"]), key=str.lower)
+    idx = {n: i for i, n in enumerate(names)}
+    as_of = df["day"].max()
+    age = (as_of - df["day"]).dt.days.to_numpy(dtype=float)
+    gh, ga = df["gh"].to_numpy(dtype=float), df["ga"].to_numpy(dtype=float)
+    # senza xG (es. partite vecchie) si usa solo il gol reale
+    xh = df["xh"].to_numpy(dtype=float)
+    xa = df["xa"].to_numpy(dtype=float)
+    yh = np.where(np.isfinite(xh), (1 - XG_WEIGHT) * gh + XG_WEIGHT * xh, gh)
+    ya = np.where(np.isfinite(xa), (1 - XG_WEIGHT) * ga + XG_WEIGHT * xa, ga)
+    return {
+        "names": names,
+        "home": df["casa"].map(idx).to_numpy(),
+        "away": df["trasf"].map(idx).to_numpy(),
+        "gh": gh.astype(int), "ga": ga.astype(int),
+        "yh": yh, "ya": ya,
+        "w": np.exp(-XI * age),
+        "as_of": as_of.date().isoformat(),
+    }
+
+# ───────────────────────────────────────────────────
+# Modello
+# ───────────────────────────────────────────────────
+# vettore parametri θ = [mu, casa, att(n), dif(n), rho]
+def design(home: np.ndarray, away: np.ndarray, n: int) -> np.ndarray:
+    """X (2m, 2n+2) per i predittori lineari [η_casa; η_trasf] (rho esclusa)."""
+    m = len(home)
+    X = np.zeros((2 * m, 2 * n + 2))
+    r = np.arange(m)
+    X[:, 0] = 1.0
+    X[r, 1] = 1.0
+    X[r, 2 + home] = 1.0
+    X[r, 2 + n + away] = -1.0
+    X[m + r, 2 + away] = 1.0
+    X[m + r, 2 + n + home] = -1.0
+    return X
+
+def _tau_terms(lh, la, gh, ga, rho):
+    """log τ e derivate (d/dη_casa, d/dη_trasf, d/drho) della correzione Dixon-Coles."""
+    c00, c01 = (gh == 0) & (ga == 0), (gh == 0) & (ga == 1)
+    c10, c11 = (gh == 1) & (ga == 0), (gh == 1) & (ga == 1)
+    tau = np.ones_like(lh)
+    tau = np.where(c00, 1 - lh * la * rho, tau)
+    tau = np.where(c01, 1 + lh * rho, tau)
+    tau = np.where(c10, 1 + la * rho, tau)
+    tau = np.where(c11, 1 - rho, tau)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe = np.where(tau > 0, tau, 1.0)
+        d_h = np.where(c00, -lh * la * rho, 0.0) + np.where(c01, lh * rho, 0.0)
+        d_a = np.where(c00, -lh * la * rho, 0.0) + np.where(c10, la * rho, 0.0)
+        d_r = (np.where(c00, -lh * la, 0.0) + np.where(c01, lh, 0.0)
+               + np.where(c10, la, 0.0) - np.where(c11, 1.0, 0.0))
+        log_tau = np.where(tau > 0, np.log(safe), -np.inf)
+    return log_tau, d_h / safe, d_a / safe, d_r / safe
+
+def objective(theta: np.ndarray, X: np.ndarray, data: Dict) -> float:
+    """Log-verosimiglianza pesata penalizzata (da massimizzare)."""
+    m, n = len(data["home"]), len(data["names"])
+    eta = X @ theta[:-1]
+    lh, la = np.exp(eta[:m]), np.exp(eta[m:])
+    log_tau, *_ = _tau_terms(lh, la, data["gh"], data["ga"], theta[-1])
+    w = data["w"]
+    ll = np.sum(w * (data["yh"] * eta[:m] - lh + data["ya"] * eta[m:] - la + log_tau))
+    return float(ll - 0.5 * RIDGE * np.sum(theta[2:2 + 2 * n] ** 2))
+
+def fit_league(data: Dict, start: Optional[np.ndarray] = None) -> Dict:
+    """
+    Fisher scoring: gradiente esatto, curvatura = informazione di Fisher della parte
+    Poisson (+ RIDGE) e prodotto esterno per rho; backtracking sul passo.
+    """
+    m, n = len(data["home"]), len(data["names"])
+    X = design(data["home"], data["away"], n)
+    w2 = np.concatenate([data["w"], data["w"]])
+    y = np.concatenate([data["yh"], data["ya"]])
+    pen = np.zeros(2 * n + 2)
+    pen[2:] = RIDGE
+
+    if start is None:
+        start = np.zeros(2 * n + 3)
+        start[0] = np.log(max(np.average(y, weights=w2), 0.1))
+    theta = start.copy()
+    f = objective(theta, X, data)
+
+    it = 0
+    for it in range(1, MAX_ITER + 1):
+        eta = X @ theta[:-1]
+        lam = np.exp(eta)
+        _, d_h, d_a, d_r = _tau_terms(lam[:m], lam[m:], data["gh"], data["ga"], theta[-1])
+        resid = w2 * (y - lam + np.concatenate([d_h, d_a]))
+        g = np.append(X.T @ resid - pen * theta[:-1], np.sum(data["w"] * d_r))
+        H = (X.T * (w2 * lam)) @ X + np.diag(pen)
+        step = np.append(np.linalg.solve(H, g[:-1]), g[-1] / max(np.sum(data["w"] * d_r ** 2), 1e-9))
+
+        t = 1.0
+        while t > 1e-4:
+            cand = theta + t * step
+            cand[-1] = np.clip(cand[-1], -RHO_BOUND, RHO_BOUND)
+            fc = objective(cand, X, data)
+            if np.isfinite(fc) and fc >= f - 1e-12:
+                break
+            t /= 2
+        else:
+            break
+        moved = np.max(np.abs(cand - theta))
+        theta, f = cand, fc
+        if moved < TOL:
+            break
+    return {"theta": theta, "loglik": f, "iterations": it}
+
+# ───────────────────────────────────────────────────
+# Persistenza / warm start
+# ───────────────────────────────────────────────────
+def load_saved(path: str = RATINGS_JSON) -> Dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("leagues", {})
+    except (OSError, ValueError):
+        return {}
+
+def warm_start(prev: Optional[Dict], names: List[str]) -> Optional[np.ndarray]:
+    """Parametri precedenti riallineati alle squadre attuali (nuove squadre = media di lega)."""
+    if not prev:
+        return None
+    n = len(names)
+    theta = np.zeros(2 * n + 3)
+    theta[0], theta[1], theta[-1] = prev["mu"], prev["home"], prev["rho"]
+    teams = prev.get("teams", {})
+    for i, name in enumerate(names):
+        t = teams.get(name.lower())
+        if t:
+            theta[2 + i], theta[2 + n + i] = t["att"], t["def"]
+    return theta
+
+def league_record(lega: str, data: Dict, fit: Dict, seconds: float) -> Dict:
+    n = len(data["names"])
+    th = fit["theta"]
+    played = np.bincount(np.concatenate([data["home"], data["away"]]), minlength=n)
+    return {
+        "lega": lega,
+        "as_of": data["as_of"],
+        "matches": int(len(data["home"])),
+        "iterations": fit["iterations"],
+        "seconds": round(seconds, 3),
+        "loglik": round(fit["loglik"], 4),
+        "mu": float(th[0]),
+        "home": float(th[1]),
+        "rho": float(th[-1]),
+        "xi": XI,
+        "xg_weight": XG_WEIGHT,
+        "teams": {name.lower(): {"team": name, "att": float(th[2 + i]), "def": float(th[2 + n + i]),
+                                 "played": int(played[i])}
+                  for i, name in enumerate(data["names"])},
+    }
+
+# ───────────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────────
+def build(cold: bool = False):
+    """
+    Calcola e salva RATINGS_JSON; le eccezioni risalgono (usato da incremental.py).
+    Ritorna False se non ci sono partite giocate.
+    """
+    results = load_results()
+    if results.empty:
+        print("Nessuna partita giocata trovata.")
+        return False
+    saved = {} if cold else load_saved()
+    leagues: Dict[str, Dict] = dict(saved)
+
+    for lega, df in results.groupby("lega", sort=True):
+        key = lega.replace(" ", "_")
+        try:
+            data = league_arrays(df)
+            t0 = time.perf_counter()
+            fit = fit_league(data, warm_start(saved.get(key), data["names"]))
+            rec = league_record(lega, data, fit, time.perf_counter() - t0)
+        except Exception as e:
+            print(f"[WARN] {lega}: fit fallito ({e}), tengo i parametri precedenti")
+            continue
+        leagues[key] = rec
+        mode = "warm" if key in saved else "cold"
+        print(f"[FIT] {lega}: {rec['matches']} partite, {len(rec['teams'])} squadre, "
+              f"{rec['iterations']} iterazioni ({mode}, {rec['seconds']:.2f}s)")
+
+    os.makedirs(os.path.dirname(RATINGS_JSON), exist_ok=True)
+    tmp = RATINGS_JSON + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"leagues": leagues}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, RATINGS_JSON)
+    print(f"💾 Salvato: {RATINGS_JSON} ({len(leagues)} leghe)")
+    return True
+
+def main():
+    ap = argparse.ArgumentParser(description="Rating attacco/difesa Dixon-Coles per lega")
+    ap.add_argument("--cold", action="store_true", help="ignora i parametri salvati (fit da zero)")
+    args = ap.parse_args()
+    try:
+        build(cold=args.cold)
+    except Exception as e:
+        print(f"❌ Errore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# coding: utf-8
+"""
+Fixture comuni dei test degli scraper
+- gli script importano i moduli fratelli direttamente (come con python SCRAPER/x.py)
+- vc: VirtualClock globale per il test, rate limit e archivio pagine isolati in tmp_path
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clock
+import fbref_http
+import page_archive
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """Archivio pagine vuoto in tmp_path, usato sia per registrare sia per il replay."""
+    arch = page_archive.PageArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(page_archive, "_ARCHIVE", arch)
+    monkeypatch.delenv(page_archive.REPLAY_ENV, raising=False)
+    return arch
+
+@pytest.fixture
+def vc(monkeypatch):
+    """Orologio virtuale per tutto il test; rate limit azzerato (i test lo impostano se serve)."""
+    monkeypatch.setattr(fbref_http, "_LIMITER", fbref_http.RateLimiter(0))
+    with clock.use(clock.VirtualClock(start=1_756_684_800.0)) as c:   # 2025-09-01 00:00 UTC
+        yield c
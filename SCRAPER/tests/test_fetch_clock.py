@@ -0,0 +1,128 @@
+# coding: utf-8
+"""
+fetch() su pagine registrate con VirtualClock: nessuna attesa reale, schedule esatto
+- Retry-After rispettato alla lettera
+- backoff 1.2 × 1.8ⁿ (jitter 0, oppure jitter con random.seed fisso)
+- attese del rate limit tra richieste, anche nel replay dall'archivio
+"""
+
+import random
+
+import pytest
+
+import fbref_http
+import page_archive
+
+URL = "https://fbref.com/it/comp/11/Statistiche-di-Serie-A"
+PAGE = '<html><body><table id="results2025-2026111_overall"><tr><td>Inter</td></tr></table></body></html>'
+SNAPSHOT_AT = 1_756_710_000.0   # 2025-09-01 07:00 UTC
+
+class FakeResponse:
+    def __init__(self, status_code: int, text: str, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakeSession:
+    """Risposte in sequenza (status, header); i 200 servono la pagina registrata nell'archivio."""
+
+    def __init__(self, vc, archive, script, latency: float = 0.0):
+        self.vc, self.archive, self.script, self.latency = vc, archive, list(script), latency
+        self.requests = []
+
+    def get(self, url, timeout=None):
+        self.vc.advance(self.latency)   # durata simulata della richiesta
+        self.requests.append(self.vc.monotonic())
+        status, headers = self.script.pop(0) if self.script else (200, {})
+        text = self.archive.get(url) if status == 200 else "<html>Too Many Requests</html>"
+        return FakeResponse(status, text, headers)
+
+@pytest.fixture
+def session(vc, archive, monkeypatch):
+    """Sessione finta condivisa anche dopo le rotazioni (registrate in session.rotations)."""
+    archive.store(URL, PAGE, fetched_at=SNAPSHOT_AT)
+
+    def make(script=(), latency: float = 0.0):
+        s = FakeSession(vc, archive, script, latency)
+        s.rotations = []
+
+        def rotate(seed=True):
+            s.rotations.append(seed)
+            return s
+
+        monkeypatch.setattr(fbref_http, "get_scraper", lambda: s)
+        monkeypatch.setattr(fbref_http, "rotate_scraper", rotate)
+        monkeypatch.setattr(fbref_http, "remember_clearance", lambda s: None)
+        monkeypatch.setattr(fbref_http, "forget_clearance", lambda: None)
+        return s
+    return make
+
+def waits(vc, func: str):
+    return [s.seconds for s in vc.sleeps if s.caller == f"fbref_http:{func}"]
+
+# ───────────────────────────────────────────────────
+# Retry / backoff
+# ───────────────────────────────────────────────────
+def test_retry_after_is_honoured(vc, session):
+    session([(429, {"Retry-After": "7"}), (429, {"Retry-After": "30"})])
+    assert fbref_http.fetch(URL, jitter=0) == PAGE
+    assert waits(vc, "fetch") == [7.0, 30.0]
+
+def test_backoff_schedule(vc, session):
+    session([(503, {})] * 5)
+    assert fbref_http.fetch(URL, jitter=0) == PAGE
+    assert waits(vc, "fetch") == pytest.approx([1.2 * 1.8 ** n for n in range(5)])
+    assert vc.total_slept == pytest.approx(sum(1.2 * 1.8 ** n for n in range(5)))
+
+def test_backoff_with_seeded_jitter(vc, session):
+    s = session([(429, {})] * 4)
+    random.seed(7)
+    fbref_http.fetch(URL)
+
+    random.seed(7)
+    expected, delay = [], 1.2
+    for _ in range(4):
+        expected.append(delay + random.uniform(0, delay * 0.35))
+        delay *= 1.8
+    assert waits(vc, "fetch") == pytest.approx(expected)
+    assert s.rotations == [False]   # rotazione al terzo tentativo, senza clearance salvata
+
+def test_gives_up_after_retries(vc, session):
+    session([(503, {})] * 3)
+    with pytest.raises(Exception, match="after 3 retries"):
+        fbref_http.fetch(URL, retries=3, jitter=0)
+    assert waits(vc, "fetch") == pytest.approx([1.2, 1.2 * 1.8, 1.2 * 1.8 ** 2])
+
+# ───────────────────────────────────────────────────
+# Rate limit
+# ───────────────────────────────────────────────────
+def test_rate_limiter_waits_between_requests(vc, session):
+    s = session(latency=1.5)
+    fbref_http.set_rate(10)
+    for _ in range(3):
+        fbref_http.fetch(URL)
+    # intervallo 6 s dall'inizio di ogni richiesta: 1.5 s di download contano già
+    assert waits(vc, "wait") == pytest.approx([4.5, 4.5])
+    assert s.requests == pytest.approx([1.5, 7.5, 13.5])
+    assert waits(vc, "fetch") == []
+
+def test_rate_limiter_covers_retries(vc, session):
+    session([(429, {"Retry-After": "2"})])
+    fbref_http.set_rate(10)
+    fbref_http.fetch(URL, jitter=0)
+    # Retry-After di 2 s, poi il limite impone gli altri 4 s prima del secondo tentativo
+    assert waits(vc, "fetch") == [2.0]
+    assert waits(vc, "wait") == pytest.approx([4.0])
+
+def test_replay_is_throttled_on_virtual_clock(vc, archive, monkeypatch):
+    urls = [URL.replace("11", str(i)) for i in (9, 11, 12)]
+    for u in urls:
+        archive.store(u, PAGE.replace("Inter", u), fetched_at=SNAPSHOT_AT)
+    monkeypatch.setenv(page_archive.REPLAY_ENV, "2025-09-01T23:59:59Z")
+    fbref_http.set_rate(20)
+    assert [fbref_http.fetch(u) for u in urls] == [PAGE.replace("Inter", u) for u in urls]
+    assert waits(vc, "wait") == pytest.approx([3.0, 3.0])
@@ -0,0 +1,170 @@
+# coding: utf-8
+"""
+Scraper su pagine registrate (PageArchive) in replay con VirtualClock
+- classifiche: classifica per data-stat, fallback IT → EN con polite_delay
+- download_old: calendario/risultati della stagione corrente, stagione precedente assente
+- league_players (table_spec.build): tabelle per intestazione + per data-stat unite per ID
+Per ciascuno: frame in uscita e attese registrate (rate limit e pause), senza dormire davvero.
+"""
+
+import random
+
+import pandas as pd
+import pytest
+
+import fbref_http
+import page_archive
+from competitions import get
+
+REPLAY_AT = "2025-09-01T23:59:59Z"
+SNAPSHOT_AT = 1_756_710_000.0   # 2025-09-01 07:00 UTC
+RATE = 10                       # richieste al minuto → 6 s tra due richieste
+
+# ───────────────────────────────────────────────────
+# Pagine sintetiche
+# ───────────────────────────────────────────────────
+def _td(stat: str, value: str) -> str:
+    return f'<td data-stat="{stat}">{value}</td>'
+
+def _row(i: int, cells, row_stat: str) -> str:
+    """Cella <th scope="row">: il rank, oppure la prima coppia di `cells` (es. gameweek)."""
+    if row_stat != "rank":
+        (row_stat, i), cells = cells[0], cells[1:]
+    return (f'<tr><th scope="row" data-stat="{row_stat}">{i}</th>'
+            + "".join(_td(s, v) for s, v in cells) + "</tr>")
+
+def table(table_id: str, rows, headers=(), row_stat: str = "rank") -> str:
+    """rows: liste di (data-stat, valore) per riga."""
+    head = "".join(f"<th>{h}</th>" for h in headers)
+    body = "".join(_row(i, r, row_stat) for i, r in enumerate(rows, 1))
+    return (f'<table id="{table_id}"><thead><tr><th></th></tr><tr><th>Rk</th>{head}</tr></thead>'
+            f"<tbody>{body}</tbody></table>")
+
+def page(*tables: str, comment: bool = False) -> str:
+    inner = "".join(tables)
+    return f"<html><body>{'<!--' + inner + '-->' if comment else inner}</body></html>"
+
+@pytest.fixture
+def replay(vc, archive, monkeypatch, tmp_path):
+    """Replay dall'archivio a REPLAY_AT, output nella cartella del test, rate limit a RATE/min."""
+    monkeypatch.setenv(page_archive.REPLAY_ENV, REPLAY_AT)
+    monkeypatch.chdir(tmp_path)
+    fbref_http.set_rate(RATE)
+
+    def store(url: str, html: str):
+        archive.store(url, html, fetched_at=SNAPSHOT_AT)
+    return store
+
+def sleeps(vc):
+    return [(s.caller, round(s.seconds, 6)) for s in vc.sleeps]
+
+# ───────────────────────────────────────────────────
+# classifiche.py
+# ───────────────────────────────────────────────────
+STANDINGS_ROWS = [
+    [("team", "Inter"), ("games", "3"), ("wins", "3"), ("ties", "0"), ("losses", "0"),
+     ("goals_for", "8"), ("goals_against", "1"), ("goal_diff", "+7"), ("points", "9"),
+     ("xg_for", "6.1"), ("xg_against", "1.4")],
+    [("team", "Milan"), ("games", "3"), ("wins", "1"), ("ties", "1"), ("losses", "1"),
+     ("goals_for", "4"), ("goals_against", "4"), ("goal_diff", "0"), ("points", "4"),
+     ("xg_for", "3.9"), ("xg_against", "3.2")],
+]
+
+def test_classifiche_two_leagues(vc, replay):
+    import classifiche
+
+    for key in ("serie_a", "premier_league"):
+        comp = get(key)
+        replay(comp.standings_urls()[0], page(table(comp.standings_table(), STANDINGS_ROWS), comment=True))
+    classifiche.main(["serie_a", "premier_league"])
+
+    df = pd.read_csv("public/data/standings/serie_a.csv", encoding="utf-8-sig")
+    assert df["Squadra"].tolist() == ["Inter", "Milan"]
+    assert df["Pt"].tolist() == [9, 4]
+    assert df["DR"].tolist() == [7, 0]
+    assert df["xG"].tolist() == [6.1, 3.9]
+    assert df["Lega"].unique().tolist() == ["serie a"]
+    # nessuna pausa per lega: solo il rate limit tra le due pagine
+    assert sleeps(vc) == [("fbref_http:wait", 6.0)]
+
+def test_classifiche_falls_back_to_english_page(vc, replay):
+    import classifiche
+
+    comp = get("serie_a")
+    replay(comp.standings_urls()[1], page(table(comp.standings_table(), STANDINGS_ROWS)))
+    random.seed(3)
+    classifiche.process_league(comp)
+
+    random.seed(3)
+    pause = round(random.uniform(1.0, 2.2), 6)
+    assert sleeps(vc) == [("classifiche:polite_delay", pause), ("fbref_http:wait", round(6.0 - pause, 6))]
+    assert len(pd.read_csv("public/data/standings/serie_a.csv", encoding="utf-8-sig")) == 2
+
+# ───────────────────────────────────────────────────
+# download_old.py
+# ───────────────────────────────────────────────────
+def test_download_old_current_season(vc, replay):
+    import download_old
+
+    comp = get("serie_a")
+    rows = [
+        [("gameweek", "1"), ("date", "2025-08-23"), ("start_time", "18:30"), ("home_team", "Inter"),
+         ("home_xg", "2.1"), ("score", "2–1"), ("away_xg", "0.7"), ("away_team", "Torino")],
+        [("gameweek", "2"), ("date", "2025-09-14"), ("start_time", "20:45"), ("home_team", "Milan"),
+         ("home_xg", ""), ("score", ""), ("away_xg", ""), ("away_team", "Roma")],
+    ]
+    tid = f"sched_{comp.season_label()}_{comp.comp_id}_1"
+    replay(comp.schedule_url(), page(table(tid, rows, row_stat="gameweek")))
+    random.seed(5)
+    matches = download_old.download_matches(comp)
+
+    assert matches == [
+        ["Inter", "Torino", "18:30", "2025-08-23", "Serie A", "2.1", "2", "1", "0.7", "1"],
+        ["Milan", "Roma", "20:45", "2025-09-14", "Serie A", "", "", "", "", "2"],
+    ]
+    # stagione precedente non in archivio: rate limit prima del tentativo, poi la pausa
+    random.seed(5)
+    assert sleeps(vc) == [("fbref_http:wait", 6.0),
+                          ("download_old:polite_delay", round(random.uniform(3.0, 4.5), 6))]
+
+# ───────────────────────────────────────────────────
+# league_players.py (table_spec)
+# ───────────────────────────────────────────────────
+PLAYERS = [("a1b2c3d4", "Lautaro Martínez", "ar ARG", "FW", "Inter", "8"),
+           ("e5f6a7b8", "Rafael Leão", "pt POR", "FW,MF", "Milan", "3")]
+
+def _player(pid: str, name: str) -> str:
+    return f'<a href="/it/giocatori/{pid}/{name.replace(" ", "-")}">{name}</a>'
+
+def test_league_players_tables_joined(vc, replay):
+    import league_players
+    from table_spec import build
+
+    headers = ["Giocatore", "Nazione", "Ruolo", "Squadra", "Competizione", "Età", "PG", "Reti", "xG", "PrgP", "Extra"]
+    standard = [[("player", _player(pid, n)), ("nationality", nat), ("position", pos), ("team", team),
+                 ("comp_level", "it Serie A"), ("age", "27"), ("games", "5"), ("goals", goals),
+                 ("xg", "3,5"), ("progressive_passes", "12"), ("extra", "x")]
+                for pid, n, nat, pos, team, goals in PLAYERS]
+    shooting = [[("player", _player(pid, n)), ("team", team), ("shots", "20"), ("shots_on_target", "9")]
+                for pid, n, _, _, team, _ in PLAYERS]
+    misc = [[("player", _player(pid, n)), ("team", team), ("fouls", "4"), ("fouled", "7"), ("offsides", "2")]
+            for pid, n, _, _, team, _ in PLAYERS[:1]]   # secondo giocatore assente dai misc
+
+    urls = [t.url for t in league_players.SPEC.tables]
+    replay(urls[0], page(table("stats_standard", standard, headers)))
+    replay(urls[1], page(table("stats_shooting", shooting), comment=True))
+    replay(urls[2], page(table("stats_misc", misc), comment=True))
+    df = build(league_players.SPEC, write=False)
+
+    assert df["Giocatore"].tolist() == ["Lautaro Martínez", "Rafael Leão"]
+    assert df["Nazione"].tolist() == ["ARG", "POR"]
+    assert df["Ruolo"].tolist() == ["Att", "Att.Cen"]
+    assert df["Reti"].tolist() == ["8", "3"]
+    assert df["xG"].tolist() == ["3.5", "3.5"]            # virgola decimale normalizzata
+    assert df["Tiri totali"].tolist() == ["20", "20"]
+    assert df["Falli commessi"].fillna("").tolist() == ["4", ""]   # left join
+    assert df["ID Giocatore"].tolist() == ["a1b2c3d4", "e5f6a7b8"]
+    assert list(df.columns[:6]) == ["Pos.", "Giocatore", "Nazione", "Ruolo", "Squadra", "Competizione"]
+    assert "Extra" not in df.columns                       # colonne dopo PrgP scartate
+    # tre pagine, nessuna pausa fissa: solo le attese del rate limit
+    assert sleeps(vc) == [("fbref_http:wait", 6.0), ("fbref_http:wait", 6.0)]
@@ -8,6 +8,7 @@ import Link from 'next/link';
 import { ChevronLeftIcon, ChevronRightIcon } from '@heroicons/react/24/solid';
 import Papa from 'papaparse';
 import { getTeamPerformance } from '@/lib/services/data-service';
+import { fetchData } from '@/lib/utils/data-manifest';
 import { MatchDaily, TeamPerformance } from '@/lib/types/stats';
 
 // Tipi di proprietà
@@ -192,7 +193,7 @@ export function DailyMatches({ league, year, highlightLeague }: DailyMatchesProp
     const loadMatchData = async () => {
       try {
         console.log('Inizio caricamento dati delle partite...');
-        const response = await fetch('/Bet_Website/data/all_leagues_matches.csv');
+        const response = await fetchData('all_leagues_matches.csv');
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
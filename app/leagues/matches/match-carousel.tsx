@@ -9,6 +9,7 @@ import { Match, TeamPerformance } from '@/lib/types/stats';
 import Papa from 'papaparse';
 
 import { getTeamPerformance } from '@/lib/services/data-service';
+import { fetchData } from '@/lib/utils/data-manifest';
 
 interface MatchCarouselProps {
   league: string; // Manteniamo il filtro per lega
@@ -22,7 +23,7 @@ export function MatchCarousel({ league, onMatchSelect }: MatchCarouselProps) {
   useEffect(() => {
     const loadMatchData = async () => {
       try {
-        const response = await fetch('/Bet_Website/data/players/matches_season.csv');
+        const response = await fetchData('players/matches_season.csv');
         const csvText = await response.text();
 
         const parsed = Papa.parse(csvText, {
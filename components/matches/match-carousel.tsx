@@ -8,6 +8,7 @@ import { Match, TeamPerformance } from '@/lib/types/stats';
 import Papa from 'papaparse';
 
 import { getTeamPerformance } from '@/lib/services/data-service';
+import { fetchData } from '@/lib/utils/data-manifest';
 import { LEAGUES } from '@/lib/constants';
 
 interface MatchCarouselProps {
@@ -69,7 +70,7 @@ export function MatchCarousel({ onMatchSelect }: MatchCarouselProps) {
     const loadMatchData = async () => {
       try {
         // Fetch CSV
-        const response = await fetch('/Bet_Website/data/players/matches_season.csv');
+        const response = await fetchData('players/matches_season.csv');
         const csvText = await response.text();
 
         // Parse CSV
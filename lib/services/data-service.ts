@@ -3,6 +3,7 @@
 'use client';
 
 import { parseCSV } from '../utils/csv-parser';
+import { fetchData } from '../utils/data-manifest';
 import { TeamStats, Match, TeamPerformance, League, MatchDetailsType, CsvMatchRow } from '../types/stats';
 import Papa from 'papaparse'; // Assicurati di importare PapaParse
 
@@ -103,7 +104,7 @@ export async function loadData() {
 
     // Carica le classifiche per ogni lega
     for (const league of leagues) {
-      const response = await fetch(`/Bet_Website/data/standings/${league}.csv`);
+      const response = await fetchData(`standings/${league}.csv`);
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
@@ -114,7 +115,7 @@ export async function loadData() {
     }
 
     // Carica tutte le partite dal CSV
-    const matchesResponse = await fetch(`/Bet_Website/data/all_leagues_matches.csv`);
+    const matchesResponse = await fetchData(`all_leagues_matches.csv`);
     if (!matchesResponse.ok) {
       throw new Error(`Failed to load matches: ${matchesResponse.status}`);
     }
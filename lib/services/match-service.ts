@@ -1,6 +1,7 @@
 'use client';
 
 import { parseCSV } from '../utils/csv-parser';
+import { fetchData } from '../utils/data-manifest';
 import { HistoricalMatch } from '../types/stats';
 
 // Definisci il tipo dei dati CSV
@@ -23,7 +24,7 @@ let historicalMatches: HistoricalMatch[] = [];
 // Funzione per caricare i dati delle partite
 export async function loadHistoricalMatches() {
   try {
-    const response = await fetch('/Bet_Website/data/all_leagues_matches.csv');
+    const response = await fetchData('all_leagues_matches.csv');
     const data = await response.text();
 
     // Specifica il tipo generico per parseCSV
@@ -2,12 +2,57 @@
 
 'use client';
 
-import { parseCSV } from '../utils/csv-parser';
+import { loadRows } from '../utils/change-feed';
+import { dataSha256, fetchData } from '../utils/data-manifest';
 import { PlayerStats } from '../types/stats';
 
 let leaguePlayers: PlayerStats[] = [];
 let championsLeaguePlayers: PlayerStats[] = [];
 
+/**
+ * Classifiche top-K precalcolate da SCRAPER/leaderboards.py (players/leaderboards.json).
+ * Le liste sono indici nell'array `players`; se il file manca, o `sources` (sha256 dei CSV
+ * di input) non corrisponde ai CSV nel manifest, si ricalcola dai CSV.
+ */
+interface LeaderboardsFile {
+  k: { team: number; league: number };
+  fields: (keyof PlayerStats)[];
+  players: any[][];
+  team: { league: Record<string, Record<string, number[]>>; champions: Record<string, Record<string, number[]>> };
+  stat: Record<string, Record<string, number[]>>;
+  league: Record<string, Record<string, number[]>>;
+  sources: Record<string, string | null>;
+}
+
+let leaderboards: (LeaderboardsFile & { rows: PlayerStats[] }) | null = null;
+
+async function loadLeaderboards() {
+  try {
+    const resp = await fetchData('players/leaderboards.json');
+    if (!resp.ok) return;
+    const file: LeaderboardsFile = await resp.json();
+    const sources = Object.entries(file.sources ?? {});
+    const published = await Promise.all(sources.map(([logical]) => dataSha256(logical)));
+    if (!sources.length || sources.some(([, sha], i) => published[i] !== sha)) {
+      // artefatto più vecchio dei CSV (o non verificabile): meglio il sort sui CSV
+      console.warn('leaderboards.json non corrisponde ai CSV pubblicati, uso i CSV');
+      leaderboards = null;
+      return;
+    }
+    const rows = file.players.map(
+      (values) => Object.fromEntries(file.fields.map((f, i) => [f, values[i]])) as unknown as PlayerStats
+    );
+    leaderboards = { ...file, rows };
+  } catch {
+    leaderboards = null;
+  }
+}
+
+function lookup(indices: number[] | undefined, limit: number): PlayerStats[] {
+  if (!leaderboards || !indices) return [];
+  return indices.slice(0, limit).map((i) => leaderboards!.rows[i]);
+}
+
 /** Coalesce numeri: accetta number|string|undefined e torna un number valido (default 0) */
 function num(val: any, def = 0): number {
   if (val === null || val === undefined || val === '') return def;
@@ -30,25 +75,17 @@ function str(val: any, def = 'Sconosciuto'): string {
 }
 
 /**
- * Carica e normalizza i dati dei giocatori dai CSV.
+ * Carica e normalizza i dati dei giocatori dai CSV (con i delta del change feed).
  */
 export async function loadPlayerStats() {
   try {
-    const leagueResponse = await fetch('/Bet_Website/data/players/league_players.csv', { cache: 'no-store' });
-    const championsResponse = await fetch('/Bet_Website/data/players/champions_league_players.csv', { cache: 'no-store' });
-
-    if (!leagueResponse.ok || !championsResponse.ok) {
-      throw new Error('Errore nel caricamento dei file CSV');
-    }
-
-    const leagueData = await leagueResponse.text();
-    const championsData = await championsResponse.text();
-
-    const parsedLeaguePlayers = await parseCSV(leagueData);
-    const parsedChampionsPlayers = await parseCSV(championsData);
+    // copia locale aggiornata con i delta del change feed (CSV completo se serve)
+    const parsedLeaguePlayers = await loadRows('players/league_players.csv');
+    const parsedChampionsPlayers = await loadRows('players/champions_league_players.csv');
 
     leaguePlayers = normalizePlayerStats(parsedLeaguePlayers, 'league');
     championsLeaguePlayers = normalizePlayerStats(parsedChampionsPlayers, 'champions');
+    await loadLeaderboards();
 
     console.log('Dati dei giocatori caricati correttamente.');
   } catch (error) {
@@ -112,6 +149,11 @@ export function getTopPlayersByStat(
   stat: keyof PlayerStats,
   limit: number = 10
 ): PlayerStats[] {
+  if (leaderboards && limit <= leaderboards.k.team) {
+    const kind = league === 'Champions League' ? 'champions' : 'league';
+    return lookup(leaderboards.team[kind][team.toLowerCase()]?.[stat as string], limit);
+  }
+
   const players = getPlayerStats(team, league);
 
   const minMatches = league === 'Champions League' ? 3 : 5;
@@ -139,6 +181,10 @@ export function getLeagueTopPlayers(
   category: 'goals' | 'assists' | 'goalsAndAssists',
   limit: number = 20
 ): PlayerStats[] {
+  if (leaderboards && limit <= leaderboards.k.league) {
+    return lookup(leaderboards.league[league]?.[category], limit);
+  }
+
   const players =
     league === 'Champions League'
       ? championsLeaguePlayers
@@ -156,3 +202,28 @@ export function getLeagueTopPlayers(
 
   return sorted.slice(0, limit);
 }
+
+/**
+ * Top N di una competizione per statistica, con le stesse presenze minime di
+ * getTopPlayersByStat() (5 campionati / 3 Champions).
+ */
+export function getLeagueTopPlayersByStat(
+  league: string,
+  stat: keyof PlayerStats,
+  limit: number = 20
+): PlayerStats[] {
+  if (leaderboards && limit <= leaderboards.k.league) {
+    return lookup(leaderboards.stat[league]?.[stat as string], limit);
+  }
+
+  const minMatches = league === 'Champions League' ? 3 : 5;
+  const players =
+    league === 'Champions League'
+      ? championsLeaguePlayers
+      : leaguePlayers.filter((p) => p.league === league);
+
+  return players
+    .filter((p) => p.matches >= minMatches && typeof p[stat] === 'number')
+    .sort((a, b) => (b[stat] as number) - (a[stat] as number))
+    .slice(0, limit);
+}
@@ -1,6 +1,7 @@
 // lib/services/recommended-bets-service.ts
 
 import Papa from 'papaparse';
+import { fetchData } from '../utils/data-manifest';
 
 /** ============================
  *  DATI E INTERFACCE
@@ -181,16 +182,16 @@ export async function loadAllBetsData() {
 
   // standings
   const possibleStandingsFiles = [
-    '/Bet_Website/data/standings/serie_a.csv',
-    '/Bet_Website/data/standings/ligue_1.csv',
-    '/Bet_Website/data/standings/premier_league.csv',
-    '/Bet_Website/data/standings/bundesliga.csv',
-    '/Bet_Website/data/standings/la_liga.csv',
-    '/Bet_Website/data/standings/champions_league.csv',
+    'standings/serie_a.csv',
+    'standings/ligue_1.csv',
+    'standings/premier_league.csv',
+    'standings/bundesliga.csv',
+    'standings/la_liga.csv',
+    'standings/champions_league.csv',
   ];
   for (const file of possibleStandingsFiles) {
     try {
-      const resp = await fetch(file);
+      const resp = await fetchData(file);
       if (!resp.ok) continue;
       const text = await resp.text();
       const parsed = Papa.parse<StandingsRow>(text, { header: true, skipEmptyLines: true });
@@ -200,7 +201,7 @@ export async function loadAllBetsData() {
 
   // team_performance
   {
-    const resp = await fetch('/Bet_Website/data/team_performance.csv');
+    const resp = await fetchData('team_performance.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<TeamPerformanceRow>(text, { header: true, skipEmptyLines: true });
@@ -209,7 +210,7 @@ export async function loadAllBetsData() {
   }
   // opponent_performance
   {
-    const resp = await fetch('/Bet_Website/data/opponent_performance.csv');
+    const resp = await fetchData('opponent_performance.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<OpponentPerformanceRow>(text, { header: true, skipEmptyLines: true });
@@ -218,7 +219,7 @@ export async function loadAllBetsData() {
   }
   // players (league)
   {
-    const resp = await fetch('/Bet_Website/data/players/league_players.csv');
+    const resp = await fetchData('players/league_players.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<PlayerRow>(text, { header: true, skipEmptyLines: true });
@@ -227,7 +228,7 @@ export async function loadAllBetsData() {
   }
   // all_leagues_matches
   {
-    const resp = await fetch('/Bet_Website/data/all_leagues_matches.csv');
+    const resp = await fetchData('all_leagues_matches.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<MatchRow>(text, { header: true, skipEmptyLines: true });
@@ -237,7 +238,7 @@ export async function loadAllBetsData() {
 
   // Champions specific
   {
-    const resp = await fetch('/Bet_Website/data/champions_avversari.csv');
+    const resp = await fetchData('champions_avversari.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<ChampionsAvversariRow>(text, { header: true, skipEmptyLines: true });
@@ -245,7 +246,7 @@ export async function loadAllBetsData() {
     }
   }
   {
-    const resp = await fetch('/Bet_Website/data/champions_casa.csv');
+    const resp = await fetchData('champions_casa.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<ChampionsCasaRow>(text, { header: true, skipEmptyLines: true });
@@ -253,7 +254,7 @@ export async function loadAllBetsData() {
     }
   }
   {
-    const resp = await fetch('/Bet_Website/data/players/champions_league_players.csv');
+    const resp = await fetchData('players/champions_league_players.csv');
     if (resp.ok) {
       const text = await resp.text();
       const parsed = Papa.parse<ChampionsLeaguePlayerRow>(text, { header: true, skipEmptyLines: true });
@@ -1,21 +1,19 @@
 'use client';
 
-import { parseCSV } from '../utils/csv-parser';
+import { loadRows } from '../utils/change-feed';
 import { TeamStats } from '../types/stats';
 
 let standings: Record<string, TeamStats[]> = {};
 
 /**
- * Carica i dati delle classifiche da file CSV.
+ * Carica i dati delle classifiche da file CSV (con i delta del change feed).
  */
 export async function loadStandings(): Promise<void> {
   try {
     const leagues = ['serie_a', 'premier_league', 'la_liga', 'bundesliga', 'ligue_1', 'champions_league'];
 
     for (const league of leagues) {
-      const response = await fetch(`/Bet_Website/data/standings/${league}.csv`);
-      const csvData = await response.text();
-      const parsedData = await parseCSV<any>(csvData);
+      const parsedData = await loadRows(`standings/${league}.csv`);
 
       standings[league] = parsedData.map(row => ({
         position: parseInt(row.Pos, 10),
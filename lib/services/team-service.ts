@@ -1,4 +1,34 @@
 import { parseCSV } from '@/lib/utils/csv-parser';
+import { dataSha256, fetchData } from '@/lib/utils/data-manifest';
+
+/**
+ * Medie delle squadre vicine precalcolate da SCRAPER/team_neighbourhood.py
+ * (team_neighbourhood.json), chiave "<lega>|<squadra>|<team|opponent>".
+ * Se il file manca, `sources` (sha256 dei CSV di input) non corrisponde ai CSV nel
+ * manifest o la squadra non c'è, si ricalcola dai CSV come prima.
+ */
+let neighbourhood: Promise<Record<string, any> | null> | null = null;
+
+function loadNeighbourhood() {
+  if (!neighbourhood) {
+    neighbourhood = fetchData('team_neighbourhood.json')
+      .then(async (resp) => {
+        if (!resp.ok) return null;
+        // null nel JSON = divisione per zero (NaN lato browser, come il calcolo originale)
+        const file = JSON.parse(await resp.text(), (_k, v) => (v === null ? NaN : v));
+        const sources = Object.entries((file.sources ?? {}) as Record<string, string>);
+        const published = await Promise.all(sources.map(([logical]) => dataSha256(logical)));
+        // input assente: null nel JSON (NaN dopo il reviver), assente dal manifest
+        if (!sources.length || sources.some(([, sha], i) => (published[i] || null) !== (sha || null))) {
+          console.warn('team_neighbourhood.json non corrisponde ai CSV pubblicati, uso i CSV');
+          return null;
+        }
+        return file.teams as Record<string, any>;
+      })
+      .catch(() => null);
+  }
+  return neighbourhood;
+}
 
 /**
  * Recupera i dati delle statistiche per una squadra specifica.
@@ -12,7 +42,10 @@ export async function getTeamStats(
   try {
     // Carica dati della lega
     const leagueFile = league.toLowerCase().replace(/\s+/g, '_');
-    const leagueDataResponse = await fetch(`/Bet_Website/data/standings/${leagueFile}.csv`);
+    const precomputed = (await loadNeighbourhood())?.[`${leagueFile}|${team}|${dataSource}`];
+    if (precomputed) return precomputed;
+
+    const leagueDataResponse = await fetchData(`standings/${leagueFile}.csv`);
     const leagueDataCSV = await leagueDataResponse.text();
     const leagueData = await parseCSV<any>(leagueDataCSV);
 
@@ -95,24 +128,24 @@ export async function getTeamStats(
     // Usiamo leagueFile per discriminare la Champions dalle altre competizioni
     if (leagueFile === 'champions_league') {
       if (dataSource === 'team') {
-        dataFile = '/Bet_Website/data/champions_casa.csv';
+        dataFile = 'champions_casa.csv';
       } else if (dataSource === 'opponent') {
-        dataFile = '/Bet_Website/data/champions_avversari.csv';
+        dataFile = 'champions_avversari.csv';
       } else {
         throw new Error(`Data source ${dataSource} is not recognized.`);
       }
     } else {
       if (dataSource === 'team') {
-        dataFile = '/Bet_Website/data/team_performance.csv';
+        dataFile = 'team_performance.csv';
       } else if (dataSource === 'opponent') {
-        dataFile = '/Bet_Website/data/opponent_performance.csv';
+        dataFile = 'opponent_performance.csv';
       } else {
         throw new Error(`Data source ${dataSource} is not recognized.`);
       }
     }
 
     // Carica dati dal file appropriato
-    const dataResponse = await fetch(dataFile);
+    const dataResponse = await fetchData(dataFile);
     const dataCSV = await dataResponse.text();
     const data = await parseCSV<any>(dataCSV);
 
@@ -0,0 +1,142 @@
+// lib/utils/change-feed.ts
+
+'use client';
+
+import { parseCSV } from './csv-parser';
+import { dataSha256, fetchData } from './data-manifest';
+
+/**
+ * Dataset CSV con copia locale aggiornata a delta (SCRAPER/change_feed.py).
+ * La copia in localStorage ricorda lo sha256 da cui proviene: se differisce da quello nel
+ * manifest si applicano in ordine i change set del changelog che partono da quello sha
+ * (base_sha256); se la catena non arriva allo sha pubblicato si riscarica il CSV completo.
+ * Le righe restano stringhe, come nel diff lato Python.
+ */
+export type Row = Record<string, string>;
+
+interface FileChange {
+  full?: boolean;
+  keys: string[];
+  base_sha256: string;
+  sha256: string;
+  added: Record<string, string[]>;
+  removed: Record<string, string[]>;
+  changed: {
+    keys: Record<string, string[]>;
+    mask: Record<string, number[]>;
+    values: Record<string, string[]>;
+  };
+}
+
+interface ChangelogRun {
+  run: string;
+  file: string;
+  files: Record<string, { full?: boolean; base_sha256?: string; sha256?: string }>;
+}
+
+interface CachedRows {
+  sha256: string;
+  rows: Row[];
+}
+
+const CACHE_PREFIX = 'dataRows:';
+
+function readCache(logical: string): CachedRows | null {
+  try {
+    const raw = localStorage.getItem(CACHE_PREFIX + logical);
+    return raw ? (JSON.parse(raw) as CachedRows) : null;
+  } catch {
+    return null;
+  }
+}
+
+function writeCache(logical: string, entry: CachedRows) {
+  try {
+    localStorage.setItem(CACHE_PREFIX + logical, JSON.stringify(entry));
+  } catch (err) {
+    // quota piena: la prossima volta si riscarica il CSV
+    console.warn(`Copia locale di ${logical} non salvata:`, err);
+  }
+}
+
+function count(columns: Record<string, unknown[]>): number {
+  const first = Object.values(columns)[0];
+  return first ? first.length : 0;
+}
+
+/** Applica il delta di un file (formato colonnare di change_feed.py) alle righe base. */
+export function applyChanges(rows: Row[], change: FileChange): Row[] {
+  const keyOf = (get: (k: string) => string) => change.keys.map(get).join('\u0001');
+  const byKey = new Map<string, Row>();
+  for (const row of rows) byKey.set(keyOf((k) => row[k]), { ...row });
+
+  for (let i = 0; i < count(change.removed); i++) {
+    byKey.delete(keyOf((k) => change.removed[k][i]));
+  }
+
+  const { keys, mask, values } = change.changed;
+  for (const [col, flags] of Object.entries(mask)) {
+    let j = 0;
+    flags.forEach((flag, i) => {
+      if (!flag) return;
+      const row = byKey.get(keyOf((k) => keys[k][i]));
+      if (row) row[col] = values[col][j];
+      j++;
+    });
+  }
+
+  const columns = Object.keys(change.added);
+  for (let i = 0; i < count(change.added); i++) {
+    const row = Object.fromEntries(columns.map((c) => [c, change.added[c][i]])) as Row;
+    byKey.set(keyOf((k) => row[k]), row);
+  }
+  return [...byKey.values()];
+}
+
+/** Porta la copia locale allo sha `target` con i change set; null se la catena si interrompe. */
+async function replayChanges(logical: string, cached: CachedRows, target: string): Promise<Row[] | null> {
+  const resp = await fetchData('changes/changelog.json');
+  if (!resp.ok) return null;
+  const log: { runs: ChangelogRun[] } = await resp.json();
+
+  let { sha256, rows } = cached;
+  // il changelog è dal più recente: si applica dal più vecchio
+  for (const run of [...(log.runs || [])].reverse()) {
+    const entry = run.files[logical];
+    if (!entry || entry.base_sha256 !== sha256) continue;
+    if (entry.full) return null;
+    const setResp = await fetchData(run.file);
+    if (!setResp.ok) return null;
+    const changeSet: { files: Record<string, FileChange> } = await setResp.json();
+    rows = applyChanges(rows, changeSet.files[logical]);
+    sha256 = entry.sha256!;
+    if (sha256 === target) return rows;
+  }
+  return null;
+}
+
+/** Righe di un CSV pubblicato: copia locale + delta se possibile, altrimenti file completo. */
+export async function loadRows(logical: string): Promise<Row[]> {
+  const target = await dataSha256(logical);
+  const cached = readCache(logical);
+
+  if (cached && target) {
+    if (cached.sha256 === target) return cached.rows;
+    try {
+      const rows = await replayChanges(logical, cached, target);
+      if (rows) {
+        writeCache(logical, { sha256: target, rows });
+        return rows;
+      }
+    } catch (err) {
+      console.warn(`Delta di ${logical} non applicabili, scarico il file completo:`, err);
+    }
+  }
+
+  const resp = await fetchData(logical);
+  if (!resp.ok) throw new Error(`Errore nel caricamento di ${logical}`);
+  const rows = await parseCSV<Row>(await resp.text(), false);
+  // senza manifest non si sa da quale versione venga: niente copia locale
+  if (target) writeCache(logical, { sha256: target, rows });
+  return rows;
+}
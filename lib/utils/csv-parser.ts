@@ -2,11 +2,11 @@
 
 import Papa from 'papaparse';
 
-export async function parseCSV<T>(csvContent: string): Promise<T[]> {
+export async function parseCSV<T>(csvContent: string, dynamicTyping: boolean = true): Promise<T[]> {
   return new Promise((resolve, reject) => {
     Papa.parse(csvContent, {
       header: true,
-      dynamicTyping: true,
+      dynamicTyping,
       skipEmptyLines: true,
       complete: (results) => {
         resolve(results.data as T[]);
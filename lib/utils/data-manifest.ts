@@ -0,0 +1,53 @@
+// lib/utils/data-manifest.ts
+
+'use client';
+
+/**
+ * Risoluzione dei file dati pubblicati da SCRAPER/publish.py.
+ * manifest.json mappa il nome logico (es. 'players/league_players.csv') al file
+ * con hash del contenuto in dist/: quello può restare in cache a lungo, perché
+ * cambia nome solo quando cambia il contenuto. Senza manifest si usa il CSV grezzo.
+ */
+const DATA_BASE = '/Bet_Website/data';
+
+interface ManifestEntry {
+  file: string;
+  sha256: string;
+  bytes: number;
+}
+
+let manifestPromise: Promise<Record<string, ManifestEntry>> | null = null;
+
+function loadManifest(): Promise<Record<string, ManifestEntry>> {
+  if (!manifestPromise) {
+    manifestPromise = fetch(`${DATA_BASE}/manifest.json`, { cache: 'no-cache' })
+      .then(resp => (resp.ok ? resp.json() : { files: {} }))
+      .then(json => json.files || {})
+      .catch(() => ({}));
+  }
+  return manifestPromise;
+}
+
+/** URL da scaricare per un file logico (hashed se disponibile). */
+export async function resolveDataUrl(logical: string): Promise<string> {
+  const files = await loadManifest();
+  const entry = files[logical];
+  return entry ? `${DATA_BASE}/${entry.file}` : `${DATA_BASE}/${logical}`;
+}
+
+/** sha256 del contenuto pubblicato per un file logico (undefined senza manifest). */
+export async function dataSha256(logical: string): Promise<string | undefined> {
+  const files = await loadManifest();
+  return files[logical]?.sha256;
+}
+
+/** fetch() di un file dati tramite manifest. */
+export async function fetchData(logical: string): Promise<Response> {
+  const url = await resolveDataUrl(logical);
+  const resp = await fetch(url);
+  if (!resp.ok && url !== `${DATA_BASE}/${logical}`) {
+    // manifest più nuovo del deploy (o viceversa): ripiega sul file grezzo
+    return fetch(`${DATA_BASE}/${logical}`, { cache: 'no-cache' });
+  }
+  return resp;
+}